@@ -31,10 +31,10 @@ def get_api_key() -> str:
     return api_key
 
 
-def screen_aml(full_name: str, date_of_birth: str = None, nationality: str = None,
-               document_number: str = None, entity_type: str = "person",
-               threshold: int = None, vendor_data: str = None) -> dict:
-    api_key = get_api_key()
+def build_payload(full_name: str, date_of_birth: str = None, nationality: str = None,
+                  document_number: str = None, entity_type: str = "person",
+                  threshold: int = None, vendor_data: str = None) -> dict:
+    """Request body for POST /v3/aml/ (also used by screen_pipeline.py)."""
     payload = {"full_name": full_name, "entity_type": entity_type}
     if date_of_birth:
         payload["date_of_birth"] = date_of_birth
@@ -46,6 +46,15 @@ def screen_aml(full_name: str, date_of_birth: str = None, nationality: str = Non
         payload["aml_match_score_threshold"] = threshold
     if vendor_data:
         payload["vendor_data"] = vendor_data
+    return payload
+
+
+def screen_aml(full_name: str, date_of_birth: str = None, nationality: str = None,
+               document_number: str = None, entity_type: str = "person",
+               threshold: int = None, vendor_data: str = None) -> dict:
+    api_key = get_api_key()
+    payload = build_payload(full_name, date_of_birth, nationality, document_number,
+                            entity_type, threshold, vendor_data)
     r = requests.post(ENDPOINT,
                       headers={"x-api-key": api_key, "Content-Type": "application/json"},
                       json=payload, timeout=60)
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""Didit ID → AML + Database Validation pipeline - One command, one merged report.
+
+Runs ID verification once, extracts name / DOB / nationality / document number,
+then screens AML and validates against government databases concurrently. End-to-end
+latency is ID verification plus the slower of the two branches, not the sum of all three.
+
+Usage:
+    python scripts/screen_pipeline.py <front_image> [back_image] [--vendor-data ID] [--threshold N]
+                                      [--skip-database] [--output report.json]
+
+Environment:
+    DIDIT_API_KEY - Required. Your Didit API key.
+
+Examples:
+    python scripts/screen_pipeline.py front.jpg back.jpg --vendor-data user-123
+    python scripts/screen_pipeline.py passport.jpg --threshold 90 --skip-database
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+try:
+    from screen_aml import build_payload as aml_payload
+except ImportError:
+    from .screen_aml import build_payload as aml_payload
+
+BASE_URL = "https://verification.didit.me/v3"
+
+# Countries covered by database validation -> ID verification field that holds the
+# number the database expects (see didit-database-validation SKILL.md; BRA is the CPF).
+DATABASE_ID_FIELDS = {
+    "ARG": "document_number", "BOL": "document_number", "BRA": "tax_number",
+    "CHL": "personal_number", "COL": "personal_number", "CRI": "personal_number",
+    "DOM": "personal_number", "ECU": "personal_number", "ESP": "personal_number",
+    "GTM": "document_number", "HND": "document_number", "MEX": "personal_number",
+    "PAN": "document_number", "PER": "personal_number", "PRY": "document_number",
+    "SLV": "document_number", "URY": "personal_number", "VEN": "document_number",
+}
+IMAGE_FIELDS = ("portrait_image", "front_document_image", "back_document_image")
+
+
+def get_api_key() -> str:
+    api_key = os.environ.get("DIDIT_API_KEY")
+    if not api_key:
+        print("Error: DIDIT_API_KEY environment variable is not set.", file=sys.stderr)
+        sys.exit(1)
+    return api_key
+
+
+def _timed_post(url: str, **kwargs) -> dict:
+    """POST and return a stage record: http_status, body or error, elapsed_ms. Never exits."""
+    started = time.perf_counter()
+    try:
+        r = requests.post(url, **kwargs)
+        stage = {"http_status": r.status_code}
+        if r.status_code in (200, 201):
+            stage["body"] = r.json()
+        else:
+            stage["error"] = r.text
+    except requests.RequestException as e:
+        stage = {"http_status": None, "error": str(e)}
+    stage["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    return stage
+
+
+def run_id_verification(api_key: str, front_image: str, back_image: str = None,
+                        vendor_data: str = None) -> dict:
+    data = {"save_api_request": "true"}
+    if vendor_data:
+        data["vendor_data"] = vendor_data
+    with open(front_image, "rb") as front_f:
+        files = {"front_image": (os.path.basename(front_image), front_f)}
+        if back_image:
+            with open(back_image, "rb") as back_f:
+                files["back_image"] = (os.path.basename(back_image), back_f)
+                return _timed_post(f"{BASE_URL}/id-verification/", headers={"x-api-key": api_key},
+                                   files=files, data=data, timeout=60)
+        return _timed_post(f"{BASE_URL}/id-verification/", headers={"x-api-key": api_key},
+                           files=files, data=data, timeout=60)
+
+
+def extract_identity(id_verification: dict) -> dict:
+    """Pick the fields AML screening and database validation need from an ID result."""
+    fields = {key: id_verification.get(key) for key in (
+        "full_name", "first_name", "last_name", "date_of_birth", "nationality",
+        "issuing_state", "document_number", "personal_number", "tax_number")}
+    if not fields["full_name"]:
+        fields["full_name"] = " ".join(filter(None, (fields["first_name"], fields["last_name"]))) or None
+    return fields
+
+
+def run_aml(api_key: str, identity: dict, threshold: int = None, vendor_data: str = None) -> dict:
+    payload = aml_payload(identity["full_name"], identity.get("date_of_birth"), identity.get("nationality"),
+                          identity.get("document_number"), threshold=threshold, vendor_data=vendor_data)
+    return _timed_post(f"{BASE_URL}/aml/",
+                       headers={"x-api-key": api_key, "Content-Type": "application/json"},
+                       json=payload, timeout=60)
+
+
+def run_database_validation(api_key: str, identity: dict, vendor_data: str = None) -> dict:
+    country = identity.get("issuing_state")
+    field = DATABASE_ID_FIELDS.get(country)
+    id_number = identity.get(field) if field else None
+    if not id_number:
+        reason = "UNSUPPORTED_COUNTRY" if not field else f"{field.upper()}_NOT_EXTRACTED"
+        return {"skipped": True, "reason": reason, "elapsed_ms": 0.0}
+    payload = {"id_number": id_number, "issuing_state": country}
+    for key in ("first_name", "last_name", "date_of_birth"):
+        if identity.get(key):
+            payload[key] = identity[key]
+    if vendor_data:
+        payload["vendor_data"] = vendor_data
+    return _timed_post(f"{BASE_URL}/database-validation/",
+                       headers={"x-api-key": api_key, "Content-Type": "application/json"},
+                       json=payload, timeout=60)
+
+
+def _stage_status(stage: dict, key: str):
+    if stage.get("skipped"):
+        return "Skipped"
+    if "body" not in stage:
+        return "Error"
+    return stage["body"].get(key, {}).get("status", "Unknown")
+
+
+def overall_status(statuses: list) -> str:
+    """Worst status across stages: Error > Declined/Rejected > In Review > Approved."""
+    if "Error" in statuses:
+        return "Error"
+    if any(s in ("Declined", "Rejected") for s in statuses):
+        return "Declined"
+    if any(s not in ("Approved", "Skipped") for s in statuses):
+        return "In Review"
+    return "Approved"
+
+
+def run_pipeline(front_image: str, back_image: str = None, vendor_data: str = None,
+                 threshold: int = None, database: bool = True) -> dict:
+    """ID verification, then AML + database validation in parallel. Returns the merged report."""
+    api_key = get_api_key()
+    for path in filter(None, (front_image, back_image)):
+        if not os.path.isfile(path):
+            print(f"Error: Image not found: {path}", file=sys.stderr)
+            sys.exit(1)
+
+    started = time.perf_counter()
+    id_stage = run_id_verification(api_key, front_image, back_image, vendor_data)
+    id_status = _stage_status(id_stage, "id_verification")
+    id_result = id_stage.get("body", {}).get("id_verification", {})
+    for field in IMAGE_FIELDS:
+        id_result.pop(field, None)
+    identity = extract_identity(id_result)
+
+    skipped = {"skipped": True, "reason": "NO_IDENTITY_EXTRACTED", "elapsed_ms": 0.0}
+    if id_status == "Error" or not identity["full_name"]:
+        aml_stage, db_stage = skipped, dict(skipped)
+    else:
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            aml_future = pool.submit(run_aml, api_key, identity, threshold, vendor_data)
+            db_future = (pool.submit(run_database_validation, api_key, identity, vendor_data)
+                         if database else None)
+            aml_stage = aml_future.result()
+            db_stage = (db_future.result() if db_future
+                        else {"skipped": True, "reason": "DISABLED", "elapsed_ms": 0.0})
+
+    statuses = {
+        "id_verification": id_status,
+        "aml": _stage_status(aml_stage, "aml"),
+        "database_validation": _stage_status(db_stage, "database_validation"),
+    }
+    return {
+        "status": overall_status(list(statuses.values())),
+        "stage_status": statuses,
+        "identity": identity,
+        "timings_ms": {
+            "id_verification": id_stage["elapsed_ms"],
+            "aml": aml_stage["elapsed_ms"],
+            "database_validation": db_stage["elapsed_ms"],
+            "total": round((time.perf_counter() - started) * 1000, 1),
+        },
+        "id_verification": id_stage,
+        "aml": aml_stage,
+        "database_validation": db_stage,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ID verification → AML + database validation via Didit")
+    parser.add_argument("front_image", help="Path to front image of ID document")
+    parser.add_argument("back_image", nargs="?", help="Path to back image (optional)")
+    parser.add_argument("--vendor-data", help="Your identifier for tracking (sent to every stage)")
+    parser.add_argument("--threshold", type=int, help="AML match score threshold (0-100)")
+    parser.add_argument("--skip-database", action="store_true", help="Don't run database validation")
+    parser.add_argument("--output", help="Write the merged JSON report to this file")
+    args = parser.parse_args()
+
+    report = run_pipeline(args.front_image, args.back_image, args.vendor_data,
+                          args.threshold, database=not args.skip_database)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+    else:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+
+    identity = report["identity"]
+    timings = report["timings_ms"]
+    print(f"\n--- Overall: {report['status']} | Name: {identity.get('full_name') or 'N/A'} ---")
+    for stage, status in report["stage_status"].items():
+        print(f"  {stage}: {status} ({timings[stage]}ms)")
+    print(f"  total: {timings['total']}ms")
+
+
+if __name__ == "__main__":
+    main()
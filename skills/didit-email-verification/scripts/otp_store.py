@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""Local OTP state for Didit email/phone verification.
+
+Tracks pending codes, send timestamps, check attempts and resend cooldowns per
+identifier so redundant sends and checks can be answered locally instead of
+paying for another API call. Mirrors the documented server limits: codes expire
+after 5 minutes, 3 check attempts per code, 2 resends per 24 hours.
+
+Backends:
+    MemoryOTPStore  - in-process dict with TTL eviction (single process)
+    SQLiteOTPStore  - SQLite file in WAL mode (shared across threads and processes)
+
+Usage:
+    from scripts.otp_store import OTPTracker, SQLiteOTPStore
+    tracker = OTPTracker(SQLiteOTPStore("otp_state.db"))
+    send_code("user@example.com", tracker=tracker)
+"""
+import json
+import sqlite3
+import threading
+import time
+
+
+class MemoryOTPStore:
+    """Thread-safe in-memory state map; entries vanish once their TTL passes."""
+
+    def __init__(self, stripes: int = 64):
+        self._data = {}
+        self._locks = [threading.Lock() for _ in range(stripes)]
+        self._sweep_lock = threading.Lock()
+        self._next_sweep = 0.0
+
+    def update(self, identifier: str, fn, now: float = None):
+        """Atomically apply `fn(state or None) -> (new_state or None, result)`; returns result.
+
+        `new_state` must carry an `expires_at` epoch; None deletes the entry.
+        """
+        now = time.time() if now is None else now
+        with self._locks[hash(identifier) % len(self._locks)]:
+            state = self._data.get(identifier)
+            if state is not None and state["expires_at"] <= now:
+                state = None
+            new_state, result = fn(state)
+            if new_state is None:
+                self._data.pop(identifier, None)
+            else:
+                self._data[identifier] = new_state
+        self._maybe_sweep(now)
+        return result
+
+    def get(self, identifier: str, now: float = None):
+        now = time.time() if now is None else now
+        state = self._data.get(identifier)
+        return state if state is not None and state["expires_at"] > now else None
+
+    def _maybe_sweep(self, now: float):
+        if now < self._next_sweep or not self._sweep_lock.acquire(blocking=False):
+            return
+        try:
+            self._next_sweep = now + 60
+            for identifier in [k for k, v in list(self._data.items()) if v["expires_at"] <= now]:
+                with self._locks[hash(identifier) % len(self._locks)]:
+                    state = self._data.get(identifier)
+                    if state is not None and state["expires_at"] <= now:
+                        del self._data[identifier]
+        finally:
+            self._sweep_lock.release()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SQLiteOTPStore:
+    """SQLite-backed state map; safe for concurrent threads and processes."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute("CREATE TABLE IF NOT EXISTS otp_state ("
+                     "identifier TEXT PRIMARY KEY, state TEXT NOT NULL, expires_at REAL NOT NULL)")
+        conn.execute("CREATE INDEX IF NOT EXISTS otp_state_expires ON otp_state (expires_at)")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def update(self, identifier: str, fn, now: float = None):
+        """Atomically apply `fn(state or None) -> (new_state or None, result)`; returns result."""
+        now = time.time() if now is None else now
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT state FROM otp_state WHERE identifier = ? AND expires_at > ?",
+                               (identifier, now)).fetchone()
+            new_state, result = fn(json.loads(row[0]) if row else None)
+            if new_state is None:
+                conn.execute("DELETE FROM otp_state WHERE identifier = ?", (identifier,))
+            else:
+                conn.execute("INSERT OR REPLACE INTO otp_state (identifier, state, expires_at) VALUES (?, ?, ?)",
+                             (identifier, json.dumps(new_state), new_state["expires_at"]))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return result
+
+    def get(self, identifier: str, now: float = None):
+        now = time.time() if now is None else now
+        row = self._conn().execute("SELECT state FROM otp_state WHERE identifier = ? AND expires_at > ?",
+                                   (identifier, now)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def purge(self, now: float = None) -> int:
+        """Delete expired rows; returns how many were removed."""
+        now = time.time() if now is None else now
+        return self._conn().execute("DELETE FROM otp_state WHERE expires_at <= ?", (now,)).rowcount
+
+
+class OTPTracker:
+    """Applies Didit's OTP limits locally on top of a MemoryOTPStore or SQLiteOTPStore.
+
+    State per identifier: `sends` (timestamps inside the resend window), `code_expires_at`,
+    `attempts` on the current code, and `verified`.
+    """
+
+    def __init__(self, store, code_ttl: float = 300, max_attempts: int = 3,
+                 resend_cooldown: float = 30, max_sends: int = 3, send_window: float = 24 * 3600):
+        self.store = store
+        self.code_ttl = code_ttl
+        self.max_attempts = max_attempts
+        self.resend_cooldown = resend_cooldown
+        self.max_sends = max_sends
+        self.send_window = send_window
+
+    def _fresh(self, now: float) -> dict:
+        return {"sends": [], "code_expires_at": 0, "attempts": 0, "verified": False, "expires_at": now}
+
+    def _expiry(self, state: dict) -> float:
+        return max(state["code_expires_at"], (state["sends"][0] + self.send_window) if state["sends"] else 0)
+
+    def reserve_send(self, identifier: str, now: float = None) -> dict:
+        """Claim a send slot. Returns `{"allowed": True}` or a denial with `reason`/`retry_after`.
+
+        A claimed slot counts as a send; call `record_send(..., delivered=False)` to release it.
+        """
+        now = time.time() if now is None else now
+
+        def apply(state):
+            state = state or self._fresh(now)
+            state["sends"] = [t for t in state["sends"] if t > now - self.send_window]
+            pending = state["code_expires_at"] > now and not state["verified"]
+            if pending and state["sends"] and now - state["sends"][-1] < self.resend_cooldown:
+                retry_after = state["sends"][-1] + self.resend_cooldown - now
+                return state, {"allowed": False, "reason": "RESEND_COOLDOWN", "retry_after": round(retry_after, 1)}
+            if len(state["sends"]) >= self.max_sends:
+                retry_after = state["sends"][0] + self.send_window - now
+                return state, {"allowed": False, "reason": "RESEND_LIMIT", "retry_after": round(retry_after, 1)}
+            state["sends"].append(now)
+            state.update(code_expires_at=now + self.code_ttl, attempts=0, verified=False)
+            state["expires_at"] = self._expiry(state)
+            return state, {"allowed": True}
+
+        return self.store.update(identifier, apply, now)
+
+    def record_send(self, identifier: str, delivered: bool, now: float = None):
+        """Confirm the reserved send; an undelivered send releases its slot."""
+        if delivered:
+            return
+        now = time.time() if now is None else now
+
+        def apply(state):
+            if state is None:
+                return None, None
+            if state["sends"]:
+                state["sends"].pop()
+            state["code_expires_at"] = 0
+            state["expires_at"] = self._expiry(state)
+            return (state if state["expires_at"] > now else None), None
+
+        self.store.update(identifier, apply, now)
+
+    def reserve_check(self, identifier: str, now: float = None) -> dict:
+        """Claim a check attempt. Denies locally when the tracked code expired or attempts are spent.
+
+        With no local record at all (the code was sent without this tracker, or the
+        state was lost) the check is allowed with `attempt` None and the server decides.
+        An identifier that already passed is denied with status "AlreadyVerified", never
+        "Approved": the submitted code is not validated.
+        Call `release_check` if the claimed check never got an answer.
+        """
+        now = time.time() if now is None else now
+
+        def apply(state):
+            if state is None:
+                return None, {"allowed": True, "attempt": None}
+            if state["code_expires_at"] <= now:
+                return state, {"allowed": False, "status": "Expired or Not Found", "reason": "NO_PENDING_CODE"}
+            if state["verified"]:
+                # The code isn't checked here, so this must not read as an approval of it.
+                return state, {"allowed": False, "status": "AlreadyVerified", "reason": "ALREADY_VERIFIED"}
+            if state["attempts"] >= self.max_attempts:
+                return state, {"allowed": False, "status": "Failed", "reason": "ATTEMPTS_EXCEEDED"}
+            state["attempts"] += 1
+            return state, {"allowed": True, "attempt": state["attempts"]}
+
+        return self.store.update(identifier, apply, now)
+
+    def release_check(self, identifier: str, now: float = None):
+        """Give back an attempt claimed by `reserve_check` whose request failed without an answer."""
+        now = time.time() if now is None else now
+
+        def apply(state):
+            if state is not None and state["attempts"] > 0:
+                state["attempts"] -= 1
+            return state, None
+
+        self.store.update(identifier, apply, now)
+
+    def record_check(self, identifier: str, status: str, now: float = None):
+        """Fold the server's check status into local state."""
+        now = time.time() if now is None else now
+
+        def apply(state):
+            if state is None:
+                return None, None
+            if status == "Approved":
+                state["verified"] = True
+            elif status in ("Declined", "Expired or Not Found"):
+                state["code_expires_at"] = 0
+            state["expires_at"] = self._expiry(state)
+            return (state if state["expires_at"] > now else None), None
+
+        self.store.update(identifier, apply, now)
@@ -2,8 +2,11 @@
 """Didit Email Verification - Send and check email OTP codes.
 
 Usage:
-    python scripts/verify_email.py send <email> [--code-size <4-8>] [--alphanumeric]
-    python scripts/verify_email.py check <email> <code> [--decline-breached] [--decline-disposable]
+    python scripts/verify_email.py send <email> [--code-size <4-8>] [--alphanumeric] [--state-db PATH]
+    python scripts/verify_email.py check <email> <code> [--decline-breached] [--decline-disposable] [--domain-cache PATH]
+                                         [--state-db PATH]
+    python scripts/verify_email.py bulk-send <file> [--output results.jsonl] [--rate N] [--domain-rate N] [--workers N]
+                                             [--domain-cache PATH] [--decline-disposable] [--state-db PATH]
 
 Environment:
     DIDIT_API_KEY - Required. Your Didit API key.
@@ -12,14 +15,30 @@ Examples:
     python scripts/verify_email.py send user@example.com
     python scripts/verify_email.py check user@example.com 123456
     python scripts/verify_email.py check user@example.com 123456 --decline-breached --decline-disposable
+    python scripts/verify_email.py send user@example.com --state-db otp_state.db
+    python scripts/verify_email.py bulk-send users.txt --output sent.jsonl --rate 20 --domain-rate 2
+    python scripts/verify_email.py bulk-send users.txt --domain-cache domains.json --decline-disposable
 """
 import argparse
 import json
 import os
 import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from email.utils import parsedate_to_datetime
 
 import requests
 
+try:
+    from file_lock import locked
+    from otp_store import OTPTracker, SQLiteOTPStore
+except ImportError:
+    from .file_lock import locked
+    from .otp_store import OTPTracker, SQLiteOTPStore
+
 BASE_URL = "https://verification.didit.me/v3/email"
 
 
@@ -31,7 +50,143 @@ def get_headers() -> dict:
     return {"x-api-key": api_key, "Content-Type": "application/json"}
 
 
-def send_code(email: str, code_size: int = 6, alphanumeric: bool = False, vendor_data: str = None) -> dict:
+def normalize_email(email: str) -> str:
+    """Canonical form used for dedupe: surrounding whitespace stripped, lowercased."""
+    return email.strip().lower()
+
+
+def email_domain(email: str) -> str:
+    return email.rpartition("@")[2]
+
+
+def retry_after(response, default: float) -> float:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP-date), else `default`."""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return default
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return default
+
+
+class RateLimiter:
+    """Thread-safe limiter that spaces calls evenly at `rate` calls per second."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate and rate > 0 else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class DomainVerdictCache:
+    """LRU + TTL index of per-domain verdicts learned from /check/ responses.
+
+    Disposability is a property of the domain, so one flagged check is enough to
+    pre-flag every other address on it. Optionally persisted as JSON at `path`;
+    save() merges with the file under a cross-process lock (newest verdict per
+    domain wins), so concurrent runs sharing the file don't drop each other's entries.
+    """
+
+    def __init__(self, path: str = None, ttl: float = 7 * 24 * 3600, max_entries: int = 50000):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        if path:
+            self._entries.update(self._read())
+            self._evict()
+
+    def _read(self) -> dict:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _evict(self):
+        cutoff = time.time() - self.ttl
+        for domain in [d for d, v in self._entries.items() if v["checked_at"] < cutoff]:
+            del self._entries[domain]
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get(self, domain: str):
+        with self._lock:
+            verdict = self._entries.get(domain)
+            if verdict is None:
+                return None
+            if verdict["checked_at"] < time.time() - self.ttl:
+                del self._entries[domain]
+                return None
+            self._entries.move_to_end(domain)
+            return verdict
+
+    def record(self, email: str, check_result: dict):
+        """Store the domain verdict carried by a /check/ response, if any."""
+        info = check_result.get("email") or {}
+        if "is_disposable" not in info:
+            return
+        domain = email_domain(normalize_email(email))
+        with self._lock:
+            self._entries[domain] = {"is_disposable": bool(info["is_disposable"]),
+                                     "checked_at": time.time()}
+            self._entries.move_to_end(domain)
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def is_disposable(self, email: str) -> bool:
+        verdict = self.get(email_domain(normalize_email(email)))
+        return bool(verdict and verdict["is_disposable"])
+
+    def save(self):
+        if not self.path:
+            return
+        with locked(self.path), self._lock:
+            for domain, verdict in self._read().items():
+                ours = self._entries.get(domain)
+                if ours is None:
+                    self._entries[domain] = verdict
+                    self._entries.move_to_end(domain, last=False)  # not used by this run: least recent
+                elif ours["checked_at"] < verdict["checked_at"]:
+                    self._entries[domain] = verdict
+            self._evict()
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.path)),
+                                       prefix=".domains-", suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(dict(self._entries), f)
+            os.replace(tmp, self.path)
+
+
+_thread_local = threading.local()
+
+
+def _http() -> requests.Session:
+    """One pooled HTTP session per worker thread."""
+    session = getattr(_thread_local, "session", None)
+    if session is None:
+        session = _thread_local.session = requests.Session()
+    return session
+
+
+def send_code(email: str, code_size: int = 6, alphanumeric: bool = False, vendor_data: str = None,
+              tracker: OTPTracker = None) -> dict:
+    """Send a code. With a `tracker`, sends inside the resend cooldown/limit are skipped locally."""
     payload = {
         "email": email,
         "options": {"code_size": code_size, "alphanumeric_code": alphanumeric},
@@ -39,16 +194,30 @@ def send_code(email: str, code_size: int = 6, alphanumeric: bool = False, vendor
     if vendor_data:
         payload["vendor_data"] = vendor_data
 
+    if tracker is not None:
+        claim = tracker.reserve_send(normalize_email(email))
+        if not claim["allowed"]:
+            return {"status": "Skipped", "reason": claim["reason"],
+                    "retry_after": claim["retry_after"], "local": True}
+
     response = requests.post(f"{BASE_URL}/send/", headers=get_headers(), json=payload, timeout=30)
 
     if response.status_code != 200:
+        if tracker is not None:
+            tracker.record_send(normalize_email(email), delivered=False)
         print(f"Error {response.status_code}: {response.text}", file=sys.stderr)
         sys.exit(1)
 
-    return response.json()
+    result = response.json()
+    if tracker is not None:
+        tracker.record_send(normalize_email(email), delivered=result.get("status") == "Success")
+    return result
 
 
-def check_code(email: str, code: str, decline_breached: bool = False, decline_disposable: bool = False) -> dict:
+def check_code(email: str, code: str, decline_breached: bool = False, decline_disposable: bool = False,
+               domain_cache: DomainVerdictCache = None,
+               tracker: OTPTracker = None) -> dict:
+    """Check a code. With a `tracker`, checks on an expired code or with no attempts left are answered locally."""
     payload = {
         "email": email,
         "code": code,
@@ -56,13 +225,165 @@ def check_code(email: str, code: str, decline_breached: bool = False, decline_di
         "disposable_email_action": "DECLINE" if decline_disposable else "NO_ACTION",
     }
 
-    response = requests.post(f"{BASE_URL}/check/", headers=get_headers(), json=payload, timeout=30)
+    if tracker is not None:
+        claim = tracker.reserve_check(normalize_email(email))
+        if not claim["allowed"]:
+            return {"status": claim["status"], "reason": claim["reason"], "local": True}
+
+    try:
+        response = requests.post(f"{BASE_URL}/check/", headers=get_headers(), json=payload, timeout=30)
+    except requests.RequestException:
+        if tracker is not None:
+            tracker.release_check(normalize_email(email))
+        raise
 
     if response.status_code not in (200, 404):
+        if tracker is not None:
+            tracker.release_check(normalize_email(email))
         print(f"Error {response.status_code}: {response.text}", file=sys.stderr)
         sys.exit(1)
 
-    return response.json()
+    result = response.json()
+    if domain_cache is not None:
+        domain_cache.record(email, result)
+    if tracker is not None:
+        tracker.record_check(normalize_email(email), result.get("status"))
+    return result
+
+
+def read_recipients(path: str) -> list:
+    """Read `email[,vendor_data]` lines, dropping blanks, comments and duplicates.
+
+    Addresses are normalized with normalize_email(); the first occurrence wins.
+    """
+    seen = set()
+    recipients = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            email, _, vendor_data = line.partition(",")
+            email = normalize_email(email)
+            if "@" not in email or email in seen:
+                continue
+            seen.add(email)
+            recipients.append((email, vendor_data.strip() or None))
+    return recipients
+
+
+def interleave_by_domain(recipients: list) -> list:
+    """Round-robin recipients across domains so one large provider can't stall the queue."""
+    buckets = OrderedDict()
+    for item in recipients:
+        buckets.setdefault(email_domain(item[0]), deque()).append(item)
+    ordered = []
+    while buckets:
+        for domain in list(buckets):
+            queue = buckets[domain]
+            ordered.append(queue.popleft())
+            if not queue:
+                del buckets[domain]
+    return ordered
+
+
+def bulk_send(recipients: list, code_size: int = 6, alphanumeric: bool = False,
+              rate: float = 10.0, domain_rate: float = 2.0, workers: int = 8,
+              max_retries: int = 2, domain_cache: DomainVerdictCache = None,
+              skip_disposable: bool = False, tracker: OTPTracker = None):
+    """Send codes to many addresses concurrently; yields one result dict per address.
+
+    `rate` is the global send budget and `domain_rate` the per-recipient-domain
+    budget, both in sends per second. "Retry" statuses and 429 responses are
+    retried up to `max_retries` times. Results are yielded as they complete.
+
+    With a `domain_cache`, addresses on domains already known to be disposable
+    are flagged (`known_disposable`), or skipped without a send when
+    `skip_disposable` is set — they would be declined at check time anyway.
+
+    With a `tracker`, each send is reserved and recorded like send_code(), so a
+    later `check --state-db` knows the code is pending; addresses inside their
+    resend cooldown/limit come back "Skipped" without a send.
+    """
+    headers = get_headers()
+    global_limiter = RateLimiter(rate)
+    domain_limiters = {}
+    domain_lock = threading.Lock()
+
+    def domain_limiter(domain):
+        with domain_lock:
+            limiter = domain_limiters.get(domain)
+            if limiter is None:
+                limiter = domain_limiters[domain] = RateLimiter(domain_rate)
+            return limiter
+
+    def post_with_retries(payload, limiter, record):
+        for attempt in range(1, max_retries + 2):
+            if attempt > 1:
+                time.sleep(backoff)
+            limiter.acquire()
+            global_limiter.acquire()
+            record["attempts"] = attempt
+            record["sent_at"] = time.time()
+            backoff = 2 ** attempt
+            try:
+                r = _http().post(f"{BASE_URL}/send/", headers=headers, json=payload, timeout=30)
+            except requests.RequestException as e:
+                record.update(http_status=None, status="Error", reason=str(e))
+                continue
+            record["http_status"] = r.status_code
+            if r.status_code == 429:
+                record.update(status="Rate Limited", reason=r.text)
+                backoff = retry_after(r, backoff)
+                continue
+            if r.status_code != 200:
+                record.update(status="Error", reason=r.text)
+                return record
+            body = r.json()
+            record.update(status=body.get("status"), reason=body.get("reason"),
+                          request_id=body.get("request_id"))
+            if record["status"] != "Retry":
+                return record
+        return record
+
+    def send_one(email, vendor_data, known_disposable=False):
+        payload = {
+            "email": email,
+            "options": {"code_size": code_size, "alphanumeric_code": alphanumeric},
+        }
+        if vendor_data:
+            payload["vendor_data"] = vendor_data
+        limiter = domain_limiter(email_domain(email))
+        record = {"email": email, "vendor_data": vendor_data}
+        if known_disposable:
+            record["known_disposable"] = True
+        if tracker is not None:
+            claim = tracker.reserve_send(email)
+            if not claim["allowed"]:
+                record.update(attempts=0, status="Skipped", reason=claim["reason"],
+                              retry_after=claim["retry_after"])
+                return record
+        try:
+            return post_with_retries(payload, limiter, record)
+        finally:
+            if tracker is not None:
+                # A send that timed out may still have delivered a code; keep it pending
+                maybe_sent = record.get("status") == "Error" and record.get("http_status") is None
+                tracker.record_send(email, delivered=record.get("status") == "Success" or maybe_sent)
+
+    pending = []
+    for email, vendor_data in interleave_by_domain(recipients):
+        known_disposable = domain_cache is not None and domain_cache.is_disposable(email)
+        if known_disposable and skip_disposable:
+            yield {"email": email, "vendor_data": vendor_data, "attempts": 0,
+                   "status": "Skipped", "reason": "DISPOSABLE_DOMAIN_CACHED"}
+            continue
+        pending.append((email, vendor_data, known_disposable))
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(send_one, *item) for item in pending]
+        for future in as_completed(futures):
+            yield future.result()
 
 
 def main():
@@ -74,23 +395,68 @@ def main():
     send_p.add_argument("--code-size", type=int, default=6, help="Code length 4-8 (default: 6)")
     send_p.add_argument("--alphanumeric", action="store_true", help="Use alphanumeric code")
     send_p.add_argument("--vendor-data", help="Unique identifier for session tracking")
+    send_p.add_argument("--state-db", help="SQLite OTP state file; skips sends inside the resend cooldown/limit")
 
     check_p = sub.add_parser("check", help="Check verification code")
     check_p.add_argument("email", help="Email address to verify")
     check_p.add_argument("code", help="Verification code received")
     check_p.add_argument("--decline-breached", action="store_true", help="Decline breached emails")
     check_p.add_argument("--decline-disposable", action="store_true", help="Decline disposable emails")
+    check_p.add_argument("--state-db", help="SQLite OTP state file; answers checks with no pending code locally")
+    check_p.add_argument("--domain-cache", help="JSON domain-verdict cache to update from the response")
+
+    bulk_p = sub.add_parser("bulk-send", help="Send codes to every address in a file")
+    bulk_p.add_argument("file", help="File with one `email[,vendor_data]` per line")
+    bulk_p.add_argument("--output", help="JSONL results file (default: stdout)")
+    bulk_p.add_argument("--code-size", type=int, default=6, help="Code length 4-8 (default: 6)")
+    bulk_p.add_argument("--alphanumeric", action="store_true", help="Use alphanumeric code")
+    bulk_p.add_argument("--rate", type=float, default=10.0, help="Global sends per second (default: 10)")
+    bulk_p.add_argument("--domain-rate", type=float, default=2.0,
+                        help="Sends per second per recipient domain (default: 2)")
+    bulk_p.add_argument("--workers", type=int, default=8, help="Concurrent requests (default: 8)")
+    bulk_p.add_argument("--domain-cache", help="JSON domain-verdict cache built by `check --domain-cache`")
+    bulk_p.add_argument("--decline-disposable", action="store_true",
+                        help="Skip sends to domains the cache already knows are disposable")
+    bulk_p.add_argument("--state-db", help="SQLite OTP state file to record sends in for `check --state-db`")
+    bulk_p.add_argument("--cache-ttl", type=float, default=7 * 24 * 3600,
+                        help="Domain verdict TTL in seconds (default: 7 days)")
 
     args = parser.parse_args()
+    tracker = OTPTracker(SQLiteOTPStore(args.state_db)) if getattr(args, "state_db", None) else None
 
     if args.command == "send":
-        result = send_code(args.email, args.code_size, args.alphanumeric, args.vendor_data)
+        result = send_code(args.email, args.code_size, args.alphanumeric, args.vendor_data, tracker)
         print(json.dumps(result, indent=2))
         print(f"\n--- Status: {result.get('status', 'Unknown')} ---")
     elif args.command == "check":
-        result = check_code(args.email, args.code, args.decline_breached, args.decline_disposable)
+        domain_cache = DomainVerdictCache(args.domain_cache) if args.domain_cache else None
+        result = check_code(args.email, args.code, args.decline_breached, args.decline_disposable,
+                            domain_cache, tracker)
+        if domain_cache is not None:
+            domain_cache.save()
         print(json.dumps(result, indent=2, ensure_ascii=False))
         print(f"\n--- Status: {result.get('status', 'Unknown')} ---")
+    elif args.command == "bulk-send":
+        recipients = read_recipients(args.file)
+        domain_cache = (DomainVerdictCache(args.domain_cache, ttl=args.cache_ttl)
+                        if args.domain_cache else None)
+        out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+        counts = {}
+        started = time.monotonic()
+        try:
+            for record in bulk_send(recipients, args.code_size, args.alphanumeric,
+                                    args.rate, args.domain_rate, args.workers,
+                                    domain_cache=domain_cache,
+                                    skip_disposable=args.decline_disposable, tracker=tracker):
+                out.write(json.dumps(record) + "\n")
+                out.flush()
+                counts[record["status"]] = counts.get(record["status"], 0) + 1
+        finally:
+            if out is not sys.stdout:
+                out.close()
+        elapsed = time.monotonic() - started
+        summary = ", ".join(f"{status}: {n}" for status, n in sorted(counts.items(), key=lambda kv: str(kv[0])))
+        print(f"\n--- {len(recipients)} unique address(es) in {elapsed:.1f}s | {summary} ---", file=sys.stderr)
 
 
 if __name__ == "__main__":
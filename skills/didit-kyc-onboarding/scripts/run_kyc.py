@@ -2,35 +2,51 @@
 """Didit KYC — Create a KYC workflow, session, and retrieve decisions.
 
 Usage:
-    python scripts/run_kyc.py setup [--label NAME] [--liveness] [--face-match] [--aml] [--nfc]
+    python scripts/run_kyc.py setup [--label NAME] [--liveness] [--face-match] [--aml] [--nfc] [--new]
     python scripts/run_kyc.py session --workflow-id UUID [--vendor-data ID] [--callback URL]
     python scripts/run_kyc.py decision <session_id> [--poll] [--interval SECONDS]
-    python scripts/run_kyc.py full [--vendor-data ID] [--callback URL] [--label NAME]
+    python scripts/run_kyc.py full [--vendor-data ID] [--callback URL] [--label NAME] [--new]
+    python scripts/run_kyc.py watch [<session_id> ...] [--file IDS] [--rate-per-min N] [--interval S] [--max-wait S]
 
 Commands:
-    setup     Create a KYC workflow (one-time — reuse the workflow_id)
+    setup     Create a KYC workflow, or reuse an existing one with the same configuration
     session   Create a verification session for a user
     decision  Get the verification decision for a session
-    full      Full flow: create workflow + session in one command
+    full      Full flow: workflow (reused when one matches) + session in one command
+    watch     Poll many sessions in one process; print each decision (NDJSON) as it resolves
 
 Environment:
-    DIDIT_API_KEY - Required. Your Didit API key.
+    DIDIT_API_KEY        - Required. Your Didit API key.
+    DIDIT_WORKFLOW_CACHE - Workflow registry file (default: ~/.cache/didit/workflows.json).
 
 Examples:
     python scripts/run_kyc.py setup --label "Onboarding KYC" --liveness --face-match
     python scripts/run_kyc.py session --workflow-id d8d2fa2d-... --vendor-data user-123
     python scripts/run_kyc.py decision 11111111-2222-... --poll --interval 15
     python scripts/run_kyc.py full --vendor-data user-abc --callback https://myapp.com/done
+    python scripts/run_kyc.py watch --file session_ids.txt --rate-per-min 90 > decisions.ndjson
 """
 import argparse
+import asyncio
+import heapq
+import itertools
 import json
 import os
+import random
 import sys
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 
 import requests
 
+try:
+    from workflow_registry import DEFAULT_TTL, WorkflowRegistry
+except ImportError:
+    from .workflow_registry import DEFAULT_TTL, WorkflowRegistry
+
 BASE_URL = "https://verification.didit.me/v3"
+TERMINAL_STATUSES = {"Approved", "Declined", "In Review", "Expired"}
 
 
 def get_headers(content_type=False) -> dict:
@@ -44,9 +60,8 @@ def get_headers(content_type=False) -> dict:
     return h
 
 
-def setup_kyc_workflow(label="KYC Onboarding", liveness=True, face_match=True,
-                       aml=False, nfc=False) -> dict:
-    """Create a KYC workflow with recommended defaults."""
+def kyc_workflow_payload(label="KYC Onboarding", liveness=True, face_match=True,
+                         aml=False, nfc=False) -> dict:
     payload = {
         "workflow_label": label,
         "workflow_type": "kyc",
@@ -60,13 +75,51 @@ def setup_kyc_workflow(label="KYC Onboarding", liveness=True, face_match=True,
         payload["aml_decline_threshold"] = 80
     if nfc:
         payload["is_nfc_enabled"] = True
+    return payload
+
+
+def find_kyc_workflow(payload: dict, registry: WorkflowRegistry) -> dict:
+    """An existing workflow on the account whose configuration matches `payload`, or None.
+
+    See WorkflowRegistry.lookup: a stale or missing cache entry never leads to a duplicate workflow.
+    """
+    def list_workflows():
+        r = requests.get(f"{BASE_URL}/workflows/", headers=get_headers(), timeout=30)
+        if r.status_code != 200:
+            print(f"Error {r.status_code}: {r.text}", file=sys.stderr)
+            sys.exit(1)
+        return r.json()
+
+    def get_workflow(uuid):
+        r = requests.get(f"{BASE_URL}/workflows/{uuid}/", headers=get_headers(), timeout=30)
+        return r.json() if r.status_code == 200 else None
+
+    return registry.lookup(payload, list_workflows, get_workflow)
+
+
+def setup_kyc_workflow(label="KYC Onboarding", liveness=True, face_match=True,
+                       aml=False, nfc=False, registry: WorkflowRegistry = None, reuse: bool = True) -> dict:
+    """Create a KYC workflow with recommended defaults.
+
+    With a `registry`, an existing workflow with the same configuration is returned instead
+    (marked `"reused": True`) unless `reuse=False`; see find_kyc_workflow. Newly created
+    workflows are added to the registry.
+    """
+    payload = kyc_workflow_payload(label, liveness, face_match, aml, nfc)
+    if registry is not None and reuse:
+        existing = find_kyc_workflow(payload, registry)
+        if existing is not None:
+            return dict(existing, reused=True)
 
     r = requests.post(f"{BASE_URL}/workflows/", headers=get_headers(content_type=True),
                       json=payload, timeout=30)
     if r.status_code not in (200, 201):
         print(f"Error {r.status_code}: {r.text}", file=sys.stderr)
         sys.exit(1)
-    return r.json()
+    workflow = r.json()
+    if registry is not None:
+        registry.put(workflow, config=payload)
+    return workflow
 
 
 def create_kyc_session(workflow_id: str, vendor_data: str = None,
@@ -100,13 +153,12 @@ def get_decision(session_id: str) -> dict:
 
 def poll_decision(session_id: str, interval: int = 10, max_wait: int = 600) -> dict:
     """Poll until a terminal status is reached or timeout."""
-    terminal = {"Approved", "Declined", "In Review", "Expired"}
     elapsed = 0
     while elapsed < max_wait:
         result = get_decision(session_id)
         status = result.get("status", "")
         print(f"  [{elapsed}s] Status: {status}")
-        if status in terminal:
+        if status in TERMINAL_STATUSES:
             return result
         time.sleep(interval)
         elapsed += interval
@@ -114,6 +166,152 @@ def poll_decision(session_id: str, interval: int = 10, max_wait: int = 600) -> d
     return result
 
 
+class AsyncRateLimiter:
+    """Spaces awaits evenly at `rate` per second within one event loop."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate and rate > 0 else 0.0
+        self._next = 0.0
+
+    async def acquire(self):
+        if not self.interval:
+            return
+        now = asyncio.get_running_loop().time()
+        slot = max(now, self._next)
+        self._next = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+_thread_local = threading.local()
+
+
+def _fetch_decision(session_id: str, headers: dict):
+    """Blocking GET of one decision; returns (http_status, body). Runs in the executor."""
+    session = getattr(_thread_local, "session", None)
+    if session is None:
+        session = _thread_local.session = requests.Session()
+    try:
+        r = session.get(f"{BASE_URL}/session/{session_id}/decision/", headers=headers, timeout=30)
+    except requests.RequestException as e:
+        return None, {"error": str(e)}
+    try:
+        return r.status_code, r.json()
+    except ValueError:
+        return r.status_code, {"error": r.text}
+
+
+async def poll_decisions(session_ids, rate_per_min: float = 100, interval: float = 10,
+                         max_interval: float = 300, max_wait: float = 3600, workers: int = 8):
+    """Track many sessions in one event loop; async-yields each session's outcome once.
+
+    Pending sessions sit in a heap ordered by next-check time. Every check is paced by a
+    shared limiter (`rate_per_min`, documented decision polling limit is 100/min); a
+    non-terminal result re-checks the session after its current delay, which starts at
+    `interval` and doubles after each re-check (up to `max_interval`). A 429/5xx re-checks
+    after the same delay without doubling it. A check that raises is logged and re-queued
+    on the same backoff.
+    Yields `{"session_id", "status", "checks", "elapsed", "result"}` when a session
+    reaches a terminal status, fails permanently, or exceeds `max_wait`.
+    """
+    loop = asyncio.get_running_loop()
+    headers = get_headers()
+    limiter = AsyncRateLimiter(rate_per_min / 60)
+    executor = ThreadPoolExecutor(max_workers=workers)
+    results = asyncio.Queue()
+    changed = asyncio.Event()
+    seq = itertools.count()
+    start = loop.time()
+    heap = [(start, next(seq), sid, interval, 0) for sid in dict.fromkeys(session_ids)]
+    heapq.heapify(heap)
+    in_flight = 0
+
+    def requeue(session_id, wait, next_delay, checks, now):
+        due = min(now + wait * random.uniform(0.9, 1.1), start + max_wait)
+        heapq.heappush(heap, (due, next(seq), session_id, next_delay, checks))
+
+    async def check(session_id, delay, checks):
+        nonlocal in_flight
+        checks += 1
+        try:
+            code, body = await loop.run_in_executor(executor, _fetch_decision, session_id, headers)
+            now = loop.time()
+            status = body.get("status") if code == 200 else None
+            done = {"session_id": session_id, "checks": checks, "elapsed": round(now - start, 1)}
+            if status in TERMINAL_STATUSES:
+                await results.put(dict(done, status=status, result=body))
+            elif code is not None and code not in (200, 429) and code < 500:
+                await results.put(dict(done, status=f"Error {code}", result=body))
+            elif now - start >= max_wait:
+                await results.put(dict(done, status="Timeout", last_status=status, result=body))
+            else:
+                requeue(session_id, delay, min(delay * 2, max_interval) if code == 200 else delay, checks, now)
+        except Exception as e:
+            # An unexpected failure (bad body, executor error) must not drop the session
+            print(f"Check of {session_id} failed: {e!r}; retrying", file=sys.stderr)
+            now = loop.time()
+            if now - start >= max_wait:
+                await results.put({"session_id": session_id, "checks": checks, "elapsed": round(now - start, 1),
+                                   "status": "Timeout", "error": repr(e)})
+            else:
+                requeue(session_id, delay, min(delay * 2, max_interval), checks, now)
+        finally:
+            in_flight -= 1
+            changed.set()
+
+    async def dispatch():
+        nonlocal in_flight
+        while heap or in_flight:
+            if not heap:
+                changed.clear()
+                await changed.wait()
+                continue
+            wait = heap[0][0] - loop.time()
+            if wait > 0:
+                changed.clear()
+                try:
+                    await asyncio.wait_for(changed.wait(), wait)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await limiter.acquire()
+            _, _, session_id, delay, checks = heapq.heappop(heap)
+            in_flight += 1
+            loop.create_task(check(session_id, delay, checks))
+        await results.put(None)
+
+    dispatcher = loop.create_task(dispatch())
+    try:
+        while True:
+            item = await results.get()
+            if item is None:
+                break
+            yield item
+    finally:
+        dispatcher.cancel()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def read_session_ids(args_ids: list, path: str = None) -> list:
+    ids = list(args_ids or [])
+    if path:
+        with open(path, encoding="utf-8") as f:
+            ids.extend(line.strip() for line in f if line.strip() and not line.startswith("#"))
+    return ids
+
+
+async def _watch(session_ids, args):
+    counts = {}
+    async for outcome in poll_decisions(session_ids, args.rate_per_min, args.interval,
+                                        args.max_interval, args.max_wait, args.workers):
+        if not args.full:
+            outcome.pop("result", None)
+        sys.stdout.write(json.dumps(outcome) + "\n")
+        sys.stdout.flush()
+        counts[outcome["status"]] = counts.get(outcome["status"], 0) + 1
+    return counts
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Didit KYC — End-to-end identity verification",
@@ -135,6 +333,9 @@ def main():
                          help="Disable face match")
     setup_p.add_argument("--aml", action="store_true", help="Enable AML screening")
     setup_p.add_argument("--nfc", action="store_true", help="Enable NFC chip reading")
+    setup_p.add_argument("--new", action="store_true", help="Always create, even if a matching workflow exists")
+    setup_p.add_argument("--cache-ttl", type=float, default=DEFAULT_TTL,
+                         help="Seconds a cached workflow is trusted without listing (default: 3600)")
 
     # session
     sess_p = sub.add_parser("session", help="Create a verification session")
@@ -157,14 +358,30 @@ def main():
     full_p.add_argument("--label", default="KYC Onboarding", help="Workflow display name")
     full_p.add_argument("--aml", action="store_true", help="Enable AML screening")
     full_p.add_argument("--nfc", action="store_true", help="Enable NFC chip reading")
+    full_p.add_argument("--new", action="store_true", help="Always create, even if a matching workflow exists")
+    full_p.add_argument("--cache-ttl", type=float, default=DEFAULT_TTL,
+                        help="Seconds a cached workflow is trusted without listing (default: 3600)")
+
+    # watch
+    watch_p = sub.add_parser("watch", help="Poll many sessions in one process until each resolves")
+    watch_p.add_argument("session_ids", nargs="*", help="Session UUIDs")
+    watch_p.add_argument("--file", help="File with one session UUID per line")
+    watch_p.add_argument("--rate-per-min", type=float, default=100,
+                         help="Global decision requests per minute (default: 100)")
+    watch_p.add_argument("--interval", type=float, default=10, help="Delay before the first re-check, doubled after each (default: 10)")
+    watch_p.add_argument("--max-interval", type=float, default=300,
+                         help="Backoff ceiling per session in seconds (default: 300)")
+    watch_p.add_argument("--max-wait", type=float, default=3600, help="Give up on a session after this many seconds")
+    watch_p.add_argument("--workers", type=int, default=8, help="Concurrent HTTP requests (default: 8)")
+    watch_p.add_argument("--full", action="store_true", help="Include the full decision in each line")
 
     args = parser.parse_args()
 
     if args.command == "setup":
-        result = setup_kyc_workflow(args.label, args.liveness, args.face_match,
-                                    args.aml, args.nfc)
+        result = setup_kyc_workflow(args.label, args.liveness, args.face_match, args.aml, args.nfc,
+                                    registry=WorkflowRegistry(ttl=args.cache_ttl), reuse=not args.new)
         print(json.dumps(result, indent=2))
-        print(f"\n--- KYC Workflow Created ---")
+        print(f"\n--- KYC Workflow {'Reused' if result.get('reused') else 'Created'} ---")
         print(f"Workflow ID: {result.get('uuid')}")
         print(f"Type: {result.get('workflow_type')}")
         print(f"Price per session: ${result.get('total_price', '?')}")
@@ -197,10 +414,11 @@ def main():
                 print(f"Document: {id_data.get('document_type', '')} ({id_data.get('issuing_country', '')})")
 
     elif args.command == "full":
-        print("Step 1: Creating KYC workflow...")
-        workflow = setup_kyc_workflow(args.label, aml=args.aml, nfc=args.nfc)
+        print("Step 1: Finding or creating KYC workflow...")
+        workflow = setup_kyc_workflow(args.label, aml=args.aml, nfc=args.nfc,
+                                      registry=WorkflowRegistry(ttl=args.cache_ttl), reuse=not args.new)
         workflow_id = workflow.get("uuid")
-        print(f"  Workflow ID: {workflow_id}")
+        print(f"  Workflow ID: {workflow_id}{' (reused)' if workflow.get('reused') else ''}")
         print(f"  Price per session: ${workflow.get('total_price', '?')}")
 
         print("\nStep 2: Creating verification session...")
@@ -211,6 +429,16 @@ def main():
         print(f"Send this URL to your user: {session.get('url')}")
         print(f"Then run: python scripts/run_kyc.py decision {session.get('session_id')} --poll")
 
+    elif args.command == "watch":
+        session_ids = read_session_ids(args.session_ids, args.file)
+        if not session_ids:
+            print("No session IDs given. Pass UUIDs or --file.", file=sys.stderr)
+            sys.exit(1)
+        print(f"Watching {len(session_ids)} session(s) at {args.rate_per_min:g} checks/min...", file=sys.stderr)
+        counts = asyncio.run(_watch(session_ids, args))
+        summary = ", ".join(f"{status}: {n}" for status, n in sorted(counts.items()))
+        print(f"\n--- {summary or 'nothing resolved'} ---", file=sys.stderr)
+
 
 if __name__ == "__main__":
     main()
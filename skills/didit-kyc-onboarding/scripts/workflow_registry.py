@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""Local workflow registry for Didit workflows.
+
+Caches workflow definitions on disk with a TTL and indexes them by a hash of their
+configuration (type, liveness, face match, AML, NFC, thresholds, retries), so a
+workflow with the same settings can be found without listing or creating one.
+Entries are kept per API key; the label is not part of the configuration hash.
+
+The same file format is shared by manage_workflows.py and run_kyc.py. Saves hold a
+cross-process lock (file_lock.py) and re-apply this process's changes on top of the
+file as it is on disk, so concurrent runs don't overwrite each other's entries.
+
+Environment:
+    DIDIT_WORKFLOW_CACHE - Cache file (default: ~/.cache/didit/workflows.json).
+
+Usage:
+    from scripts.workflow_registry import WorkflowRegistry
+    registry = WorkflowRegistry(ttl=3600)
+    workflow = registry.find({"workflow_type": "kyc", "is_liveness_enabled": True})
+    workflow = registry.lookup(config, list_workflows, get_workflow)  # goes to the API on a miss
+"""
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+try:
+    from file_lock import locked
+except ImportError:
+    from .file_lock import locked
+
+CACHE_VERSION = 1
+DEFAULT_TTL = 3600
+CONFIG_FLAGS = ("is_liveness_enabled", "is_face_match_enabled", "is_aml_enabled", "is_nfc_enabled",
+                "is_phone_verification_enabled", "is_email_verification_enabled", "is_ip_analysis_enabled")
+CONFIG_VALUES = ("workflow_type", "face_match_score_decline_threshold", "aml_decline_threshold",
+                 "max_retry_attempts")
+
+
+def default_cache_path() -> str:
+    return os.environ.get("DIDIT_WORKFLOW_CACHE") or os.path.join(
+        os.path.expanduser("~"), ".cache", "didit", "workflows.json")
+
+
+def normalize_config(config: dict) -> dict:
+    """The fields that define a workflow's behaviour; missing flags count as disabled."""
+    normalized = {flag: bool(config.get(flag)) for flag in CONFIG_FLAGS}
+    normalized.update({key: config.get(key) for key in CONFIG_VALUES})
+    normalized["workflow_type"] = normalized["workflow_type"] or "kyc"
+    return normalized
+
+
+def config_hash(config: dict) -> str:
+    canonical = json.dumps(normalize_config(config), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode()).hexdigest()[:16]
+
+
+def is_complete(workflow: dict) -> bool:
+    """True when a workflow dict carries every flag, so its hash reflects the real config."""
+    return all(flag in workflow for flag in CONFIG_FLAGS[:4])
+
+
+class WorkflowRegistry:
+    """TTL cache of workflows for one API key, indexed by uuid and configuration hash."""
+
+    def __init__(self, path: str = None, ttl: float = DEFAULT_TTL, api_key: str = None):
+        self.path = path or default_cache_path()
+        self.ttl = ttl
+        api_key = api_key or os.environ.get("DIDIT_API_KEY", "")
+        self.account = hashlib.sha256(api_key.encode()).hexdigest()[:12]
+        self._changes = []
+        self._attach(self._load())
+
+    def _attach(self, data: dict):
+        self._data = data
+        self._account = data["accounts"].setdefault(self.account, {"listed_at": 0, "workflows": {}})
+        self._by_hash = {}
+        for uuid, entry in self._account["workflows"].items():
+            if entry.get("hash"):
+                self._by_hash.setdefault(entry["hash"], []).append(uuid)
+
+    def _load(self) -> dict:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == CACHE_VERSION:
+                return data
+        except (OSError, ValueError):
+            pass
+        return {"version": CACHE_VERSION, "accounts": {}}
+
+    def save(self):
+        """Merge this process's changes into the file under the lock, then write atomically."""
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        with locked(self.path):
+            data = self._load()
+            account = data["accounts"].setdefault(self.account, {"listed_at": 0, "workflows": {}})
+            for change in self._changes:
+                if change[0] == "put":
+                    account["workflows"][change[1]] = change[2]
+                elif change[0] == "remove":
+                    account["workflows"].pop(change[1], None)
+                else:  # a full listing replaces everything cached before it
+                    account.update(workflows={}, listed_at=change[1])
+            self._changes = []
+            fd, tmp = tempfile.mkstemp(dir=directory, prefix=".workflows-", suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=1)
+            os.replace(tmp, self.path)
+        self._attach(data)
+
+    def _fresh(self, cached_at: float, now: float) -> bool:
+        return now - cached_at < self.ttl
+
+    def _index(self, uuid: str, entry: dict):
+        old = self._account["workflows"].get(uuid)
+        if old and old.get("hash") in self._by_hash:
+            self._by_hash[old["hash"]] = [u for u in self._by_hash[old["hash"]] if u != uuid]
+        self._account["workflows"][uuid] = entry
+        self._changes.append(("put", uuid, entry))
+        if entry.get("hash"):
+            self._by_hash.setdefault(entry["hash"], []).append(uuid)
+
+    def get(self, uuid: str, now: float = None):
+        """Cached workflow by uuid, or None if missing or older than the TTL."""
+        now = time.time() if now is None else now
+        entry = self._account["workflows"].get(uuid)
+        if entry and self._fresh(entry["cached_at"], now):
+            return entry["workflow"]
+        return None
+
+    def find(self, config: dict, now: float = None, fresh_only: bool = True):
+        """A cached workflow whose configuration matches `config`, or None.
+
+        Pass `fresh_only=False` right after refreshing from the API to ignore the TTL.
+        """
+        now = time.time() if now is None else now
+        for uuid in self._by_hash.get(config_hash(config), ()):
+            entry = self._account["workflows"][uuid]
+            if not fresh_only or self._fresh(entry["cached_at"], now):
+                return entry["workflow"]
+        return None
+
+    def listed(self, now: float = None):
+        """Every cached workflow if the last full list is within the TTL, else None."""
+        now = time.time() if now is None else now
+        if not self._fresh(self._account["listed_at"], now):
+            return None
+        return [entry["workflow"] for entry in self._account["workflows"].values()]
+
+    def put(self, workflow: dict, config: dict = None, now: float = None, save: bool = True):
+        """Cache a workflow. `config` (e.g. the create payload) fills fields the response omits."""
+        uuid = workflow.get("uuid")
+        if not uuid:
+            return
+        merged = dict(config or {}, **workflow)
+        complete = config is not None or is_complete(workflow)
+        self._index(uuid, {"workflow": workflow, "hash": config_hash(merged) if complete else None,
+                           "cached_at": time.time() if now is None else now})
+        if save:
+            self.save()
+
+    def replace_all(self, workflows: list, now: float = None):
+        """Replace the account's cache with a fresh full listing."""
+        now = time.time() if now is None else now
+        previous = self._account["workflows"]
+        self._account["workflows"] = {}
+        self._account["listed_at"] = now
+        self._by_hash = {}
+        self._changes.append(("listed", now))
+        for workflow in workflows:
+            uuid = workflow.get("uuid")
+            old = previous.get(uuid)
+            if old and not is_complete(workflow) and old.get("hash"):
+                # Keep the detail-derived hash; list entries may omit config fields.
+                self._index(uuid, dict(old, workflow=dict(old["workflow"], **workflow), cached_at=now))
+            else:
+                self.put(workflow, now=now, save=False)
+        self.save()
+
+    def unhashed(self) -> list:
+        """UUIDs cached without a configuration hash (listed but never fetched in full)."""
+        return [uuid for uuid, entry in self._account["workflows"].items() if not entry.get("hash")]
+
+    def lookup(self, config: dict, list_workflows, get_workflow):
+        """A workflow on the account whose configuration matches `config`, or None.
+
+        A fresh entry answers directly. Otherwise `list_workflows()` (the account's
+        workflows) refreshes the cache, and listed workflows of the same type whose
+        configuration isn't known yet are fetched with `get_workflow(uuid)` (the full
+        workflow, or None), so a stale or missing entry is never taken for "no match".
+        """
+        found = self.find(config)
+        if found is not None:
+            return found
+        listed = {w.get("uuid"): w for w in list_workflows()}
+        self.replace_all(list(listed.values()))
+        found = self.find(config, fresh_only=False)
+        if found is not None:
+            return found
+        wf_type = config.get("workflow_type")
+        unknown = [uuid for uuid in self.unhashed() if listed.get(uuid, {}).get("workflow_type", wf_type) == wf_type]
+        for uuid in unknown:
+            workflow = get_workflow(uuid)
+            if workflow is not None:
+                self.put(workflow, save=False)
+        if unknown:
+            self.save()
+            found = self.find(config, fresh_only=False)
+        return found
+
+    def remove(self, uuid: str):
+        entry = self._account["workflows"].pop(uuid, None)
+        self._changes.append(("remove", uuid))
+        if entry and entry.get("hash") in self._by_hash:
+            self._by_hash[entry["hash"]] = [u for u in self._by_hash[entry["hash"]] if u != uuid]
+        self.save()
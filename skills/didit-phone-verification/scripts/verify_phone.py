@@ -2,8 +2,11 @@
 """Didit Phone Verification - Send and check phone OTP codes.
 
 Usage:
-    python scripts/verify_phone.py send <phone> [--channel sms|whatsapp|telegram|voice] [--code-size <4-8>]
-    python scripts/verify_phone.py check <phone> <code> [--decline-disposable] [--decline-voip]
+    python scripts/verify_phone.py send <phone> [--channel sms|whatsapp|telegram|voice] [--code-size <4-8>] [--state-db PATH]
+    python scripts/verify_phone.py check <phone> <code> [--decline-disposable] [--decline-voip] [--state-db PATH]
+    python scripts/verify_phone.py bulk-send <file> [--default-country CC] [--channels whatsapp,sms] [--rate N]
+                                             [--workers N] [--output results.jsonl] [--stats stats.json]
+                                             [--state-db PATH]
 
 Environment:
     DIDIT_API_KEY - Required. Your Didit API key.
@@ -13,16 +16,49 @@ Examples:
     python scripts/verify_phone.py send +14155552671 --channel sms
     python scripts/verify_phone.py check +14155552671 123456
     python scripts/verify_phone.py check +14155552671 123456 --decline-voip
+    python scripts/verify_phone.py send +14155552671 --state-db otp_state.db
+    python scripts/verify_phone.py bulk-send phones.txt --default-country ES --channels whatsapp,sms --stats stats.json
 """
 import argparse
 import json
 import os
+import re
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 import requests
 
+try:
+    from otp_store import OTPTracker, SQLiteOTPStore
+except ImportError:
+    from .otp_store import OTPTracker, SQLiteOTPStore
+
 BASE_URL = "https://verification.didit.me/v3/phone"
 
+# ISO 3166-1 alpha-2 -> country calling code, used to expand national numbers.
+CALLING_CODES = {
+    "US": "1", "CA": "1", "MX": "52", "BR": "55", "AR": "54", "CL": "56", "CO": "57", "PE": "51",
+    "VE": "58", "EC": "593", "UY": "598", "PY": "595", "BO": "591", "GB": "44", "IE": "353",
+    "ES": "34", "PT": "351", "FR": "33", "DE": "49", "IT": "39", "NL": "31", "BE": "32",
+    "LU": "352", "CH": "41", "AT": "43", "DK": "45", "SE": "46", "NO": "47", "FI": "358",
+    "PL": "48", "CZ": "420", "SK": "421", "HU": "36", "RO": "40", "BG": "359", "GR": "30",
+    "HR": "385", "SI": "386", "RS": "381", "UA": "380", "TR": "90", "RU": "7", "IL": "972",
+    "AE": "971", "SA": "966", "QA": "974", "EG": "20", "MA": "212", "NG": "234", "KE": "254",
+    "ZA": "27", "IN": "91", "PK": "92", "BD": "880", "CN": "86", "HK": "852", "JP": "81",
+    "KR": "82", "TW": "886", "SG": "65", "MY": "60", "TH": "66", "VN": "84", "PH": "63",
+    "ID": "62", "AU": "61", "NZ": "64",
+}
+# Countries whose national numbers keep the leading 0 after the calling code.
+KEEP_TRUNK_ZERO = {"IT"}
+
+_CALLING_CODE_RE = re.compile(
+    r"^\+(" + "|".join(sorted(set(CALLING_CODES.values()), key=len, reverse=True)) + ")"
+)
+_PUNCTUATION_RE = re.compile(r"[\s().\-/]")
+_E164_RE = re.compile(r"^\+[1-9]\d{6,14}$")
+
 
 def get_headers() -> dict:
     api_key = os.environ.get("DIDIT_API_KEY")
@@ -32,7 +68,101 @@ def get_headers() -> dict:
     return {"x-api-key": api_key, "Content-Type": "application/json"}
 
 
-def send_code(phone: str, channel: str = "whatsapp", code_size: int = 6, vendor_data: str = None) -> dict:
+def normalize_phone(raw: str, default_country: str = None):
+    """Normalize a phone number to E.164, or return None if it can't be.
+
+    Numbers without a `+` or `00` international prefix are treated as national
+    numbers of `default_country` (alpha-2) and have their trunk `0` dropped.
+    """
+    number = _PUNCTUATION_RE.sub("", raw.strip())
+    if number.startswith("00"):
+        number = "+" + number[2:]
+    if not number.startswith("+"):
+        code = CALLING_CODES.get((default_country or "").upper())
+        if not code:
+            return None
+        if default_country.upper() not in KEEP_TRUNK_ZERO:
+            number = number.lstrip("0")
+        number = f"+{code}{number}"
+    return number if _E164_RE.match(number) else None
+
+
+def calling_code(e164: str) -> str:
+    """Country calling code (e.g. `+44`) of an E.164 number, or `+?` if unknown."""
+    m = _CALLING_CODE_RE.match(e164)
+    return f"+{m.group(1)}" if m else "+?"
+
+
+class RateLimiter:
+    """Thread-safe limiter that spaces calls evenly at `rate` calls per second."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate and rate > 0 else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class ChannelStats:
+    """Thread-safe delivery counters and latencies per (calling code, channel)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def add(self, country: str, channel: str, delivered: bool, latency: float):
+        with self._lock:
+            entry = self._stats.setdefault((country, channel), {"latencies": [], "delivered": 0, "failed": 0})
+            entry["latencies"].append(latency)
+            entry["delivered" if delivered else "failed"] += 1
+
+    def summary(self) -> dict:
+        """`{country: {channel: {...}, "fastest": channel}}` with latencies in ms."""
+        report = {}
+        with self._lock:
+            items = sorted(self._stats.items())
+        for (country, channel), entry in items:
+            latencies = sorted(entry["latencies"])
+            attempts = len(latencies)
+            report.setdefault(country, {})[channel] = {
+                "attempts": attempts,
+                "delivered": entry["delivered"],
+                "failed": entry["failed"],
+                "success_rate": round(entry["delivered"] / attempts, 4),
+                "p50_ms": round(latencies[attempts // 2] * 1000, 1),
+                "p95_ms": round(latencies[min(attempts - 1, int(attempts * 0.95))] * 1000, 1),
+            }
+        for channels in report.values():
+            delivering = {ch: st for ch, st in channels.items() if st["delivered"]}
+            if delivering:
+                channels["fastest"] = min(delivering, key=lambda ch: delivering[ch]["p50_ms"])
+        return report
+
+
+_thread_local = threading.local()
+
+
+def _http() -> requests.Session:
+    """One pooled HTTP session per worker thread."""
+    session = getattr(_thread_local, "session", None)
+    if session is None:
+        session = _thread_local.session = requests.Session()
+    return session
+
+
+def send_code(phone: str, channel: str = "whatsapp", code_size: int = 6, vendor_data: str = None,
+              tracker: OTPTracker = None) -> dict:
+    """Send a code. With a `tracker`, sends inside the resend cooldown/limit are skipped locally."""
+    key = normalize_phone(phone) or phone  # same tracker key as bulk_send
     payload = {
         "phone_number": phone,
         "options": {"preferred_channel": channel, "code_size": code_size},
@@ -40,16 +170,30 @@ def send_code(phone: str, channel: str = "whatsapp", code_size: int = 6, vendor_
     if vendor_data:
         payload["vendor_data"] = vendor_data
 
+    if tracker is not None:
+        claim = tracker.reserve_send(key)
+        if not claim["allowed"]:
+            return {"status": "Skipped", "reason": claim["reason"],
+                    "retry_after": claim["retry_after"], "local": True}
+
     response = requests.post(f"{BASE_URL}/send/", headers=get_headers(), json=payload, timeout=30)
 
     if response.status_code not in (200, 429):
+        if tracker is not None:
+            tracker.record_send(key, delivered=False)
         print(f"Error {response.status_code}: {response.text}", file=sys.stderr)
         sys.exit(1)
 
-    return response.json()
+    result = response.json()
+    if tracker is not None:
+        tracker.record_send(key, delivered=result.get("status") == "Success")
+    return result
 
 
-def check_code(phone: str, code: str, decline_disposable: bool = False, decline_voip: bool = False) -> dict:
+def check_code(phone: str, code: str, decline_disposable: bool = False, decline_voip: bool = False,
+               tracker: OTPTracker = None) -> dict:
+    """Check a code. With a `tracker`, checks on an expired code or with no attempts left are answered locally."""
+    key = normalize_phone(phone) or phone
     payload = {
         "phone_number": phone,
         "code": code,
@@ -57,13 +201,109 @@ def check_code(phone: str, code: str, decline_disposable: bool = False, decline_
         "voip_number_action": "DECLINE" if decline_voip else "NO_ACTION",
     }
 
-    response = requests.post(f"{BASE_URL}/check/", headers=get_headers(), json=payload, timeout=30)
+    if tracker is not None:
+        claim = tracker.reserve_check(key)
+        if not claim["allowed"]:
+            return {"status": claim["status"], "reason": claim["reason"], "local": True}
+
+    try:
+        response = requests.post(f"{BASE_URL}/check/", headers=get_headers(), json=payload, timeout=30)
+    except requests.RequestException:
+        if tracker is not None:
+            tracker.release_check(key)
+        raise
 
     if response.status_code not in (200, 404):
+        if tracker is not None:
+            tracker.release_check(key)
         print(f"Error {response.status_code}: {response.text}", file=sys.stderr)
         sys.exit(1)
 
-    return response.json()
+    result = response.json()
+    if tracker is not None:
+        tracker.record_check(key, result.get("status"))
+    return result
+
+
+def read_numbers(path: str, default_country: str = None):
+    """Read `phone[,vendor_data]` lines; returns (unique E.164 numbers, rejected raw values)."""
+    seen = set()
+    numbers, rejected = [], []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            raw, _, vendor_data = line.partition(",")
+            phone = normalize_phone(raw, default_country)
+            if phone is None:
+                rejected.append(raw)
+            elif phone not in seen:
+                seen.add(phone)
+                numbers.append((phone, vendor_data.strip() or None))
+    return numbers, rejected
+
+
+def bulk_send(numbers: list, channels=("whatsapp", "sms"), code_size: int = 6,
+              rate: float = 10.0, workers: int = 8, stats: ChannelStats = None, tracker: OTPTracker = None):
+    """Send codes to many E.164 numbers concurrently with ordered channel fallback.
+
+    Each number is tried on `channels` in order until one returns "Success";
+    "Blocked" stops the fallback since no channel will get through. Yields one
+    result dict per number as sends complete; per-channel outcomes and
+    latencies are recorded into `stats`.
+
+    With a `tracker`, every channel attempt is reserved and recorded like
+    send_code(), so a later `check --state-db` knows the code is pending; numbers
+    inside their resend cooldown/limit stop with status "Skipped".
+    """
+    headers = get_headers()
+    limiter = RateLimiter(rate)
+
+    def send_one(phone, vendor_data):
+        country = calling_code(phone)
+        record = {"phone_number": phone, "vendor_data": vendor_data, "country_code": country, "tried": []}
+        for i, channel in enumerate(channels):
+            payload = {
+                "phone_number": phone,
+                "options": {"preferred_channel": channel, "code_size": code_size},
+            }
+            if vendor_data:
+                payload["vendor_data"] = vendor_data
+            if tracker is not None:
+                claim = tracker.reserve_send(phone)
+                if not claim["allowed"]:
+                    record.update(status="Skipped", reason=claim["reason"], retry_after=claim["retry_after"])
+                    break
+            limiter.acquire()
+            started = time.monotonic()
+            try:
+                r = _http().post(f"{BASE_URL}/send/", headers=headers, json=payload, timeout=30)
+                body = r.json() if r.status_code in (200, 429) else {}
+                status = body.get("status") if r.status_code == 200 else f"HTTP {r.status_code}"
+            except (requests.RequestException, ValueError) as e:
+                status, body = "Error", {"reason": str(e)}
+            latency = time.monotonic() - started
+            delivered = status == "Success"
+            if tracker is not None:
+                # A send that timed out may still have delivered a code, so the last channel keeps
+                # it pending. Before a fallback it is released, or the cooldown would refuse the fallback.
+                last = i == len(channels) - 1
+                tracker.record_send(phone, delivered=delivered or (status == "Error" and last))
+            if stats is not None:
+                stats.add(country, channel, delivered, latency)
+            record["tried"].append({"channel": channel, "status": status,
+                                    "latency_ms": round(latency * 1000, 1)})
+            record.update(channel=channel, status=status, reason=body.get("reason"),
+                          request_id=body.get("request_id"))
+            if delivered or status == "Blocked":
+                break
+        return record
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(send_one, phone, vendor_data) for phone, vendor_data in numbers]
+        for future in as_completed(futures):
+            yield future.result()
 
 
 def main():
@@ -75,23 +315,70 @@ def main():
     send_p.add_argument("--channel", default="whatsapp", choices=["sms", "whatsapp", "telegram", "voice"], help="Delivery channel (default: whatsapp)")
     send_p.add_argument("--code-size", type=int, default=6, help="Code length 4-8 (default: 6)")
     send_p.add_argument("--vendor-data", help="Unique identifier for session tracking")
+    send_p.add_argument("--state-db", help="SQLite OTP state file; skips sends inside the resend cooldown/limit")
 
     check_p = sub.add_parser("check", help="Check verification code")
     check_p.add_argument("phone", help="Phone number in E.164 format")
     check_p.add_argument("code", help="Verification code received")
     check_p.add_argument("--decline-disposable", action="store_true", help="Decline disposable numbers")
+    check_p.add_argument("--state-db", help="SQLite OTP state file; answers checks with no pending code locally")
     check_p.add_argument("--decline-voip", action="store_true", help="Decline VoIP numbers")
 
+    bulk_p = sub.add_parser("bulk-send", help="Send codes to every number in a file with channel fallback")
+    bulk_p.add_argument("file", help="File with one `phone[,vendor_data]` per line")
+    bulk_p.add_argument("--default-country", help="Alpha-2 country for numbers without +/00 prefix (e.g. ES)")
+    bulk_p.add_argument("--channels", default="whatsapp,sms",
+                        help="Comma-separated channel fallback order (default: whatsapp,sms)")
+    bulk_p.add_argument("--code-size", type=int, default=6, help="Code length 4-8 (default: 6)")
+    bulk_p.add_argument("--rate", type=float, default=10.0, help="Global sends per second (default: 10)")
+    bulk_p.add_argument("--workers", type=int, default=8, help="Concurrent requests (default: 8)")
+    bulk_p.add_argument("--output", help="JSONL results file (default: stdout)")
+    bulk_p.add_argument("--state-db", help="SQLite OTP state file to record sends in for `check --state-db`")
+    bulk_p.add_argument("--stats", help="Write per-country/per-channel delivery stats JSON here")
+
     args = parser.parse_args()
+    tracker = OTPTracker(SQLiteOTPStore(args.state_db)) if getattr(args, "state_db", None) else None
 
     if args.command == "send":
-        result = send_code(args.phone, args.channel, args.code_size, args.vendor_data)
+        result = send_code(args.phone, args.channel, args.code_size, args.vendor_data, tracker)
         print(json.dumps(result, indent=2))
         print(f"\n--- Status: {result.get('status', 'Unknown')} ---")
     elif args.command == "check":
-        result = check_code(args.phone, args.code, args.decline_disposable, args.decline_voip)
+        result = check_code(args.phone, args.code, args.decline_disposable, args.decline_voip, tracker)
         print(json.dumps(result, indent=2, ensure_ascii=False))
         print(f"\n--- Status: {result.get('status', 'Unknown')} ---")
+    elif args.command == "bulk-send":
+        channels = [c.strip() for c in args.channels.split(",") if c.strip()]
+        unknown = set(channels) - {"sms", "whatsapp", "telegram", "voice"}
+        if unknown:
+            print(f"Error: unknown channel(s): {', '.join(sorted(unknown))}", file=sys.stderr)
+            sys.exit(1)
+        numbers, rejected = read_numbers(args.file, args.default_country)
+        for raw in rejected:
+            print(f"Skipping unparseable number: {raw}", file=sys.stderr)
+        stats = ChannelStats()
+        out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+        delivered = 0
+        started = time.monotonic()
+        try:
+            for record in bulk_send(numbers, channels, args.code_size, args.rate, args.workers, stats, tracker):
+                out.write(json.dumps(record) + "\n")
+                out.flush()
+                delivered += record["status"] == "Success"
+        finally:
+            if out is not sys.stdout:
+                out.close()
+        summary = stats.summary()
+        if args.stats:
+            with open(args.stats, "w", encoding="utf-8") as f:
+                json.dump(summary, f, indent=2)
+        print(f"\n--- {delivered}/{len(numbers)} delivered in {time.monotonic() - started:.1f}s "
+              f"({len(rejected)} rejected) ---", file=sys.stderr)
+        for country, channel_stats in summary.items():
+            for channel, st in channel_stats.items():
+                if channel != "fastest":
+                    print(f"  {country} {channel}: {st['delivered']}/{st['attempts']} delivered, "
+                          f"p50 {st['p50_ms']}ms", file=sys.stderr)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""Shared request helpers for the management scripts that call the API in bulk.
+
+`call_api()` makes one call with rate limiting and retries, and `RateLimiter`
+spaces calls evenly across threads. `http_session()` gives each worker thread its
+own pooled connection. `retry_after()` reads a Retry-After header, and
+`never_sent()` tells a failed connection apart from a request that may have
+reached the server.
+
+Usage:
+    from scripts.api_client import RateLimiter, call_api
+    limiter = RateLimiter(300 / 60)
+    status, text, elapsed_ms = call_api("GET", url, limiter, headers=headers)
+"""
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+import requests
+from urllib3.exceptions import ConnectTimeoutError
+
+
+class RateLimiter:
+    """Thread-safe limiter that spaces calls evenly at `rate` calls per second."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate and rate > 0 else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+_thread_local = threading.local()
+
+
+def http_session() -> requests.Session:
+    """One pooled HTTP session per worker thread."""
+    session = getattr(_thread_local, "session", None)
+    if session is None:
+        session = _thread_local.session = requests.Session()
+    return session
+
+
+def never_sent(error: requests.RequestException) -> bool:
+    """True if the connection failed before the request went out (refused or connect timeout)."""
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+    reason = getattr(error.args[0], "reason", None) if error.args else None
+    return isinstance(error, requests.ConnectionError) and isinstance(reason, ConnectTimeoutError)
+
+
+def retry_after(response, default: float) -> float:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP-date), else `default`."""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return default
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return default
+
+
+def call_api(method: str, url: str, limiter: RateLimiter = None, max_retries: int = 3, retry_unsafe: bool = True,
+             **kwargs):
+    """One API call retried on 429/5xx/network errors; returns (status_code or None, text, elapsed_ms).
+
+    With `retry_unsafe=False` (for creates and other non-idempotent POSTs) only 429s and
+    connections that never reached the server are retried; a 5xx or a timeout may mean the
+    request was applied, so it is returned as a failure instead of being sent again.
+    `elapsed_ms` is the last attempt's request time, excluding rate-limit waits.
+    """
+    status, text, started = None, "", time.perf_counter()
+    for attempt in range(max_retries + 1):
+        if limiter is not None:
+            limiter.acquire()
+        started = time.perf_counter()
+        try:
+            r = http_session().request(method, url, timeout=60, **kwargs)
+            status, text = r.status_code, r.text
+            if status != 429 and (status < 500 or not retry_unsafe):
+                break
+            delay = retry_after(r, 2 ** attempt)
+        except requests.RequestException as e:
+            status, text, delay = None, str(e), 2 ** attempt
+            if not retry_unsafe and not never_sent(e):
+                break
+        if attempt < max_retries:
+            time.sleep(delay)
+    return status, text, round((time.perf_counter() - started) * 1000, 1)
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""Didit Billing - Credit balance, cost estimates, and a balance guard for bulk jobs.
+
+`BalanceGuard` fetches the balance once and keeps a local estimate, charging each
+operation its price as it is sent. The balance is fetched again only when the next
+charge would take the estimate below the safety margin. If the fresh balance is still
+too low, the guard trips: bulk jobs stop sending requests instead of failing halfway
+with `403` insufficient credits. With `wait` set, the guard polls the balance until
+a top-up or auto-refill arrives.
+
+Usage:
+    python scripts/billing_guard.py balance
+    python scripts/billing_guard.py estimate --workflow-id UUID --count N [--margin USD]
+    python scripts/billing_guard.py estimate --price USD --count N
+
+Environment:
+    DIDIT_API_KEY - Required. Your Didit API key.
+
+Examples:
+    python scripts/billing_guard.py balance
+    python scripts/billing_guard.py estimate --workflow-id d8d2fa2d-... --count 5000
+    python scripts/billing_guard.py estimate --price 0.05 --count 200
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+import requests
+
+try:
+    from workflow_registry import WorkflowRegistry
+except ImportError:
+    from .workflow_registry import WorkflowRegistry
+
+BASE_URL = "https://verification.didit.me/v3"
+DEFAULT_MARGIN = 5.0
+
+
+def get_headers(content_type=False) -> dict:
+    api_key = os.environ.get("DIDIT_API_KEY")
+    if not api_key:
+        print("Error: DIDIT_API_KEY environment variable is not set.", file=sys.stderr)
+        sys.exit(1)
+    h = {"x-api-key": api_key}
+    if content_type:
+        h["Content-Type"] = "application/json"
+    return h
+
+
+def get_balance() -> dict:
+    r = requests.get(f"{BASE_URL}/billing/balance/", headers=get_headers(), timeout=30)
+    if r.status_code != 200:
+        print(f"Error {r.status_code}: {r.text}", file=sys.stderr)
+        sys.exit(1)
+    return r.json()
+
+
+def workflow_price(workflow_id: str, registry: WorkflowRegistry = None) -> float:
+    """A workflow's `total_price` per session, from the workflow registry when cached."""
+    workflow = registry.get(workflow_id) if registry is not None else None
+    if not workflow or workflow.get("total_price") is None:
+        r = requests.get(f"{BASE_URL}/workflows/{workflow_id}/", headers=get_headers(), timeout=30)
+        if r.status_code != 200:
+            print(f"Error {r.status_code}: {r.text}", file=sys.stderr)
+            sys.exit(1)
+        workflow = r.json()
+        if registry is not None:
+            registry.put(workflow)
+    return float(workflow.get("total_price") or 0)
+
+
+class InsufficientCredits(Exception):
+    """Raised by BalanceGuard.charge() when the balance would drop below the margin."""
+
+
+class BalanceGuard:
+    """Thread-safe local balance estimate that re-syncs only near the safety margin."""
+
+    def __init__(self, margin: float = DEFAULT_MARGIN, wait: float = 0, poll_interval: float = 60,
+                 fetch=None):
+        self.margin = margin
+        self.wait = wait
+        self.poll_interval = poll_interval
+        self._fetch = fetch or (lambda: float(get_balance()["balance"]))
+        self._lock = threading.Lock()
+        self.estimate = None
+        self.spent = 0.0
+        self.syncs = 0
+        self.tripped = False
+
+    def sync(self) -> float:
+        self.estimate = self._fetch()
+        self.syncs += 1
+        return self.estimate
+
+    def charge(self, cost: float):
+        """Deduct `cost` before an operation is sent; raises InsufficientCredits if it can't be afforded."""
+        with self._lock:
+            if self.tripped:
+                raise InsufficientCredits(f"balance below ${self.margin:.2f} margin")
+            if self.estimate is None or self.estimate - cost < self.margin:
+                deadline = time.monotonic() + self.wait
+                while self.sync() - cost < self.margin:
+                    if time.monotonic() + self.poll_interval > deadline:
+                        self.tripped = True
+                        raise InsufficientCredits(
+                            f"balance ${self.estimate:.2f} minus ${cost:.2f} is below the ${self.margin:.2f} margin")
+                    print(f"Balance ${self.estimate:.2f} is below the ${self.margin:.2f} margin; "
+                          f"waiting for a top-up...", file=sys.stderr)
+                    time.sleep(self.poll_interval)
+            self.estimate -= cost
+            self.spent += cost
+
+    def refund(self, cost: float):
+        """Give back a charge for an operation the API definitely rejected (a 4xx, or never sent)."""
+        with self._lock:
+            self.estimate += cost
+            self.spent -= cost
+
+    def summary(self) -> dict:
+        return {"estimated_balance": round(self.estimate, 4) if self.estimate is not None else None,
+                "estimated_spent": round(self.spent, 4), "balance_syncs": self.syncs, "tripped": self.tripped}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Didit credit balance and cost estimates")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sub.add_parser("balance", help="Show the credit balance")
+
+    est_p = sub.add_parser("estimate", help="Check whether the balance covers N operations")
+    price = est_p.add_mutually_exclusive_group(required=True)
+    price.add_argument("--workflow-id", help="Price each operation as one session of this workflow")
+    price.add_argument("--price", type=float, help="Price per operation in USD")
+    est_p.add_argument("--count", type=int, required=True, help="Number of operations")
+    est_p.add_argument("--margin", type=float, default=DEFAULT_MARGIN,
+                       help=f"Balance to keep in reserve (default: {DEFAULT_MARGIN})")
+
+    args = parser.parse_args()
+
+    if args.command == "balance":
+        result = get_balance()
+        print(json.dumps(result, indent=2))
+        print(f"\n--- Balance: ${result.get('balance')} ---")
+
+    elif args.command == "estimate":
+        if args.workflow_id:
+            unit = workflow_price(args.workflow_id, WorkflowRegistry())
+        else:
+            unit = args.price
+        balance = float(get_balance()["balance"])
+        cost = unit * args.count
+        affordable = int(max(balance - args.margin, 0) // unit) if unit else args.count
+        print(json.dumps({"balance": balance, "unit_price": unit, "count": args.count,
+                          "estimated_cost": round(cost, 4), "margin": args.margin,
+                          "affordable": min(affordable, args.count)}, indent=2))
+        if balance - cost >= args.margin:
+            print(f"\n--- OK: ${cost:.2f} for {args.count} leaves ${balance - cost:.2f} ---")
+        else:
+            print(f"\n--- Short: ${balance:.2f} covers {affordable} of {args.count} "
+                  f"(keeping ${args.margin:.2f}); top up first ---")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,426 @@
+#!/usr/bin/env python3
+"""Didit Bulk Session Operations - Run session operations across thousands of sessions.
+
+Targets come from a file (one session UUID per line, or NDJSON such as the output of
+`create_session.py list --all` / `session_mirror.py query`) or from a live session-list
+query (--status, --vendor-data, --country, --workflow-id). Work is streamed: only a
+bounded window of requests is in flight, every request shares one rate budget, and
+failed session IDs are written to --failures so the run can be re-driven with --ids.
+
+Usage:
+    python scripts/bulk_sessions.py export-pdf --out-dir DIR [--ids FILE | --status S ...] [--rate-per-min N] [--workers N]
+    python scripts/bulk_sessions.py delete [--ids FILE | --status S ...] [--batch-size N] [--dry-run]
+    python scripts/bulk_sessions.py update-status --new-status STATUS [--comment TEXT] [--ids FILE | --status S ...]
+    python scripts/bulk_sessions.py review --new-status STATUS [--comment TEXT] [--ids FILE | --status S ...]
+
+Environment:
+    DIDIT_API_KEY - Required. Your Didit API key.
+
+Examples:
+    python scripts/bulk_sessions.py export-pdf --out-dir reports/ --status Approved
+    python scripts/bulk_sessions.py export-pdf --out-dir reports/ --ids audit_ids.txt --failures failed.txt
+    python scripts/bulk_sessions.py delete --status Abandoned --dry-run
+    python scripts/bulk_sessions.py update-status --ids ids.txt --new-status Declined --comment "Retention review"
+    python scripts/bulk_sessions.py review --status "In Review" --vendor-data user-123 --new-status Approved
+"""
+import argparse
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import requests
+
+try:
+    import create_session
+    from api_client import RateLimiter, call_api, http_session, retry_after
+    from create_session import get_headers, iter_sessions
+except ImportError:
+    from . import create_session
+    from .api_client import RateLimiter, call_api, http_session, retry_after
+    from .create_session import get_headers, iter_sessions
+
+PDF_CHUNK_SIZE = 64 * 1024
+DELETE_BATCH_SIZE = 500
+
+
+def read_targets(path: str):
+    """Yield {"session_id", "session_number"?} from a UUID-per-line or NDJSON file."""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if line.startswith("{"):
+                row = json.loads(line)
+                if row.get("session_id"):
+                    yield {"session_id": row["session_id"], "session_number": row.get("session_number")}
+            else:
+                yield {"session_id": line.split(",")[0].strip(), "session_number": None}
+
+
+def iter_targets(path: str = None, status: str = None, vendor_data: str = None, country: str = None,
+                 workflow_id: str = None, rate_per_min: float = 300):
+    """Targets from `path`, else from a GET /v3/sessions/ query with the given filters.
+
+    A query is paged by offset. Collect it with `collect_targets` before deleting or
+    changing the status of the sessions it returns, or the shrinking result set skips pages.
+    """
+    if path:
+        yield from read_targets(path)
+        return
+    for session in iter_sessions(status, vendor_data, country, workflow_id, page_size=200,
+                                 rate_per_min=rate_per_min):
+        yield {"session_id": session["session_id"], "session_number": session.get("session_number")}
+
+
+def collect_targets(targets) -> list:
+    """Read every target before the first mutation, so the query isn't paged while it changes."""
+    collected = list(targets)
+    print(f"Collected {len(collected)} target session(s)", file=sys.stderr)
+    return collected
+
+
+def run_bounded(fn, items, workers: int = 8):
+    """Apply `fn` to `items` on a thread pool, yielding results as they finish.
+
+    At most `2 * workers` calls are pending at once, so `items` can be a lazy,
+    arbitrarily long iterator.
+    """
+    items = iter(items)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = set()
+        exhausted = False
+        while pending or not exhausted:
+            while not exhausted and len(pending) < 2 * workers:
+                item = next(items, None)
+                if item is None:
+                    exhausted = True
+                    break
+                pending.add(pool.submit(fn, item))
+            if not pending:
+                break
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+
+
+class Progress:
+    """Counts outcomes, prints a progress line to stderr, and logs failed IDs."""
+
+    def __init__(self, label: str, failures_path: str = None, every: float = 5.0):
+        self.label = label
+        self.counts = {}
+        self.started = time.perf_counter()
+        self.every = every
+        self._last = self.started
+        self._failures = open(failures_path, "w", encoding="utf-8") if failures_path else None
+        self._lock = threading.Lock()
+
+    def record(self, result: dict):
+        """Count one result; batch results (`session_ids` / `vendor_data_list`) count once per item."""
+        with self._lock:
+            ids = result.get("session_ids") or result.get("vendor_data_list") or [
+                result.get("session_id") or result.get("vendor_data")]
+            self.counts[result["status"]] = self.counts.get(result["status"], 0) + len(ids)
+            if result["status"] == "error":
+                label = result.get("session_numbers") or ids[0] or f"[{result.get('stage', 'error')}]"
+                print(f"  {label}: {result.get('error')}", file=sys.stderr)
+                if self._failures:
+                    # Errors with no ID (e.g. listing the sources failed) have nothing to re-drive.
+                    self._failures.write("".join(f"{i}\n" for i in ids if i is not None))
+                    self._failures.flush()
+            now = time.perf_counter()
+            if now - self._last >= self.every:
+                self._last = now
+                done = sum(self.counts.values())
+                print(f"  {self.label}: {done} done ({done / (now - self.started):.1f}/s) {self.counts}",
+                      file=sys.stderr)
+
+    def close(self) -> dict:
+        if self._failures:
+            self._failures.close()
+        return {"counts": self.counts, "seconds": round(time.perf_counter() - self.started, 2)}
+
+
+def export_pdf(session_id: str, out_dir: str, limiter: RateLimiter = None, max_retries: int = 3,
+               chunk_size: int = PDF_CHUNK_SIZE) -> dict:
+    """Stream one session's PDF report to `<out_dir>/<session_id>.pdf`. Never exits.
+
+    Existing non-empty files are skipped without an API call. The body is written in
+    `chunk_size` pieces to a `.part` file that is renamed into place only when complete.
+    """
+    path = os.path.join(out_dir, f"{session_id}.pdf")
+    if os.path.isfile(path) and os.path.getsize(path) > 0:
+        return {"session_id": session_id, "status": "skipped", "bytes": 0}
+    tmp = f"{path}.part"
+    started = time.perf_counter()
+    error = None
+    for attempt in range(max_retries + 1):
+        if limiter is not None:
+            limiter.acquire()
+        try:
+            with http_session().get(f"{create_session.BASE_URL}/session/{session_id}/generate-pdf",
+                             headers=get_headers(), stream=True, timeout=(10, 120)) as r:
+                if r.status_code == 429 or r.status_code >= 500:
+                    error = f"{r.status_code}: {r.text[:200]}"
+                    if attempt < max_retries:
+                        time.sleep(retry_after(r, 2 ** attempt))
+                        continue
+                    break
+                if r.status_code != 200:
+                    error = f"{r.status_code}: {r.text[:200]}"
+                    break
+                size = 0
+                with open(tmp, "wb") as f:
+                    for chunk in r.iter_content(chunk_size=chunk_size):
+                        f.write(chunk)
+                        size += len(chunk)
+            os.replace(tmp, path)
+            return {"session_id": session_id, "status": "downloaded", "bytes": size,
+                    "elapsed_ms": round((time.perf_counter() - started) * 1000, 1)}
+        except (requests.RequestException, OSError) as e:
+            error = str(e)
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            if attempt < max_retries:
+                time.sleep(2 ** attempt)
+    return {"session_id": session_id, "status": "error", "error": error}
+
+
+def export_pdfs(targets, out_dir: str, rate_per_min: float = 100, workers: int = 8, progress: Progress = None):
+    """Download PDFs for every target concurrently under `rate_per_min`; yields per-session results."""
+    os.makedirs(out_dir, exist_ok=True)
+    limiter = RateLimiter(rate_per_min / 60)
+    for result in run_bounded(lambda t: export_pdf(t["session_id"], out_dir, limiter), targets, workers):
+        if progress is not None:
+            progress.record(result)
+        yield result
+
+
+def resolve_session_number(target: dict, limiter: RateLimiter = None) -> dict:
+    """Fill in `session_number` from the decision endpoint when the target only has an ID."""
+    if target.get("session_number") is not None:
+        return target
+    status, text, _ = call_api("GET", f"{create_session.BASE_URL}/session/{target['session_id']}/decision/",
+                               limiter, headers=get_headers())
+    if status == 200:
+        return dict(target, session_number=json.loads(text).get("session_number"))
+    return dict(target, error=f"{status}: {text[:200]}")
+
+
+def _session_exists(target: dict, limiter: RateLimiter = None):
+    """True/False from the decision endpoint (200/404), None if that can't tell."""
+    status, _, _ = call_api("GET", f"{create_session.BASE_URL}/session/{target['session_id']}/decision/",
+                            limiter, headers=get_headers())
+    return {200: True, 404: False}.get(status)
+
+
+def delete_batch(targets: list, limiter: RateLimiter = None, retries: int = 2) -> list:
+    """POST /v3/sessions/delete/ for a batch; returns one result per request made.
+
+    A 400/413 on a multi-session batch splits it in half and retries both halves, so a
+    single bad session number fails alone instead of taking its batch with it. A 5xx or
+    timeout may come after the server already deleted the batch, so it is not resent
+    blindly: sessions that are gone are reported deleted, and only the ones still there
+    are sent again (up to `retries` times).
+    """
+    numbers = [t["session_number"] for t in targets]
+    status, text, elapsed = call_api("POST", f"{create_session.BASE_URL}/sessions/delete/", limiter,
+                                     retry_unsafe=False, headers=get_headers(content_type=True),
+                                     json={"session_numbers": numbers})
+    if status in (400, 413) and len(targets) > 1:
+        mid = len(targets) // 2
+        return delete_batch(targets[:mid], limiter, retries) + delete_batch(targets[mid:], limiter, retries)
+
+    def result(batch, **fields):
+        return dict({"session_ids": [t["session_id"] for t in batch],
+                     "session_numbers": [t["session_number"] for t in batch], "elapsed_ms": elapsed}, **fields)
+
+    if status in (200, 204):
+        return [result(targets, status="deleted")]
+    if status is not None and status < 500:
+        return [result(targets, status="error", error=f"{status}: {text[:200]}")]
+    exists = [_session_exists(t, limiter) for t in targets]
+    remaining = [t for t, there in zip(targets, exists) if there is not False]
+    gone = [t for t, there in zip(targets, exists) if there is False]
+    results = [result(gone, status="deleted")] if gone else []
+    if remaining and retries > 0:
+        time.sleep(2 ** (2 - min(retries, 2)))
+        results += delete_batch(remaining, limiter, retries - 1)
+    elif remaining:
+        results.append(result(remaining, status="error", error=f"{status}: outcome unknown: {text[:200]}"))
+    return results
+
+
+def _chunks(items, size: int):
+    items = iter(items)
+    while True:
+        chunk = list(itertools.islice(items, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def delete_sessions(targets, batch_size: int = DELETE_BATCH_SIZE, rate_per_min: float = 300,
+                    workers: int = 4, progress: Progress = None):
+    """Delete every target in `session_numbers` batches; yields one result per batch request.
+
+    Targets without a session number are resolved first (one decision lookup each);
+    targets that cannot be resolved are yielded as errors.
+    """
+    limiter = RateLimiter(rate_per_min / 60)
+    unresolved = []
+
+    def numbered():
+        for target in run_bounded(lambda t: resolve_session_number(t, limiter), targets, workers):
+            if target.get("session_number") is None:
+                unresolved.append({"session_id": target["session_id"], "status": "error",
+                                   "error": target.get("error", "no session_number")})
+            else:
+                yield target
+
+    def results():
+        for batch_results in run_bounded(lambda batch: delete_batch(batch, limiter),
+                                         _chunks(numbered(), batch_size), workers):
+            while unresolved:
+                yield unresolved.pop()
+            yield from batch_results
+        yield from unresolved
+
+    for result in results():
+        if progress is not None:
+            progress.record(result)
+        yield result
+
+
+def update_status(session_id: str, new_status: str, comment: str = None, limiter: RateLimiter = None,
+                  extra: dict = None) -> dict:
+    """PATCH update-status for one session. Never exits."""
+    payload = dict(extra or {}, new_status=new_status)
+    if comment:
+        payload["comment"] = comment
+    status, text, elapsed = call_api("PATCH", f"{create_session.BASE_URL}/session/{session_id}/update-status/",
+                                     limiter, headers=get_headers(content_type=True), json=payload)
+    if status == 200:
+        return {"session_id": session_id, "status": "updated", "elapsed_ms": elapsed}
+    return {"session_id": session_id, "status": "error", "error": f"{status}: {text[:200]}", "elapsed_ms": elapsed}
+
+
+def create_review(session_id: str, new_status: str, comment: str = None, limiter: RateLimiter = None) -> dict:
+    """POST a review for one session. Never exits."""
+    payload = {"new_status": new_status}
+    if comment:
+        payload["comment"] = comment
+    status, text, elapsed = call_api("POST", f"{create_session.BASE_URL}/sessions/{session_id}/reviews/",
+                                     limiter, retry_unsafe=False, headers=get_headers(content_type=True), json=payload)
+    if status in (200, 201):
+        return {"session_id": session_id, "status": "reviewed", "elapsed_ms": elapsed}
+    return {"session_id": session_id, "status": "error", "error": f"{status}: {text[:200]}", "elapsed_ms": elapsed}
+
+
+def apply_to_sessions(fn, targets, rate_per_min: float = 300, workers: int = 8, progress: Progress = None,
+                      **kwargs):
+    """Run `fn(session_id, limiter=..., **kwargs)` (update_status / create_review) over every target."""
+    limiter = RateLimiter(rate_per_min / 60)
+    for result in run_bounded(lambda t: fn(t["session_id"], limiter=limiter, **kwargs), targets, workers):
+        if progress is not None:
+            progress.record(result)
+        yield result
+
+
+def add_target_args(parser):
+    parser.add_argument("--ids", help="File of session UUIDs (one per line) or NDJSON with session_id")
+    parser.add_argument("--status", help="Query sessions with this status")
+    parser.add_argument("--vendor-data", help="Query sessions for this vendor_data")
+    parser.add_argument("--country", help="Query sessions by country (ISO 3166-1 alpha-3)")
+    parser.add_argument("--workflow-id", help="Query sessions of this workflow")
+    parser.add_argument("--failures", help="Write failed session IDs here (re-drive with --ids)")
+    parser.add_argument("--workers", type=int, default=8, help="Concurrent requests (default: 8)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk operations on Didit sessions")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    pdf_p = sub.add_parser("export-pdf", help="Download PDF reports to a directory")
+    add_target_args(pdf_p)
+    pdf_p.add_argument("--out-dir", required=True, help="Directory for <session_id>.pdf files")
+    pdf_p.add_argument("--rate-per-min", type=float, default=100,
+                       help="Max PDF requests per minute (default: 100, the documented limit)")
+
+    del_p = sub.add_parser("delete", help="Delete sessions in batches (POST /v3/sessions/delete/)")
+    add_target_args(del_p)
+    del_p.add_argument("--batch-size", type=int, default=DELETE_BATCH_SIZE,
+                       help=f"Session numbers per delete request (default: {DELETE_BATCH_SIZE})")
+    del_p.add_argument("--rate-per-min", type=float, default=300, help="Max requests per minute (default: 300)")
+    del_p.add_argument("--dry-run", action="store_true", help="Only list what would be deleted")
+
+    status_p = sub.add_parser("update-status", help="PATCH update-status on each session")
+    add_target_args(status_p)
+    status_p.add_argument("--new-status", required=True, choices=["Approved", "Declined", "Resubmitted"])
+    status_p.add_argument("--comment", help="Reason recorded with each change")
+    status_p.add_argument("--rate-per-min", type=float, default=300, help="Max requests per minute (default: 300)")
+    status_p.add_argument("--dry-run", action="store_true", help="Only list the sessions that would change")
+
+    review_p = sub.add_parser("review", help="Create a review on each session")
+    add_target_args(review_p)
+    review_p.add_argument("--new-status", required=True, choices=["Approved", "Declined", "In Review"])
+    review_p.add_argument("--comment", help="Review note")
+    review_p.add_argument("--rate-per-min", type=float, default=300, help="Max requests per minute (default: 300)")
+    review_p.add_argument("--dry-run", action="store_true", help="Only list the sessions that would be reviewed")
+
+    args = parser.parse_args()
+    if not args.ids and not any((args.status, args.vendor_data, args.country, args.workflow_id)):
+        print("Give --ids or at least one query filter (--status, --vendor-data, --country, --workflow-id).",
+              file=sys.stderr)
+        sys.exit(1)
+    targets = iter_targets(args.ids, args.status, args.vendor_data, args.country, args.workflow_id)
+
+    if args.command == "export-pdf":
+        progress = Progress("export-pdf", args.failures)
+        total_bytes = 0
+        for result in export_pdfs(targets, args.out_dir, args.rate_per_min, args.workers, progress):
+            total_bytes += result.get("bytes", 0)
+        summary = progress.close()
+        downloaded = summary["counts"].get("downloaded", 0)
+        seconds = max(summary["seconds"], 1e-9)
+        summary.update(bytes=total_bytes, pdfs_per_min=round(downloaded / seconds * 60, 1),
+                       mb_per_sec=round(total_bytes / seconds / 1e6, 2))
+        print(json.dumps(summary, indent=2))
+        print(f"\n--- {downloaded} downloaded, {summary['counts'].get('skipped', 0)} skipped, "
+              f"{summary['counts'].get('error', 0)} failed in {summary['seconds']}s "
+              f"({summary['pdfs_per_min']}/min, {summary['mb_per_sec']} MB/s) ---")
+
+    elif args.dry_run:
+        count = 0
+        for target in targets:
+            print(json.dumps(target))
+            count += 1
+        print(f"\n--- Dry run: {args.command} would touch {count} session(s) ---", file=sys.stderr)
+
+    else:
+        if not args.ids:
+            targets = collect_targets(targets)
+        progress = Progress(args.command, args.failures)
+        if args.command == "delete":
+            results = delete_sessions(targets, args.batch_size, args.rate_per_min, args.workers, progress)
+        else:
+            fn = update_status if args.command == "update-status" else create_review
+            results = apply_to_sessions(fn, targets, args.rate_per_min, args.workers, progress,
+                                        new_status=args.new_status, comment=args.comment)
+        latencies = sorted(r["elapsed_ms"] for r in results if "elapsed_ms" in r)
+        summary = progress.close()
+        if latencies:
+            summary["p50_ms"] = latencies[len(latencies) // 2]
+            summary["p95_ms"] = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        print(json.dumps(summary, indent=2))
+        counts = ", ".join(f"{k}: {v}" for k, v in sorted(summary["counts"].items()))
+        print(f"\n--- {args.command}: {counts or 'nothing to do'} in {summary['seconds']}s ---")
+
+
+if __name__ == "__main__":
+    main()
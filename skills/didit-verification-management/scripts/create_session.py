@@ -4,7 +4,10 @@
 Usage:
     python scripts/create_session.py create --workflow-id UUID [--vendor-data ID] [--callback URL]
     python scripts/create_session.py get <session_id>
-    python scripts/create_session.py list [--status STATUS] [--vendor-data ID]
+    python scripts/create_session.py list [--status STATUS] [--vendor-data ID] [--country ISO3] [--workflow-id UUID]
+                                          [--page N] [--page-size N]
+    python scripts/create_session.py list --all [--status STATUS] [--page-size N] [--prefetch N] [--start-offset N] > sessions.ndjson
+    python scripts/create_session.py bulk-create <manifest.csv> --workflow-id UUID --output sessions.csv [--rate-per-min N]
 
 Environment:
     DIDIT_API_KEY - Required. Your Didit API key.
@@ -13,14 +16,28 @@ Examples:
     python scripts/create_session.py create --workflow-id d8d2fa2d-... --vendor-data user-123
     python scripts/create_session.py get 11111111-2222-3333-4444-555555555555
     python scripts/create_session.py list --status Approved --vendor-data user-123
+    python scripts/create_session.py list --all --status Approved --page-size 200 > approved.ndjson
+    python scripts/create_session.py bulk-create users.csv --workflow-id d8d2fa2d-... --output sessions.csv
 """
 import argparse
+import csv
 import json
 import os
 import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
 import requests
 
+try:
+    from api_client import RateLimiter, http_session, never_sent, retry_after
+    from billing_guard import DEFAULT_MARGIN, BalanceGuard, InsufficientCredits, workflow_price
+except ImportError:
+    from .api_client import RateLimiter, http_session, never_sent, retry_after
+    from .billing_guard import DEFAULT_MARGIN, BalanceGuard, InsufficientCredits, workflow_price
+
 BASE_URL = "https://verification.didit.me/v3"
 
 
@@ -35,8 +52,8 @@ def get_headers(content_type=False) -> dict:
     return h
 
 
-def create_session(workflow_id: str, vendor_data: str = None, callback: str = None,
-                   language: str = None, metadata: str = None) -> dict:
+def build_session_payload(workflow_id: str, vendor_data: str = None, callback: str = None,
+                          language: str = None, metadata: str = None) -> dict:
     payload = {"workflow_id": workflow_id}
     if vendor_data:
         payload["vendor_data"] = vendor_data
@@ -46,6 +63,12 @@ def create_session(workflow_id: str, vendor_data: str = None, callback: str = No
         payload["language"] = language
     if metadata:
         payload["metadata"] = metadata
+    return payload
+
+
+def create_session(workflow_id: str, vendor_data: str = None, callback: str = None,
+                   language: str = None, metadata: str = None) -> dict:
+    payload = build_session_payload(workflow_id, vendor_data, callback, language, metadata)
     r = requests.post(f"{BASE_URL}/session/", headers=get_headers(content_type=True),
                       json=payload, timeout=30)
     if r.status_code not in (200, 201):
@@ -63,18 +86,218 @@ def get_decision(session_id: str) -> dict:
     return r.json()
 
 
-def list_sessions(status: str = None, vendor_data: str = None, page: int = 1) -> dict:
-    params = {"page": page}
-    if status:
-        params["status"] = status
-    if vendor_data:
-        params["vendor_data"] = vendor_data
-    r = requests.get(f"{BASE_URL}/sessions/", headers=get_headers(),
-                     params=params, timeout=30)
-    if r.status_code != 200:
-        print(f"Error {r.status_code}: {r.text}", file=sys.stderr)
-        sys.exit(1)
-    return r.json()
+def fetch_page(url: str, offset: int, limit: int, filters: dict = None,
+               limiter: RateLimiter = None, max_retries: int = 3) -> dict:
+    """Fetch one offset/limit page of a Didit list endpoint.
+
+    429s, 5xx and connection errors are retried with backoff (a GET is safe to repeat).
+    When retries run out the error names the page's offset, so an export can resume there.
+    """
+    params = dict(filters or {}, offset=offset, limit=limit)
+    for attempt in range(max_retries + 1):
+        if limiter is not None:
+            limiter.acquire()
+        try:
+            r = http_session().get(url, headers=get_headers(), params=params, timeout=60)
+        except requests.RequestException as e:
+            if attempt < max_retries:
+                time.sleep(2 ** attempt)
+                continue
+            print(f"Error at offset {offset}: {e}", file=sys.stderr)
+            sys.exit(1)
+        if (r.status_code == 429 or r.status_code >= 500) and attempt < max_retries:
+            time.sleep(retry_after(r, 2 ** attempt))
+            continue
+        if r.status_code != 200:
+            print(f"Error {r.status_code} at offset {offset}: {r.text}", file=sys.stderr)
+            sys.exit(1)
+        return r.json()
+
+
+def iter_paginated(url: str, filters: dict = None, page_size: int = 100, prefetch: int = 4,
+                   rate_per_min: float = 300, start: int = 0):
+    """Yield every item of an offset-paginated list endpoint (`count` + `results`), from offset `start`.
+
+    The first page tells us `count`; after that up to `prefetch` pages are fetched
+    concurrently by offset while the caller consumes the current one, so at most
+    `prefetch + 1` pages are held in memory regardless of the total. Pages are yielded
+    in order, so after a failure `start` + items received is the offset to resume from.
+    """
+    limiter = RateLimiter(rate_per_min / 60)
+    first = fetch_page(url, start, page_size, filters, limiter)
+    yield from first.get("results", [])
+    offsets = iter(range(start + page_size, first.get("count", 0), page_size))
+
+    with ThreadPoolExecutor(max_workers=max(1, prefetch)) as pool:
+        window = deque()
+
+        def fill():
+            while len(window) < max(1, prefetch):
+                offset = next(offsets, None)
+                if offset is None:
+                    return
+                window.append(pool.submit(fetch_page, url, offset, page_size, filters, limiter))
+
+        fill()
+        while window:
+            page = window.popleft().result()
+            fill()
+            results = page.get("results", [])
+            if not results:
+                break
+            yield from results
+
+
+def fetch_sessions_page(offset: int, limit: int, filters: dict = None,
+                        limiter: RateLimiter = None, max_retries: int = 3) -> dict:
+    """Fetch one offset/limit page of GET /v3/sessions/ (see fetch_page)."""
+    return fetch_page(f"{BASE_URL}/sessions/", offset, limit, filters, limiter, max_retries)
+
+
+def iter_sessions(status: str = None, vendor_data: str = None, country: str = None,
+                  workflow_id: str = None, page_size: int = 100, prefetch: int = 4,
+                  rate_per_min: float = 300, start: int = 0):
+    """Yield every matching session across all pages (see iter_paginated)."""
+    filters = {k: v for k, v in (("status", status), ("vendor_data", vendor_data),
+                                 ("country", country), ("workflow_id", workflow_id)) if v}
+    yield from iter_paginated(f"{BASE_URL}/sessions/", filters, page_size, prefetch, rate_per_min, start)
+
+
+BULK_FIELDS = ["key", "vendor_data", "session_id", "session_number", "url", "status", "error"]
+
+
+def read_manifest(path: str) -> list:
+    """Read a CSV manifest with `vendor_data,callback,language,metadata` columns.
+
+    Each row gets a resume `key`: its vendor_data, or `#<row>` when empty.
+    Rows repeating an earlier vendor_data are dropped.
+    """
+    rows, seen = [], set()
+    with open(path, newline="", encoding="utf-8") as f:
+        for n, row in enumerate(csv.DictReader(f), start=2):
+            row = {k.strip(): (v or "").strip() for k, v in row.items() if k}
+            key = row.get("vendor_data") or f"#{n}"
+            if key in seen:
+                print(f"Skipping duplicate vendor_data on line {n}: {key}", file=sys.stderr)
+                continue
+            seen.add(key)
+            row["key"] = key
+            rows.append(row)
+    return rows
+
+
+def load_checkpoint(output: str, checkpoint: str):
+    """Return (keys already written to `output`, keys started but never written)."""
+    done, started = set(), set()
+    if os.path.isfile(output):
+        with open(output, newline="", encoding="utf-8") as f:
+            done = {row["key"] for row in csv.DictReader(f) if row.get("session_id")}
+    if os.path.isfile(checkpoint):
+        with open(checkpoint, encoding="utf-8") as f:
+            started = {line.rstrip("\n") for line in f if line.strip()}
+    return done, started - done
+
+
+def find_existing_session(vendor_data: str, workflow_id: str):
+    """Look up a session created for vendor_data (used to settle requests in flight at a crash)."""
+    page = fetch_sessions_page(0, 1, {"vendor_data": vendor_data, "workflow_id": workflow_id})
+    results = page.get("results", [])
+    return results[0] if results else None
+
+
+def bulk_create_sessions(rows: list, workflow_id: str, rate_per_min: float = 600,
+                         workers: int = 16, checkpoint: str = None, max_retries: int = 3,
+                         guard: BalanceGuard = None, prices: dict = None):
+    """Create one session per manifest row concurrently; yields result dicts as they finish.
+
+    Creation is paced to `rate_per_min` (the documented limit is 600/min). Each row's
+    key is appended to `checkpoint` before its request is sent, so an interrupted run
+    can tell which rows may already have a session (see load_checkpoint).
+
+    Only 429s and connections that never reached the server are retried. After a
+    timeout or dropped connection the session may exist, so a row with vendor_data is
+    looked up (find_existing_session) before it is posted again; a row without one is
+    reported as an error with an unknown outcome instead of risking a duplicate.
+
+    With a `guard`, each session is charged its workflow's price from `prices` before
+    it is created, and refunded only when the API definitely rejected it (a 4xx, or a
+    request that never left); after a timeout or 5xx the charge stands. Once the guard
+    trips, no more rows are submitted and rows already queued come back with status
+    "Skipped", so a rerun after a top-up resumes them.
+    """
+    headers = get_headers(content_type=True)
+    limiter = RateLimiter(rate_per_min / 60)
+    ckpt = open(checkpoint, "a", encoding="utf-8") if checkpoint else None
+    ckpt_lock = threading.Lock()
+
+    def create_one(row):
+        row_workflow = row.get("workflow_id") or workflow_id
+        payload = build_session_payload(row_workflow, row.get("vendor_data"),
+                                        row.get("callback"), row.get("language"), row.get("metadata"))
+        result = {"key": row["key"], "vendor_data": row.get("vendor_data", "")}
+        cost = (prices or {}).get(row_workflow, 0.0)
+        if guard is not None:
+            try:
+                guard.charge(cost)
+            except InsufficientCredits as e:
+                result.update(status="Skipped", error=str(e))
+                return result
+        if ckpt:
+            with ckpt_lock:
+                ckpt.write(row["key"] + "\n")
+                ckpt.flush()
+        rejected = False  # only a definite rejection is known not to be billed
+        for attempt in range(max_retries + 1):
+            limiter.acquire()
+            try:
+                r = http_session().post(f"{BASE_URL}/session/", headers=headers, json=payload, timeout=30)
+            except requests.RequestException as e:
+                result.update(status="Error", error=str(e))
+                rejected = never_sent(e)
+                if rejected:
+                    continue
+                if not row.get("vendor_data"):
+                    result.update(error=f"outcome unknown, not retried (no vendor_data to check): {e}")
+                    break
+                try:
+                    existing = find_existing_session(row["vendor_data"], row_workflow)
+                except (requests.RequestException, SystemExit):
+                    result.update(error=f"outcome unknown, lookup failed: {e}")
+                    break
+                if existing:
+                    result.update(session_id=existing.get("session_id"), session_number=existing.get("session_number"),
+                                  url=existing.get("url"), status="Recovered", error="")
+                    return result
+                continue
+            if r.status_code == 429 and attempt < max_retries:
+                time.sleep(retry_after(r, 2 ** attempt))
+                continue
+            if r.status_code not in (200, 201):
+                result.update(status="Error", error=f"{r.status_code}: {r.text}")
+                rejected = 400 <= r.status_code < 500
+                break
+            body = r.json()
+            result.update(session_id=body.get("session_id"), session_number=body.get("session_number"),
+                          url=body.get("url"), status=body.get("status"))
+            return result
+        if guard is not None and rejected:
+            guard.refund(cost)
+        return result
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = deque()
+            for row in rows:
+                if guard is not None and guard.tripped:
+                    break
+                futures.append(pool.submit(create_one, row))
+                while len(futures) >= workers * 4 or (futures and futures[0].done()):
+                    yield futures.popleft().result()
+            while futures:
+                yield futures.popleft().result()
+    finally:
+        if ckpt:
+            ckpt.close()
 
 
 def main():
@@ -95,6 +318,30 @@ def main():
     list_p.add_argument("--status", help="Filter by status")
     list_p.add_argument("--vendor-data", help="Filter by vendor_data")
     list_p.add_argument("--page", type=int, default=1, help="Page number")
+    list_p.add_argument("--country", help="Filter by ISO 3166-1 alpha-3 country")
+    list_p.add_argument("--workflow-id", help="Filter by workflow UUID")
+    list_p.add_argument("--all", action="store_true", help="Stream every page as NDJSON to stdout")
+    list_p.add_argument("--page-size", type=int, default=100, help="Sessions per page/request (default: 100)")
+    list_p.add_argument("--prefetch", type=int, default=4, help="Pages fetched ahead with --all (default: 4)")
+    list_p.add_argument("--rate-per-min", type=float, default=300,
+                        help="Max list requests per minute with --all (default: 300)")
+    list_p.add_argument("--start-offset", type=int, default=0,
+                        help="With --all, start at this offset (resume a failed export)")
+
+    bulk_p = sub.add_parser("bulk-create", help="Create sessions for every row of a CSV manifest")
+    bulk_p.add_argument("manifest", help="CSV with vendor_data,callback,language,metadata columns")
+    bulk_p.add_argument("--workflow-id", required=True, help="Workflow UUID (a workflow_id column overrides it)")
+    bulk_p.add_argument("--output", required=True, help="CSV of key,vendor_data,session_id,url,... (appended on resume)")
+    bulk_p.add_argument("--checkpoint", help="Checkpoint file (default: <output>.ckpt)")
+    bulk_p.add_argument("--rate-per-min", type=float, default=600, help="Max creations per minute (default: 600)")
+    bulk_p.add_argument("--workers", type=int, default=16, help="Concurrent requests (default: 16)")
+    bulk_p.add_argument("--margin", type=float, default=DEFAULT_MARGIN,
+                        help=f"Stop before the estimated balance drops below this, in USD (default: {DEFAULT_MARGIN})")
+    bulk_p.add_argument("--wait-for-credits", type=float, default=0, metavar="SECONDS",
+                        help="At the margin, poll the balance this long for a top-up instead of stopping")
+    bulk_p.add_argument("--no-balance-guard", action="store_true", help="Don't track credits while creating")
+    bulk_p.add_argument("--recreate-unknown", action="store_true",
+                        help="On resume, also re-create rows without vendor_data that were in flight at the crash")
 
     args = parser.parse_args()
 
@@ -112,8 +359,87 @@ def main():
         print(json.dumps(result, indent=2))
         print(f"\n--- Status: {result.get('status')} ---")
 
+    elif args.command == "bulk-create":
+        checkpoint = args.checkpoint or f"{args.output}.ckpt"
+        rows = read_manifest(args.manifest)
+        done, in_flight = load_checkpoint(args.output, checkpoint)
+        new_file = not os.path.isfile(args.output)
+        created = failed = recovered = skipped = 0
+        started = time.monotonic()
+        with open(args.output, "a", newline="", encoding="utf-8") as out:
+            writer = csv.DictWriter(out, fieldnames=BULK_FIELDS, extrasaction="ignore")
+            if new_file:
+                writer.writeheader()
+            todo, unknown = [], []
+            for row in rows:
+                if row["key"] in done:
+                    continue
+                if row["key"] in in_flight and not row.get("vendor_data") and not args.recreate_unknown:
+                    unknown.append(row["key"])
+                    continue
+                if row["key"] in in_flight and row.get("vendor_data"):
+                    existing = find_existing_session(row["vendor_data"], row.get("workflow_id") or args.workflow_id)
+                    if existing:
+                        writer.writerow(dict(existing, key=row["key"], status="Recovered"))
+                        recovered += 1
+                        continue
+                todo.append(row)
+            print(f"{len(rows)} row(s): {len(done)} already done, {recovered} recovered, "
+                  f"{len(todo)} to create", file=sys.stderr)
+            if unknown:
+                print(f"Not resuming {len(unknown)} row(s) without vendor_data that were in flight when the last run "
+                      f"stopped ({', '.join(unknown[:10])}{' ...' if len(unknown) > 10 else ''}): they may already "
+                      f"have sessions that can't be looked up. Check them, then rerun with --recreate-unknown "
+                      f"to create them anyway.", file=sys.stderr)
+            guard = prices = None
+            if todo and not args.no_balance_guard:
+                guard = BalanceGuard(args.margin, wait=args.wait_for_credits)
+                prices = {wf: workflow_price(wf) for wf in {r.get("workflow_id") or args.workflow_id for r in todo}}
+            for result in bulk_create_sessions(todo, args.workflow_id, args.rate_per_min,
+                                               args.workers, checkpoint, guard=guard, prices=prices):
+                if result.get("status") == "Skipped":
+                    skipped += 1
+                    continue
+                writer.writerow(result)
+                out.flush()
+                if result.get("session_id"):
+                    created += 1
+                else:
+                    failed += 1
+                    print(f"  {result['key']}: {result.get('error')}", file=sys.stderr)
+        elapsed = time.monotonic() - started
+        print(f"\n--- Created {created}, failed {failed} in {elapsed:.1f}s "
+              f"({created / elapsed * 60 if elapsed else 0:.0f}/min) ---", file=sys.stderr)
+        if guard is not None:
+            spend = guard.summary()
+            print(f"--- Estimated spend ${spend['estimated_spent']:.2f}, balance ~${spend['estimated_balance']:.2f} "
+                  f"({spend['balance_syncs']} balance check(s)) ---", file=sys.stderr)
+            if guard.tripped:
+                remaining = len(todo) - created - failed
+                print(f"--- Paused: credits reached the ${args.margin:.2f} margin with {remaining} row(s) left. "
+                      f"Top up and rerun the same command to resume. ---", file=sys.stderr)
+                sys.exit(2)
+
+    elif args.command == "list" and args.all:
+        n = 0
+        started = time.monotonic()
+        try:
+            for session in iter_sessions(args.status, args.vendor_data, args.country, args.workflow_id,
+                                         args.page_size, args.prefetch, args.rate_per_min, args.start_offset):
+                sys.stdout.write(json.dumps(session) + "\n")
+                n += 1
+        except SystemExit:
+            sys.stdout.flush()
+            print(f"--- Stopped after {n} session(s); append the rest with the same command plus "
+                  f"--start-offset {args.start_offset + n} ---", file=sys.stderr)
+            raise
+        sys.stdout.flush()
+        print(f"--- {n} session(s) exported in {time.monotonic() - started:.1f}s ---", file=sys.stderr)
+
     elif args.command == "list":
-        result = list_sessions(args.status, args.vendor_data, args.page)
+        filters = {k: v for k, v in (("status", args.status), ("vendor_data", args.vendor_data),
+                                     ("country", args.country), ("workflow_id", args.workflow_id)) if v}
+        result = fetch_sessions_page((args.page - 1) * args.page_size, args.page_size, filters)
         print(json.dumps(result, indent=2))
         print(f"\n--- {result.get('count', 0)} session(s) total ---")
 
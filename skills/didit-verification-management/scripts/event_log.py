@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""Didit Webhook Event Log - Durable, deduplicated record of webhook events with replay.
+
+Events are appended as NDJSON to numbered segment files in a directory
+(`events-000001.ndjson`, ...). A segment is sealed when it reaches `--segment-mb`;
+the keys it holds are then also written to `events-NNNNNN.idx`, so reopening the log
+reads small index files instead of re-parsing old events. Deduplication uses an
+in-memory set of (session_id, webhook_type, timestamp) keys, which is what Didit's
+retries of one delivery share. Unlike the receiver's TTL cache, the set survives restarts.
+
+One process writes a log at a time: a writer holds an exclusive lock on
+`<log_dir>/events.lock` while open, and a second writer (say, `ingest` while
+`webhook_receiver.py serve --log-dir` is running) is refused. `stats` and `replay`
+open the log read-only, so they can run next to a live writer and never modify it.
+
+`replay` feeds logged events back to a handler. Events are sharded by session_id
+across worker threads, so different sessions run in parallel while each session's
+events arrive in their original order. `--speed` replays at a multiple of the
+recorded pace (0 = as fast as possible).
+
+Usage:
+    python scripts/event_log.py stats <log_dir>
+    python scripts/event_log.py ingest <log_dir> <events.ndjson>
+    python scripts/event_log.py replay <log_dir> [--handler module:function] [--workers N] [--speed X]
+                                       [--session-id ID] [--webhook-type TYPE] [--since ISO_OR_EPOCH]
+
+Examples:
+    python scripts/webhook_receiver.py serve --port 8080 --log-dir webhook_log/ --handler myapp.kyc:on_didit_event
+    python scripts/event_log.py replay webhook_log/ --handler myapp.kyc:on_didit_event --workers 16
+    python scripts/event_log.py replay webhook_log/ --since 2026-03-01 --speed 10 --output replayed.ndjson
+"""
+import argparse
+import contextlib
+import glob
+import json
+import os
+import queue
+import re
+import sys
+import threading
+import time
+import zlib
+from datetime import datetime
+
+try:
+    from file_lock import locked
+except ImportError:
+    from .file_lock import locked
+
+SEGMENT_BYTES = 64 * 1024 * 1024
+_SEGMENT_RE = re.compile(r"events-(\d{6})\.ndjson$")
+
+
+def event_key(event: dict) -> tuple:
+    """Retries of one delivery share session_id, webhook_type and timestamp."""
+    return event.get("session_id"), event.get("webhook_type"), event.get("timestamp")
+
+
+class EventLog:
+    """Append-only segmented NDJSON log with an O(1) in-memory dedupe index. Thread-safe.
+
+    A writer takes the directory's lock before repairing the tail and keeps it until
+    `close()`; RuntimeError if another process already has the log open for writing.
+    With `read_only` nothing is locked or modified, and `append` is unavailable.
+    """
+
+    def __init__(self, directory: str, segment_bytes: int = SEGMENT_BYTES, fsync: bool = False,
+                 read_only: bool = False):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.fsync = fsync
+        self.read_only = read_only
+        self._lock = threading.Lock()
+        self._keys = set()
+        self._writer = contextlib.ExitStack()
+        self._out = None
+        if not read_only:
+            os.makedirs(directory, exist_ok=True)
+            try:
+                self._writer.enter_context(locked(os.path.join(directory, "events"), blocking=False))
+            except BlockingIOError:
+                raise RuntimeError(f"{directory} is already open for writing by another process") from None
+        segments = self.segments()
+        for number in segments[:-1]:
+            self._load_sealed(number)
+        self._number = segments[-1] if segments else 1
+        if not read_only:
+            self._truncate_torn_tail(self._path(self._number, "ndjson"))
+        self._active_keys = []
+        for record in self._read(self._number):
+            self._remember(record["event"])
+        if not read_only:
+            self._out = open(self._path(self._number, "ndjson"), "a", encoding="utf-8")
+
+    def _path(self, number: int, ext: str) -> str:
+        return os.path.join(self.directory, f"events-{number:06d}.{ext}")
+
+    def segments(self) -> list:
+        numbers = []
+        for path in glob.glob(os.path.join(self.directory, "events-*.ndjson")):
+            match = _SEGMENT_RE.search(path)
+            if match:
+                numbers.append(int(match.group(1)))
+        return sorted(numbers)
+
+    @staticmethod
+    def _truncate_torn_tail(path: str, chunk: int = 64 * 1024):
+        """Cut a partial last line left by a crash mid-write, so the next append starts on a fresh line."""
+        if not os.path.isfile(path):
+            return
+        with open(path, "rb+") as f:
+            end = f.seek(0, os.SEEK_END)
+            pos = end
+            while pos > 0:
+                start = max(0, pos - chunk)
+                f.seek(start)
+                newline = f.read(pos - start).rfind(b"\n")
+                if newline >= 0:
+                    pos = start + newline + 1
+                    break
+                pos = start
+            if pos < end:
+                f.truncate(pos)
+
+    def _read(self, number: int):
+        path = self._path(number, "ndjson")
+        if not os.path.isfile(path):
+            return
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue  # a torn final line from a crash mid-write
+
+    def _load_sealed(self, number: int):
+        try:
+            with open(self._path(number, "idx"), encoding="utf-8") as f:
+                self._keys.update(tuple(json.loads(line)) for line in f)
+        except (OSError, ValueError):
+            self._keys.update(event_key(record["event"]) for record in self._read(number))
+
+    def _remember(self, event: dict):
+        key = event_key(event)
+        self._keys.add(key)
+        self._active_keys.append(key)
+
+    def __contains__(self, event: dict) -> bool:
+        return event_key(event) in self._keys
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def append(self, event: dict, received_at: float = None) -> bool:
+        """Log `event` unless an event with the same key is already logged; returns True if added."""
+        key = event_key(event)
+        line = json.dumps({"received_at": time.time() if received_at is None else received_at, "event": event},
+                          ensure_ascii=False, separators=(",", ":")) + "\n"
+        if self.read_only:
+            raise ValueError("event log was opened read-only")
+        with self._lock:
+            if key in self._keys:
+                return False
+            self._out.write(line)
+            self._out.flush()
+            if self.fsync:
+                os.fsync(self._out.fileno())
+            self._remember(event)
+            if self._out.tell() >= self.segment_bytes:
+                self._rotate()
+            return True
+
+    def _rotate(self):
+        self._out.close()
+        with open(self._path(self._number, "idx"), "w", encoding="utf-8") as f:
+            f.writelines(json.dumps(list(key)) + "\n" for key in self._active_keys)
+        self._number += 1
+        self._active_keys = []
+        self._out = open(self._path(self._number, "ndjson"), "a", encoding="utf-8")
+
+    def records(self, since: float = None, session_id: str = None, webhook_type: str = None):
+        """Logged records ({"received_at", "event"}) in append order, optionally filtered."""
+        if self._out is not None:
+            with self._lock:
+                self._out.flush()
+        for number in self.segments():
+            for record in self._read(number):
+                event = record["event"]
+                if since is not None and record["received_at"] < since:
+                    continue
+                if session_id is not None and event.get("session_id") != session_id:
+                    continue
+                if webhook_type is not None and event.get("webhook_type") != webhook_type:
+                    continue
+                yield record
+
+    def close(self):
+        with self._lock:
+            if self._out is not None:
+                self._out.close()
+            self._writer.close()
+
+
+def replay(records, handler, workers: int = 8, speed: float = 0, queue_size: int = 1000) -> dict:
+    """Call `handler(event, headers)` for each record, preserving per-session order.
+
+    Records are sharded by session_id onto `workers` queues, each drained by one thread.
+    With `speed` > 0 the gaps between `received_at` values are replayed divided by `speed`.
+    """
+    shards = [queue.Queue(queue_size) for _ in range(workers)]
+    stats = {"replayed": 0, "handler_errors": 0}
+    lock = threading.Lock()
+
+    def work(q):
+        while (record := q.get()) is not None:
+            headers = {"X-Didit-Replay": "true", "X-Received-At": str(record["received_at"])}
+            try:
+                handler(record["event"], headers)
+                key = "replayed"
+            except Exception as e:
+                key = "handler_errors"
+                print(f"Handler error for {record['event'].get('session_id')}: {e}", file=sys.stderr)
+            with lock:
+                stats[key] += 1
+
+    threads = [threading.Thread(target=work, args=(q,), daemon=True) for q in shards]
+    for t in threads:
+        t.start()
+    started = time.perf_counter()
+    first = None
+    for record in records:
+        if speed > 0:
+            first = record["received_at"] if first is None else first
+            delay = (record["received_at"] - first) / speed - (time.perf_counter() - started)
+            if delay > 0:
+                time.sleep(delay)
+        shard = zlib.crc32(str(record["event"].get("session_id")).encode()) % workers
+        shards[shard].put(record)
+    for q in shards:
+        q.put(None)
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+    total = stats["replayed"] + stats["handler_errors"]
+    return dict(stats, seconds=round(elapsed, 3), events_per_sec=round(total / elapsed, 1) if elapsed else 0)
+
+
+def _parse_since(value: str) -> float:
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Durable Didit webhook event log")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    stats_p = sub.add_parser("stats", help="Show segment and event counts")
+    stats_p.add_argument("log_dir", help="Event log directory")
+
+    ingest_p = sub.add_parser("ingest", help="Append events from an NDJSON file, skipping duplicates")
+    ingest_p.add_argument("log_dir", help="Event log directory")
+    ingest_p.add_argument("file", help="NDJSON of webhook events (e.g. webhook_receiver.py --output)")
+
+    replay_p = sub.add_parser("replay", help="Re-feed logged events to a handler")
+    replay_p.add_argument("log_dir", help="Event log directory")
+    replay_p.add_argument("--handler", help="Event handler as module:function (called with event, headers)")
+    replay_p.add_argument("--output", help="Append events as NDJSON here when no --handler (default: stdout)")
+    replay_p.add_argument("--workers", type=int, default=8, help="Parallel workers; order kept per session (default: 8)")
+    replay_p.add_argument("--speed", type=float, default=0,
+                          help="Multiple of the recorded pace, e.g. 1 = real time (default: 0, as fast as possible)")
+    replay_p.add_argument("--session-id", help="Only this session's events")
+    replay_p.add_argument("--webhook-type", help="Only events of this webhook_type")
+    replay_p.add_argument("--since", help="Only events received at or after this ISO date or epoch seconds")
+
+    args = parser.parse_args()
+
+    if args.command == "stats":
+        log = EventLog(args.log_dir, read_only=True)
+        segments = log.segments()
+        size = sum(os.path.getsize(log._path(n, "ndjson")) for n in segments)
+        print(json.dumps({"events": len(log), "segments": len(segments), "bytes": size}, indent=2))
+        log.close()
+
+    elif args.command == "ingest":
+        try:
+            log = EventLog(args.log_dir)
+        except RuntimeError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            sys.exit(1)
+        added = duplicates = 0
+        with open(args.file, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                if log.append(json.loads(line)):
+                    added += 1
+                else:
+                    duplicates += 1
+        log.close()
+        print(f"--- Ingested {added} event(s), skipped {duplicates} duplicate(s); log has {len(log)} ---")
+
+    elif args.command == "replay":
+        try:
+            from webhook_receiver import load_handler, ndjson_handler
+        except ImportError:
+            from .webhook_receiver import load_handler, ndjson_handler
+        handler = load_handler(args.handler) if args.handler else ndjson_handler(args.output)
+        log = EventLog(args.log_dir, read_only=True)
+        since = _parse_since(args.since) if args.since else None
+        result = replay(log.records(since, args.session_id, args.webhook_type), handler, args.workers, args.speed)
+        log.close()
+        print(f"--- Replayed {result['replayed']} event(s), {result['handler_errors']} handler error(s) "
+              f"in {result['seconds']}s ({result['events_per_sec']}/s) ---", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
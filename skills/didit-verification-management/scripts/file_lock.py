@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""Cross-process lock for the small JSON files these scripts share between runs.
+
+`locked(path)` holds an exclusive `flock` on `<path>.lock` for the duration of a
+read-modify-write, so two processes updating the same cache can't overwrite each
+other's changes. With `blocking=False` it raises BlockingIOError instead of waiting when
+another process holds the lock. Where `fcntl` is unavailable (Windows) it only creates
+the lock file.
+
+Usage:
+    from scripts.file_lock import locked
+    with locked("~/.cache/didit/workflows.json"):
+        data = load(); data.update(changes); save(data)
+"""
+import contextlib
+import os
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+@contextlib.contextmanager
+def locked(path: str, blocking: bool = True):
+    """Exclusive cross-process lock on `<path>.lock` (no-op where fcntl is unavailable)."""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    fd = os.open(f"{path}.lock", os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BaseException:
+        os.close(fd)
+        raise
+    try:
+        yield
+    finally:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+        os.close(fd)
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""Didit Blocklist - List, add, remove, and reconcile blocklisted items.
+
+Blocklist items are identified by the session they came from and their type
+(face, document, phone, email). `sync` makes the remote blocklist match a desired
+list: it fetches the remote list once, diffs the two sets locally, and sends only
+the adds and removes, one request per session carrying all of that session's
+item types, concurrently under a rate limit.
+
+Usage:
+    python scripts/manage_blocklist.py list [--item-type TYPE]
+    python scripts/manage_blocklist.py add <session_id> [--face] [--document] [--phone] [--email]
+    python scripts/manage_blocklist.py remove <session_id> [--face] [--document] [--phone] [--email]
+    python scripts/manage_blocklist.py sync <desired.csv|ndjson> [--item-type TYPE] [--no-remove] [--dry-run]
+
+    The desired file has `session_id,item_type` rows (CSV with header, or NDJSON).
+
+Environment:
+    DIDIT_API_KEY - Required. Your Didit API key.
+
+Examples:
+    python scripts/manage_blocklist.py list --item-type face
+    python scripts/manage_blocklist.py add 11111111-2222-3333-4444-555555555555 --face --document
+    python scripts/manage_blocklist.py sync fraud_blocklist.csv --dry-run
+    python scripts/manage_blocklist.py sync fraud_blocklist.csv --failures failed.txt
+"""
+import argparse
+import csv
+import json
+import sys
+import time
+
+import requests
+
+try:
+    from api_client import RateLimiter, call_api
+    from bulk_sessions import Progress, run_bounded
+    from create_session import get_headers
+except ImportError:
+    from .api_client import RateLimiter, call_api
+    from .bulk_sessions import Progress, run_bounded
+    from .create_session import get_headers
+
+BASE_URL = "https://verification.didit.me/v3/blocklist"
+ITEM_TYPES = ("face", "document", "phone", "email")
+
+
+def list_blocklist(item_type: str = None) -> list:
+    """Every blocklist item, following `next` links if the response is paginated."""
+    items, url = [], f"{BASE_URL}/"
+    params = {"item_type": item_type} if item_type else None
+    while url:
+        r = requests.get(url, headers=get_headers(), params=params, timeout=60)
+        if r.status_code != 200:
+            print(f"Error {r.status_code}: {r.text}", file=sys.stderr)
+            sys.exit(1)
+        body = r.json()
+        if isinstance(body, list):
+            return items + body
+        items.extend(body.get("results", []))
+        url, params = body.get("next"), None
+    return items
+
+
+def _flags(prefix: str, item_types) -> dict:
+    return {f"{prefix}_{t}": True for t in item_types}
+
+
+def add_to_blocklist(session_id: str, item_types) -> dict:
+    r = requests.post(f"{BASE_URL}/add/", headers=get_headers(content_type=True),
+                      json=dict(_flags("blocklist", item_types), session_id=session_id), timeout=30)
+    if r.status_code not in (200, 201):
+        print(f"Error {r.status_code}: {r.text}", file=sys.stderr)
+        sys.exit(1)
+    return r.json()
+
+
+def remove_from_blocklist(session_id: str, item_types) -> dict:
+    r = requests.post(f"{BASE_URL}/remove/", headers=get_headers(content_type=True),
+                      json=dict(_flags("unblock", item_types), session_id=session_id), timeout=30)
+    if r.status_code not in (200, 204):
+        print(f"Error {r.status_code}: {r.text}", file=sys.stderr)
+        sys.exit(1)
+    return r.json() if r.content else {}
+
+
+def item_key(item: dict):
+    """(session_id, item_type) for a remote item, or None if it has no source session."""
+    session_id = item.get("session_id") or item.get("session")
+    if isinstance(session_id, dict):
+        session_id = session_id.get("session_id") or session_id.get("id")
+    item_type = (item.get("item_type") or item.get("type") or "").lower()
+    if not session_id or item_type not in ITEM_TYPES:
+        return None
+    return str(session_id), item_type
+
+
+def read_desired(path: str, item_type: str = None) -> set:
+    """Desired (session_id, item_type) pairs from a CSV (with header) or NDJSON file."""
+    with open(path, encoding="utf-8", newline="") as f:
+        first = f.readline()
+        f.seek(0)
+        rows = ((json.loads(line) for line in f if line.strip()) if first.startswith("{")
+                else csv.DictReader(f))
+        desired = set()
+        for row in rows:
+            key = item_key(row)
+            if key is None:
+                print(f"Skipping invalid row: {row}", file=sys.stderr)
+            elif item_type is None or key[1] == item_type:
+                desired.add(key)
+    return desired
+
+
+def plan_sync(desired: set, remote: set, remove: bool = True) -> dict:
+    """Group the set difference into per-session adds and removes."""
+    adds, removes = {}, {}
+    for session_id, item_type in desired - remote:
+        adds.setdefault(session_id, []).append(item_type)
+    if remove:
+        for session_id, item_type in remote - desired:
+            removes.setdefault(session_id, []).append(item_type)
+    return {"add": adds, "remove": removes, "unchanged": len(desired & remote)}
+
+
+def _apply(op: str, session_id: str, item_types: list, limiter: RateLimiter) -> dict:
+    prefix = "blocklist" if op == "add" else "unblock"
+    status, text, elapsed = call_api("POST", f"{BASE_URL}/{op}/", limiter, headers=get_headers(content_type=True),
+                                     json=dict(_flags(prefix, sorted(item_types)), session_id=session_id))
+    result = {"session_id": session_id, "op": op, "item_types": sorted(item_types), "elapsed_ms": elapsed}
+    if status in (200, 201, 204):
+        return dict(result, status="added" if op == "add" else "removed")
+    return dict(result, status="error", error=f"{status}: {text[:200]}")
+
+
+def sync_blocklist(desired: set, item_type: str = None, remove: bool = True, rate_per_min: float = 300,
+                   workers: int = 8, progress: Progress = None, dry_run: bool = False) -> dict:
+    """Make the remote blocklist match `desired`; returns the plan and counts."""
+    started = time.perf_counter()
+    remote_items = list_blocklist(item_type)
+    remote = {key for key in map(item_key, remote_items) if key is not None}
+    plan = plan_sync(desired, remote, remove)
+    summary = {"desired": len(desired), "remote": len(remote), "unmanaged_remote": len(remote_items) - len(remote),
+               "unchanged": plan["unchanged"],
+               "to_add": sum(map(len, plan["add"].values())),
+               "to_remove": sum(map(len, plan["remove"].values()))}
+    if dry_run:
+        summary["plan"] = {"add": plan["add"], "remove": plan["remove"]}
+    else:
+        limiter = RateLimiter(rate_per_min / 60)
+        jobs = [("add", sid, types) for sid, types in plan["add"].items()]
+        jobs += [("remove", sid, types) for sid, types in plan["remove"].items()]
+        counts = {}
+        for result in run_bounded(lambda job: _apply(*job, limiter), jobs, workers):
+            counts[result["status"]] = counts.get(result["status"], 0) + len(result["item_types"])
+            if progress is not None:
+                progress.record(result)
+        summary.update(items_changed=counts.get("added", 0) + counts.get("removed", 0),
+                       requests=len(jobs), results=counts)
+    summary["seconds"] = round(time.perf_counter() - started, 2)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the Didit blocklist")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    list_p = sub.add_parser("list", help="List blocklisted items")
+    list_p.add_argument("--item-type", choices=ITEM_TYPES, help="Only this item type")
+
+    for name, help_text in (("add", "Blocklist items from a session"), ("remove", "Unblock items from a session")):
+        p = sub.add_parser(name, help=help_text)
+        p.add_argument("session_id", help="Session UUID the items come from")
+        for item_type in ITEM_TYPES:
+            p.add_argument(f"--{item_type}", action="store_true", help=f"{name.capitalize()} the {item_type}")
+
+    sync_p = sub.add_parser("sync", help="Reconcile the remote blocklist with a desired list")
+    sync_p.add_argument("file", help="CSV (session_id,item_type header) or NDJSON of desired items")
+    sync_p.add_argument("--item-type", choices=ITEM_TYPES, help="Only reconcile this item type")
+    sync_p.add_argument("--no-remove", action="store_true", help="Only add; never unblock remote extras")
+    sync_p.add_argument("--dry-run", action="store_true", help="Print the plan without changing anything")
+    sync_p.add_argument("--workers", type=int, default=8, help="Concurrent requests (default: 8)")
+    sync_p.add_argument("--rate-per-min", type=float, default=300, help="Max requests per minute (default: 300)")
+    sync_p.add_argument("--failures", help="Write session IDs whose add/remove failed here")
+
+    args = parser.parse_args()
+
+    if args.command == "list":
+        items = list_blocklist(args.item_type)
+        print(json.dumps(items, indent=2))
+        print(f"\n--- {len(items)} blocklisted item(s) ---")
+
+    elif args.command in ("add", "remove"):
+        item_types = [t for t in ITEM_TYPES if getattr(args, t)]
+        if not item_types:
+            print("Choose at least one of --face, --document, --phone, --email.", file=sys.stderr)
+            sys.exit(1)
+        fn = add_to_blocklist if args.command == "add" else remove_from_blocklist
+        print(json.dumps(fn(args.session_id, item_types), indent=2))
+        print(f"\n--- {args.command.capitalize()}: {', '.join(item_types)} from {args.session_id} ---")
+
+    elif args.command == "sync":
+        desired = read_desired(args.file, args.item_type)
+        progress = None if args.dry_run else Progress("blocklist-sync", args.failures)
+        summary = sync_blocklist(desired, args.item_type, not args.no_remove, args.rate_per_min,
+                                 args.workers, progress, args.dry_run)
+        if progress is not None:
+            progress.close()
+        print(json.dumps(summary, indent=2))
+        if args.dry_run:
+            print(f"\n--- Dry run: {summary['to_add']} to add, {summary['to_remove']} to remove, "
+                  f"{summary['unchanged']} unchanged ---")
+        else:
+            print(f"\n--- {summary['items_changed']} item(s) changed in {summary['requests']} request(s), "
+                  f"{summary['unchanged']} unchanged, {summary['results'].get('error', 0)} failed "
+                  f"in {summary['seconds']}s ---")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""Didit Questionnaires - CRUD questionnaires and sync them with a directory of JSON files.
+
+`export` writes every questionnaire to `<dir>/<title>-<uuid8>.json`. `import` creates
+or updates questionnaires from that directory. Each definition is hashed
+(title, description, languages, form elements/graph) and compared with the hash
+recorded in `<dir>/.didit-state.json` at the last export/import, so unchanged files
+are skipped without an API call. Changed ones are sent concurrently. New files get
+their `uuid` written back after creation, so the next import updates instead of
+duplicating. A file that isn't valid JSON is reported and skipped.
+
+"Unchanged" means unchanged since this directory last synced, not equal to what is
+on the server: the remote definitions are not fetched on import. An edit made
+directly on the server is therefore not detected. If its file is unchanged it is
+kept, and if the file changed the server edit is overwritten. Run `export` first to
+pick up server-side edits, or `--force` to push every file.
+
+Usage:
+    python scripts/manage_questionnaires.py list
+    python scripts/manage_questionnaires.py get <uuid>
+    python scripts/manage_questionnaires.py create <file.json>
+    python scripts/manage_questionnaires.py update <uuid> <file.json>
+    python scripts/manage_questionnaires.py delete <uuid>
+    python scripts/manage_questionnaires.py export <dir> [--workers N]
+    python scripts/manage_questionnaires.py import <dir> [--dry-run] [--force] [--workers N]
+
+Environment:
+    DIDIT_API_KEY - Required. Your Didit API key.
+
+Examples:
+    python scripts/manage_questionnaires.py export questionnaires/
+    python scripts/manage_questionnaires.py import questionnaires/ --dry-run
+    python scripts/manage_questionnaires.py import questionnaires/ --workers 8
+"""
+import argparse
+import glob
+import hashlib
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+
+import requests
+
+try:
+    from api_client import RateLimiter, call_api
+    from bulk_sessions import run_bounded
+    from create_session import get_headers
+except ImportError:
+    from .api_client import RateLimiter, call_api
+    from .bulk_sessions import run_bounded
+    from .create_session import get_headers
+
+BASE_URL = "https://verification.didit.me/v3/questionnaires"
+DEFINITION_FIELDS = ("title", "description", "default_language", "languages", "form_elements", "graph")
+STATE_FILE = ".didit-state.json"
+
+
+def _items(body):
+    return body.get("results", []) if isinstance(body, dict) else body
+
+
+def list_questionnaires() -> list:
+    r = requests.get(f"{BASE_URL}/", headers=get_headers(), timeout=30)
+    if r.status_code != 200:
+        print(f"Error {r.status_code}: {r.text}", file=sys.stderr)
+        sys.exit(1)
+    return _items(r.json())
+
+
+def get_questionnaire(uuid: str) -> dict:
+    r = requests.get(f"{BASE_URL}/{uuid}/", headers=get_headers(), timeout=30)
+    if r.status_code != 200:
+        print(f"Error {r.status_code}: {r.text}", file=sys.stderr)
+        sys.exit(1)
+    return r.json()
+
+
+def create_questionnaire(definition: dict) -> dict:
+    r = requests.post(f"{BASE_URL}/", headers=get_headers(content_type=True), json=definition, timeout=30)
+    if r.status_code not in (200, 201):
+        print(f"Error {r.status_code}: {r.text}", file=sys.stderr)
+        sys.exit(1)
+    return r.json()
+
+
+def update_questionnaire(uuid: str, definition: dict) -> dict:
+    r = requests.patch(f"{BASE_URL}/{uuid}/", headers=get_headers(content_type=True), json=definition, timeout=30)
+    if r.status_code != 200:
+        print(f"Error {r.status_code}: {r.text}", file=sys.stderr)
+        sys.exit(1)
+    return r.json()
+
+
+def delete_questionnaire(uuid: str) -> dict:
+    r = requests.delete(f"{BASE_URL}/{uuid}/", headers=get_headers(), timeout=30)
+    if r.status_code not in (200, 204):
+        print(f"Error {r.status_code}: {r.text}", file=sys.stderr)
+        sys.exit(1)
+    return {"deleted": True, "uuid": uuid}
+
+
+def definition_of(questionnaire: dict) -> dict:
+    """The user-editable part of a questionnaire; server fields (uuid, timestamps) are dropped."""
+    return {k: questionnaire[k] for k in DEFINITION_FIELDS if questionnaire.get(k) is not None}
+
+
+def content_hash(questionnaire: dict) -> str:
+    canonical = json.dumps(definition_of(questionnaire), sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode()).hexdigest()[:16]
+
+
+def _write_json(path: str, data: dict):
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+        f.write("\n")
+    os.replace(tmp, path)
+
+
+def load_state(directory: str) -> dict:
+    try:
+        with open(os.path.join(directory, STATE_FILE), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _filename(questionnaire: dict) -> str:
+    slug = re.sub(r"[^a-z0-9]+", "-", (questionnaire.get("title") or "questionnaire").lower()).strip("-")
+    return f"{slug[:60] or 'questionnaire'}-{questionnaire['uuid'][:8]}.json"
+
+
+def export_questionnaires(directory: str, workers: int = 8, rate_per_min: float = 300) -> dict:
+    """Write every questionnaire to `directory` (full details fetched concurrently) and record hashes."""
+    started = time.perf_counter()
+    os.makedirs(directory, exist_ok=True)
+    existing = {}
+    for path in glob.glob(os.path.join(directory, "*.json")):
+        try:
+            with open(path, encoding="utf-8") as f:
+                existing[json.load(f).get("uuid")] = path
+        except (OSError, ValueError):
+            continue
+    limiter = RateLimiter(rate_per_min / 60)
+
+    def fetch(summary):
+        status, text, _ = call_api("GET", f"{BASE_URL}/{summary['uuid']}/", limiter, headers=get_headers())
+        if status != 200:
+            return {"uuid": summary["uuid"], "status": "error", "error": f"{status}: {text[:200]}"}
+        questionnaire = json.loads(text)
+        path = existing.get(questionnaire["uuid"]) or os.path.join(directory, _filename(questionnaire))
+        _write_json(path, dict(uuid=questionnaire["uuid"], **definition_of(questionnaire)))
+        return {"uuid": questionnaire["uuid"], "status": "exported", "path": path,
+                "hash": content_hash(questionnaire)}
+
+    state, errors = {}, []
+    for result in run_bounded(fetch, [q for q in list_questionnaires() if q.get("uuid")], workers):
+        if result["status"] == "exported":
+            state[result["uuid"]] = result["hash"]
+        else:
+            errors.append(result)
+            print(f"  {result['uuid']}: {result['error']}", file=sys.stderr)
+    _write_json(os.path.join(directory, STATE_FILE), state)
+    return {"exported": len(state), "errors": len(errors), "seconds": round(time.perf_counter() - started, 2)}
+
+
+def plan_import(directory: str, remote_uuids: set, force: bool = False) -> list:
+    """(action, path, document) for every file; action is create, update, skip, or invalid.
+
+    skip means the file's hash matches the one recorded at the last export/import; the
+    server's current definition is not compared (see the module docstring). Files that
+    can't be parsed are planned as invalid with the error message as the document.
+    """
+    state = load_state(directory)
+    plan = []
+    for path in sorted(glob.glob(os.path.join(directory, "*.json"))):
+        try:
+            with open(path, encoding="utf-8") as f:
+                document = json.load(f)
+        except ValueError as e:
+            plan.append(("invalid", path, f"invalid JSON: {e}"))
+            continue
+        if not isinstance(document, dict):
+            plan.append(("invalid", path, "not a JSON object"))
+            continue
+        uuid = document.get("uuid")
+        if not uuid or uuid not in remote_uuids:
+            plan.append(("create", path, document))
+        elif force or state.get(uuid) != content_hash(document):
+            plan.append(("update", path, document))
+        else:
+            plan.append(("skip", path, document))
+    return plan
+
+
+def import_questionnaires(directory: str, workers: int = 8, rate_per_min: float = 300,
+                          force: bool = False, dry_run: bool = False) -> dict:
+    """Create or update questionnaires from `directory`, skipping files whose hash is unchanged."""
+    started = time.perf_counter()
+    remote = {q["uuid"] for q in list_questionnaires() if q.get("uuid")}
+    plan = plan_import(directory, remote, force)
+    counts = {"skip": sum(1 for action, _, _ in plan if action == "skip")}
+    for action, path, error in plan:
+        if action == "invalid":
+            counts["invalid"] = counts.get("invalid", 0) + 1
+            print(f"  {os.path.basename(path)}: {error}; skipped", file=sys.stderr)
+    plan = [job for job in plan if job[0] != "invalid"]
+    if dry_run:
+        for action, path, document in plan:
+            if action != "skip":
+                print(f"  {action:6} {os.path.basename(path)}  {document.get('title', '')}")
+        counts.update(create=sum(1 for a, _, _ in plan if a == "create"),
+                      update=sum(1 for a, _, _ in plan if a == "update"))
+        return dict(counts, seconds=round(time.perf_counter() - started, 2))
+
+    limiter = RateLimiter(rate_per_min / 60)
+    headers = get_headers(content_type=True)
+
+    def upsert(job):
+        action, path, document = job
+        definition = definition_of(document)
+        if action == "create":
+            # Not retried after a timeout or 5xx: the questionnaire may exist, and a resend would duplicate it
+            status, text, elapsed = call_api("POST", f"{BASE_URL}/", limiter, retry_unsafe=False,
+                                             headers=headers, json=definition)
+        else:
+            status, text, elapsed = call_api("PATCH", f"{BASE_URL}/{document['uuid']}/", limiter,
+                                             headers=headers, json=definition)
+        result = {"action": action, "path": path, "elapsed_ms": elapsed}
+        if status not in (200, 201):
+            return dict(result, status="error", error=f"{status}: {text[:200]}")
+        uuid = document.get("uuid") if action == "update" else json.loads(text).get("uuid")
+        if action == "create" and uuid:
+            _write_json(path, dict(uuid=uuid, **definition))
+        return dict(result, status=action, uuid=uuid, hash=content_hash(definition))
+
+    state = load_state(directory)
+    for result in run_bounded(upsert, [job for job in plan if job[0] != "skip"], workers):
+        counts[result["status"]] = counts.get(result["status"], 0) + 1
+        if result["status"] == "error":
+            print(f"  {os.path.basename(result['path'])}: {result['error']}", file=sys.stderr)
+        elif result.get("uuid"):
+            state[result["uuid"]] = result["hash"]
+    _write_json(os.path.join(directory, STATE_FILE), state)
+    return dict(counts, seconds=round(time.perf_counter() - started, 2))
+
+
+def _read_definition(path: str) -> dict:
+    with open(path, encoding="utf-8") as f:
+        return definition_of(json.load(f))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage Didit questionnaires")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sub.add_parser("list", help="List questionnaires")
+
+    get_p = sub.add_parser("get", help="Get a questionnaire")
+    get_p.add_argument("uuid", help="Questionnaire UUID")
+
+    create_p = sub.add_parser("create", help="Create a questionnaire from a JSON file")
+    create_p.add_argument("file", help="JSON definition (title, languages, form_elements or graph)")
+
+    update_p = sub.add_parser("update", help="Update a questionnaire from a JSON file")
+    update_p.add_argument("uuid", help="Questionnaire UUID")
+    update_p.add_argument("file", help="JSON definition")
+
+    delete_p = sub.add_parser("delete", help="Delete a questionnaire")
+    delete_p.add_argument("uuid", help="Questionnaire UUID")
+
+    for name, help_text in (("export", "Write every questionnaire to a directory"),
+                            ("import", "Create/update questionnaires from a directory")):
+        p = sub.add_parser(name, help=help_text)
+        p.add_argument("directory", help="Directory of questionnaire JSON files")
+        p.add_argument("--workers", type=int, default=8, help="Concurrent requests (default: 8)")
+        p.add_argument("--rate-per-min", type=float, default=300, help="Max requests per minute (default: 300)")
+    import_p = sub.choices["import"]
+    import_p.add_argument("--force", action="store_true", help="Update every file, even if unchanged")
+    import_p.add_argument("--dry-run", action="store_true", help="Show what would change without calling the API")
+
+    args = parser.parse_args()
+
+    if args.command == "list":
+        items = list_questionnaires()
+        for q in items:
+            print(f"  {q.get('uuid')}  {q.get('title')}")
+        print(f"\n--- {len(items)} questionnaire(s) ---")
+
+    elif args.command == "get":
+        print(json.dumps(get_questionnaire(args.uuid), indent=2, ensure_ascii=False))
+
+    elif args.command == "create":
+        result = create_questionnaire(_read_definition(args.file))
+        print(json.dumps(result, indent=2, ensure_ascii=False))
+        print(f"\n--- Questionnaire created: {result.get('uuid')} ---")
+
+    elif args.command == "update":
+        result = update_questionnaire(args.uuid, _read_definition(args.file))
+        print(json.dumps(result, indent=2, ensure_ascii=False))
+
+    elif args.command == "delete":
+        delete_questionnaire(args.uuid)
+        print(f"Questionnaire {args.uuid} deleted.")
+
+    elif args.command == "export":
+        summary = export_questionnaires(args.directory, args.workers, args.rate_per_min)
+        print(f"\n--- Exported {summary['exported']} questionnaire(s) to {args.directory}, "
+              f"{summary['errors']} failed in {summary['seconds']}s ---")
+        if summary["errors"]:
+            sys.exit(1)
+
+    elif args.command == "import":
+        summary = import_questionnaires(args.directory, args.workers, args.rate_per_min, args.force, args.dry_run)
+        prefix = "Dry run: " if args.dry_run else ""
+        print(f"\n--- {prefix}{summary.get('create', 0)} created, {summary.get('update', 0)} updated, "
+              f"{summary['skip']} unchanged, {summary.get('error', 0)} failed, {summary.get('invalid', 0)} invalid "
+              f"in {summary['seconds']}s ---")
+        if summary.get("error") or summary.get("invalid"):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
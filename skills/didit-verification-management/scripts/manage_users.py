@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""Didit Users - List, export, update, and batch-delete verified users.
+
+Usage:
+    python scripts/manage_users.py list [--status S] [--search Q] [--country ISO3] [--limit N]
+    python scripts/manage_users.py get <vendor_data>
+    python scripts/manage_users.py update <vendor_data> [--display-name NAME] [--status S] [--metadata JSON]
+    python scripts/manage_users.py export [--format ndjson|csv] [--output FILE] [--status S] [--page-size N] [--prefetch N]
+    python scripts/manage_users.py delete <vendor_data_file> [--batch-size N] [--workers N] [--dry-run] [--failures FILE]
+
+Environment:
+    DIDIT_API_KEY - Required. Your Didit API key.
+
+Examples:
+    python scripts/manage_users.py list --status Approved --limit 50
+    python scripts/manage_users.py export --format csv --output users.csv
+    python scripts/manage_users.py export --status Declined > declined.ndjson
+    python scripts/manage_users.py delete erasure_requests.txt --batch-size 100 --failures failed.txt
+"""
+import argparse
+import csv
+import json
+import sys
+import time
+
+import requests
+
+try:
+    from api_client import RateLimiter, call_api
+    from bulk_sessions import Progress, run_bounded
+    from create_session import get_headers, iter_paginated
+except ImportError:
+    from .api_client import RateLimiter, call_api
+    from .bulk_sessions import Progress, run_bounded
+    from .create_session import get_headers, iter_paginated
+
+BASE_URL = "https://verification.didit.me/v3/users"
+DELETE_BATCH_SIZE = 100
+USER_FIELDS = ["vendor_data", "full_name", "display_name", "status", "session_count", "issuing_states",
+               "approved_emails", "approved_phones", "created_at"]
+
+
+def list_users(status: str = None, search: str = None, country: str = None,
+               limit: int = 20, offset: int = 0) -> dict:
+    params = {"limit": limit, "offset": offset}
+    for key, value in (("status", status), ("search", search), ("country", country)):
+        if value:
+            params[key] = value
+    r = requests.get(f"{BASE_URL}/", headers=get_headers(), params=params, timeout=30)
+    if r.status_code != 200:
+        print(f"Error {r.status_code}: {r.text}", file=sys.stderr)
+        sys.exit(1)
+    return r.json()
+
+
+def get_user(vendor_data: str) -> dict:
+    r = requests.get(f"{BASE_URL}/{vendor_data}/", headers=get_headers(), timeout=30)
+    if r.status_code != 200:
+        print(f"Error {r.status_code}: {r.text}", file=sys.stderr)
+        sys.exit(1)
+    return r.json()
+
+
+def update_user(vendor_data: str, changes: dict) -> dict:
+    r = requests.patch(f"{BASE_URL}/{vendor_data}/", headers=get_headers(content_type=True),
+                       json=changes, timeout=30)
+    if r.status_code != 200:
+        print(f"Error {r.status_code}: {r.text}", file=sys.stderr)
+        sys.exit(1)
+    return r.json()
+
+
+def iter_users(status: str = None, search: str = None, country: str = None, page_size: int = 200,
+               prefetch: int = 4, rate_per_min: float = 300):
+    """Yield every matching user across all pages, holding at most `prefetch + 1` pages in memory."""
+    filters = {k: v for k, v in (("status", status), ("search", search), ("country", country)) if v}
+    yield from iter_paginated(f"{BASE_URL}/", filters, page_size, prefetch, rate_per_min)
+
+
+def export_users(out, fmt: str = "ndjson", **filters) -> int:
+    """Stream users to the open text file `out` as NDJSON or CSV; returns the count."""
+    count = 0
+    writer = None
+    if fmt == "csv":
+        writer = csv.DictWriter(out, fieldnames=USER_FIELDS, extrasaction="ignore")
+        writer.writeheader()
+    for user in iter_users(**filters):
+        if writer:
+            writer.writerow({k: ";".join(map(str, v)) if isinstance(v, list) else v for k, v in user.items()})
+        else:
+            out.write(json.dumps(user, ensure_ascii=False) + "\n")
+        count += 1
+    return count
+
+
+def read_vendor_data(path: str) -> list:
+    """vendor_data values from a plain list, CSV with a vendor_data column, or NDJSON; deduplicated."""
+    values, seen = [], set()
+    with open(path, encoding="utf-8", newline="") as f:
+        first = f.readline()
+        f.seek(0)
+        if first.startswith("{"):
+            rows = (json.loads(line).get("vendor_data") for line in f if line.strip())
+        elif "vendor_data" in first.split(","):
+            rows = (row.get("vendor_data") for row in csv.DictReader(f))
+        else:
+            rows = (line for line in f)
+        for value in rows:
+            value = (value or "").strip()
+            if value and not value.startswith("#") and value not in seen:
+                seen.add(value)
+                values.append(value)
+    return values
+
+
+def delete_users_batch(vendor_data_list: list, limiter: RateLimiter = None, max_retries: int = 3) -> list:
+    """POST /v3/users/delete/ for one batch; returns one result per request made. Never exits.
+
+    A rejected multi-user batch (400/404/413) is split in half and retried, so unknown
+    or invalid vendor_data values are reported individually. A single unknown user is
+    reported as `not_found` rather than an error.
+    """
+    status, text, elapsed = call_api("POST", f"{BASE_URL}/delete/", limiter, max_retries,
+                                     headers=get_headers(content_type=True),
+                                     json={"vendor_data_list": vendor_data_list})
+    if status in (400, 404, 413) and len(vendor_data_list) > 1:
+        mid = len(vendor_data_list) // 2
+        return (delete_users_batch(vendor_data_list[:mid], limiter, max_retries)
+                + delete_users_batch(vendor_data_list[mid:], limiter, max_retries))
+    result = {"vendor_data_list": vendor_data_list, "size": len(vendor_data_list), "elapsed_ms": elapsed}
+    if status in (200, 204):
+        return [dict(result, status="deleted")]
+    if status == 404:
+        return [dict(result, status="not_found")]
+    return [dict(result, status="error", error=f"{status}: {text[:200]}")]
+
+
+def delete_users(vendor_data_list: list, batch_size: int = DELETE_BATCH_SIZE, rate_per_min: float = 300,
+                 workers: int = 4, progress: Progress = None):
+    """Delete users in `vendor_data_list` batches concurrently; yields one result per request."""
+    limiter = RateLimiter(rate_per_min / 60)
+    batches = (vendor_data_list[i:i + batch_size] for i in range(0, len(vendor_data_list), batch_size))
+    for results in run_bounded(lambda batch: delete_users_batch(batch, limiter), batches, workers):
+        for result in results:
+            if progress is not None:
+                progress.record(result)
+            yield result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage Didit users")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    list_p = sub.add_parser("list", help="List one page of users")
+    list_p.add_argument("--status", help="Approved, Declined, In Review, Pending")
+    list_p.add_argument("--search", help="Search by name or identifier")
+    list_p.add_argument("--country", help="ISO 3166-1 alpha-3")
+    list_p.add_argument("--limit", type=int, default=20, help="Results per page (max 200)")
+    list_p.add_argument("--offset", type=int, default=0, help="Pagination offset")
+
+    get_p = sub.add_parser("get", help="Get one user")
+    get_p.add_argument("vendor_data", help="User identifier")
+
+    update_p = sub.add_parser("update", help="Update one user")
+    update_p.add_argument("vendor_data", help="User identifier")
+    update_p.add_argument("--display-name", help="Custom display name")
+    update_p.add_argument("--status", choices=["Approved", "Declined", "In Review"], help="Manual status override")
+    update_p.add_argument("--metadata", help="Custom metadata as a JSON object")
+
+    export_p = sub.add_parser("export", help="Stream every user to NDJSON or CSV")
+    export_p.add_argument("--format", choices=["ndjson", "csv"], default="ndjson", help="Output format")
+    export_p.add_argument("--output", help="Output file (default: stdout)")
+    export_p.add_argument("--status", help="Only users with this status")
+    export_p.add_argument("--search", help="Search by name or identifier")
+    export_p.add_argument("--country", help="ISO 3166-1 alpha-3")
+    export_p.add_argument("--page-size", type=int, default=200, help="Users per request (default: 200, the max)")
+    export_p.add_argument("--prefetch", type=int, default=4, help="Pages fetched ahead (default: 4)")
+    export_p.add_argument("--rate-per-min", type=float, default=300, help="Max requests per minute (default: 300)")
+
+    del_p = sub.add_parser("delete", help="Batch-delete users listed in a file")
+    del_p.add_argument("file", help="vendor_data per line, CSV with a vendor_data column, or NDJSON")
+    del_p.add_argument("--batch-size", type=int, default=DELETE_BATCH_SIZE,
+                       help=f"vendor_data values per request (default: {DELETE_BATCH_SIZE})")
+    del_p.add_argument("--workers", type=int, default=4, help="Concurrent delete requests (default: 4)")
+    del_p.add_argument("--rate-per-min", type=float, default=300, help="Max requests per minute (default: 300)")
+    del_p.add_argument("--failures", help="Write vendor_data values that failed here (re-drive with delete)")
+    del_p.add_argument("--dry-run", action="store_true", help="Only report what would be deleted")
+
+    args = parser.parse_args()
+
+    if args.command == "list":
+        result = list_users(args.status, args.search, args.country, args.limit, args.offset)
+        print(json.dumps(result, indent=2, ensure_ascii=False))
+        print(f"\n--- {len(result.get('results', []))} of {result.get('count', '?')} user(s) ---")
+
+    elif args.command == "get":
+        print(json.dumps(get_user(args.vendor_data), indent=2, ensure_ascii=False))
+
+    elif args.command == "update":
+        changes = {}
+        if args.display_name:
+            changes["display_name"] = args.display_name
+        if args.status:
+            changes["status"] = args.status
+        if args.metadata:
+            changes["metadata"] = json.loads(args.metadata)
+        if not changes:
+            print("No changes specified. Use --display-name, --status or --metadata.", file=sys.stderr)
+            sys.exit(1)
+        print(json.dumps(update_user(args.vendor_data, changes), indent=2, ensure_ascii=False))
+        print(f"\n--- Updated user: {args.vendor_data} ---")
+
+    elif args.command == "export":
+        started = time.perf_counter()
+        out = open(args.output, "w", encoding="utf-8", newline="") if args.output else sys.stdout
+        try:
+            count = export_users(out, args.format, status=args.status, search=args.search, country=args.country,
+                                 page_size=args.page_size, prefetch=args.prefetch, rate_per_min=args.rate_per_min)
+        finally:
+            if args.output:
+                out.close()
+        elapsed = time.perf_counter() - started
+        print(f"--- Exported {count} user(s) in {elapsed:.1f}s ({count / max(elapsed, 1e-9):.0f}/s) ---",
+              file=sys.stderr)
+
+    elif args.command == "delete":
+        values = read_vendor_data(args.file)
+        batches = -(-len(values) // args.batch_size)
+        if args.dry_run:
+            print(f"--- Dry run: would delete {len(values)} user(s) in {batches} request(s) ---")
+            return
+        progress = Progress("delete-users", args.failures)
+        latencies = []
+        for result in delete_users(values, args.batch_size, args.rate_per_min, args.workers, progress):
+            latencies.append(result["elapsed_ms"])
+            print(f"  batch of {result['size']}: {result['status']} in {result['elapsed_ms']}ms", file=sys.stderr)
+        summary = progress.close()
+        if latencies:
+            latencies.sort()
+            summary.update(requests=len(latencies), p50_ms=latencies[len(latencies) // 2],
+                           p95_ms=latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+                           max_ms=latencies[-1])
+        print(json.dumps(summary, indent=2))
+        counts = ", ".join(f"{k}: {v}" for k, v in sorted(summary["counts"].items()))
+        print(f"\n--- {counts or 'nothing to delete'} in {summary['seconds']}s ---")
+
+
+if __name__ == "__main__":
+    main()
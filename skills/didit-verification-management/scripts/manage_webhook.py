@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""Didit Webhook Configuration - Get and update the webhook URL, version and secret.
+
+`get` answers from the local reference cache while it is fresh (--cache-ttl,
+default 1h). `update`, `rotate-secret` and `disable` write the API's response back to
+the cache, so the next `get` returns the new configuration without a request.
+
+Usage:
+    python scripts/manage_webhook.py get [--refresh] [--show-secret]
+    python scripts/manage_webhook.py update [--url URL] [--version v3] [--capture-method both] [--retention-months N]
+    python scripts/manage_webhook.py rotate-secret
+    python scripts/manage_webhook.py disable
+
+Environment:
+    DIDIT_API_KEY         - Required. Your Didit API key.
+    DIDIT_REFERENCE_CACHE - Cache file (default: ~/.cache/didit/reference.json).
+
+Examples:
+    python scripts/manage_webhook.py get
+    python scripts/manage_webhook.py update --url https://myapp.com/webhooks/didit --version v3
+    python scripts/manage_webhook.py rotate-secret
+"""
+import argparse
+import json
+import sys
+
+import requests
+
+try:
+    from create_session import get_headers
+    from reference_cache import DEFAULT_TTLS, ReferenceCache
+except ImportError:
+    from .create_session import get_headers
+    from .reference_cache import DEFAULT_TTLS, ReferenceCache
+
+BASE_URL = "https://verification.didit.me/v3/webhook"
+
+
+def get_webhook_config(cache: ReferenceCache = None, refresh: bool = False) -> dict:
+    def fetch():
+        r = requests.get(f"{BASE_URL}/", headers=get_headers(), timeout=30)
+        if r.status_code != 200:
+            print(f"Error {r.status_code}: {r.text}", file=sys.stderr)
+            sys.exit(1)
+        return r.json()
+
+    return cache.get("webhook", fetch, refresh) if cache is not None else fetch()
+
+
+def update_webhook_config(changes: dict, cache: ReferenceCache = None) -> dict:
+    r = requests.patch(f"{BASE_URL}/", headers=get_headers(content_type=True), json=changes, timeout=30)
+    if r.status_code != 200:
+        if cache is not None:
+            cache.invalidate("webhook")
+        print(f"Error {r.status_code}: {r.text}", file=sys.stderr)
+        sys.exit(1)
+    config = r.json()
+    if cache is not None:
+        cache.put("webhook", config)
+    return config
+
+
+def rotate_secret(cache: ReferenceCache = None) -> dict:
+    """Generate a new secret_shared_key; the old one stops working immediately."""
+    return update_webhook_config({"rotate_secret_key": True}, cache)
+
+
+def _masked(config: dict, show_secret: bool) -> dict:
+    secret = config.get("secret_shared_key")
+    if show_secret or not secret:
+        return config
+    return dict(config, secret_shared_key=secret[:8] + "…")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the Didit webhook configuration")
+    parser.add_argument("--no-cache", action="store_true", help="Bypass the local reference cache")
+    parser.add_argument("--cache-ttl", type=float, default=DEFAULT_TTLS["webhook"],
+                        help=f"Seconds the cached configuration stays fresh (default: {DEFAULT_TTLS['webhook']})")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    get_p = sub.add_parser("get", help="Show the webhook configuration")
+    get_p.add_argument("--refresh", action="store_true", help="Refetch even if the cache is fresh")
+    get_p.add_argument("--show-secret", action="store_true", help="Print the full secret_shared_key")
+
+    update_p = sub.add_parser("update", help="Update the webhook configuration")
+    update_p.add_argument("--url", help="URL for notifications")
+    update_p.add_argument("--version", choices=["v1", "v2", "v3"], help="Webhook payload version")
+    update_p.add_argument("--capture-method", choices=["mobile", "desktop", "both"])
+    update_p.add_argument("--retention-months", type=int, help="Months to retain session data (1-120)")
+
+    sub.add_parser("rotate-secret", help="Generate a new secret (the old one is invalidated immediately)")
+    sub.add_parser("disable", help="Stop sending webhooks (webhook_url = null)")
+
+    args = parser.parse_args()
+    cache = None if args.no_cache else ReferenceCache(ttls={"webhook": args.cache_ttl})
+
+    if args.command == "get":
+        config = get_webhook_config(cache, args.refresh)
+        print(json.dumps(_masked(config, args.show_secret), indent=2))
+        source = "cache" if cache is not None and cache.hits else "API"
+        print(f"\n--- Webhook: {config.get('webhook_url') or 'disabled'} ({config.get('webhook_version')}, "
+              f"from {source}) ---")
+
+    elif args.command == "update":
+        changes = {}
+        if args.url:
+            changes["webhook_url"] = args.url
+        if args.version:
+            changes["webhook_version"] = args.version
+        if args.capture_method:
+            changes["capture_method"] = args.capture_method
+        if args.retention_months is not None:
+            changes["data_retention_months"] = args.retention_months
+        if not changes:
+            print("No changes specified. Use --url, --version, etc.", file=sys.stderr)
+            sys.exit(1)
+        config = update_webhook_config(changes, cache)
+        print(json.dumps(_masked(config, False), indent=2))
+        print(f"\n--- Webhook updated ---")
+
+    elif args.command == "rotate-secret":
+        config = rotate_secret(cache)
+        print(json.dumps(config, indent=2))
+        print(f"\n--- New secret generated. Update DIDIT_WEBHOOK_SECRET where webhooks are received. ---")
+
+    elif args.command == "disable":
+        update_webhook_config({"webhook_url": None}, cache)
+        print("--- Webhooks disabled ---")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,28 +2,48 @@
 """Didit Workflows - Create, list, update, and delete verification workflows.
 
 Usage:
-    python scripts/manage_workflows.py list
+    python scripts/manage_workflows.py list [--refresh]
     python scripts/manage_workflows.py create [--label NAME] [--type TYPE] [--liveness] [--face-match] [--aml]
-    python scripts/manage_workflows.py get <uuid>
+    python scripts/manage_workflows.py get <uuid> [--refresh]
+    python scripts/manage_workflows.py find [--type TYPE] [--liveness] [--face-match] [--aml]
     python scripts/manage_workflows.py update <uuid> [--enable-aml] [--aml-threshold N]
     python scripts/manage_workflows.py delete <uuid>
+    python scripts/manage_workflows.py apply <workflows.json|yaml> [--dry-run] [--prune] [--workers N]
+
+    list/get answer from the local workflow registry while it is fresh (--cache-ttl,
+    default 1h); create/update/delete keep it current. --no-cache always calls the API.
 
 Environment:
-    DIDIT_API_KEY - Required. Your Didit API key.
+    DIDIT_API_KEY        - Required. Your Didit API key.
+    DIDIT_WORKFLOW_CACHE - Registry file (default: ~/.cache/didit/workflows.json).
 
 Examples:
     python scripts/manage_workflows.py list
+    python scripts/manage_workflows.py find --type kyc --liveness --face-match
     python scripts/manage_workflows.py create --label "Standard KYC" --type kyc --liveness --face-match
     python scripts/manage_workflows.py update abc-123 --enable-aml --aml-threshold 75
     python scripts/manage_workflows.py delete abc-123
+    python scripts/manage_workflows.py apply environments/prod.json --dry-run
 """
 import argparse
 import json
 import os
 import sys
+import time
 
 import requests
 
+try:
+    from api_client import RateLimiter, call_api
+    from bulk_sessions import run_bounded
+    from reference_cache import account_id
+    from workflow_registry import DEFAULT_TTL, WorkflowRegistry, is_complete
+except ImportError:
+    from .api_client import RateLimiter, call_api
+    from .bulk_sessions import run_bounded
+    from .reference_cache import account_id
+    from .workflow_registry import DEFAULT_TTL, WorkflowRegistry, is_complete
+
 BASE_URL = "https://verification.didit.me/v3/workflows"
 
 
@@ -38,15 +58,22 @@ def get_headers(content_type=False) -> dict:
     return h
 
 
-def list_workflows() -> list:
+def list_workflows(registry: WorkflowRegistry = None, refresh: bool = False) -> list:
+    if registry is not None and not refresh:
+        cached = registry.listed()
+        if cached is not None:
+            return cached
     r = requests.get(f"{BASE_URL}/", headers=get_headers(), timeout=30)
     if r.status_code != 200:
         print(f"Error {r.status_code}: {r.text}", file=sys.stderr)
         sys.exit(1)
-    return r.json()
+    workflows = r.json()
+    if registry is not None:
+        registry.replace_all(workflows)
+    return workflows
 
 
-def create_workflow(label=None, wf_type="kyc", liveness=False, face_match=False, aml=False) -> dict:
+def workflow_payload(label=None, wf_type="kyc", liveness=False, face_match=False, aml=False) -> dict:
     payload = {"workflow_type": wf_type}
     if label:
         payload["workflow_label"] = label
@@ -56,42 +83,266 @@ def create_workflow(label=None, wf_type="kyc", liveness=False, face_match=False,
         payload["is_face_match_enabled"] = True
     if aml:
         payload["is_aml_enabled"] = True
+    return payload
+
+
+def create_workflow(label=None, wf_type="kyc", liveness=False, face_match=False, aml=False,
+                    registry: WorkflowRegistry = None) -> dict:
+    payload = workflow_payload(label, wf_type, liveness, face_match, aml)
     r = requests.post(f"{BASE_URL}/", headers=get_headers(content_type=True), json=payload, timeout=30)
     if r.status_code not in (200, 201):
         print(f"Error {r.status_code}: {r.text}", file=sys.stderr)
         sys.exit(1)
-    return r.json()
+    workflow = r.json()
+    if registry is not None:
+        registry.put(workflow, config=payload)
+    return workflow
 
 
-def get_workflow(uuid: str) -> dict:
+def get_workflow(uuid: str, registry: WorkflowRegistry = None, refresh: bool = False) -> dict:
+    if registry is not None and not refresh:
+        cached = registry.get(uuid)
+        if cached is not None and is_complete(cached):
+            return cached
     r = requests.get(f"{BASE_URL}/{uuid}/", headers=get_headers(), timeout=30)
     if r.status_code != 200:
         print(f"Error {r.status_code}: {r.text}", file=sys.stderr)
         sys.exit(1)
-    return r.json()
+    workflow = r.json()
+    if registry is not None:
+        registry.put(workflow)
+    return workflow
 
 
-def update_workflow(uuid: str, changes: dict) -> dict:
+def find_workflow(config: dict, registry: WorkflowRegistry) -> dict:
+    """A workflow on the account matching `config` (see WorkflowRegistry.lookup, shared with run_kyc.py)."""
+    def get_details(uuid):
+        r = requests.get(f"{BASE_URL}/{uuid}/", headers=get_headers(), timeout=30)
+        return r.json() if r.status_code == 200 else None
+
+    return registry.lookup(config, lambda: list_workflows(refresh=True), get_details)
+
+
+def update_workflow(uuid: str, changes: dict, registry: WorkflowRegistry = None) -> dict:
     r = requests.patch(f"{BASE_URL}/{uuid}/", headers=get_headers(content_type=True), json=changes, timeout=30)
     if r.status_code != 200:
         print(f"Error {r.status_code}: {r.text}", file=sys.stderr)
         sys.exit(1)
-    return r.json()
+    workflow = r.json()
+    if registry is not None:
+        if is_complete(workflow):
+            registry.put(workflow)
+        else:
+            registry.remove(uuid)
+    return workflow
 
 
-def delete_workflow(uuid: str) -> bool:
+def delete_workflow(uuid: str, registry: WorkflowRegistry = None) -> bool:
     r = requests.delete(f"{BASE_URL}/{uuid}/", headers=get_headers(), timeout=30)
     if r.status_code not in (200, 204):
         print(f"Error {r.status_code}: {r.text}", file=sys.stderr)
         sys.exit(1)
+    if registry is not None:
+        registry.remove(uuid)
     return True
 
 
+def load_spec(path: str) -> list:
+    """Desired workflows from JSON or YAML: a list, or {"workflows": [...]}.
+
+    Each entry is a workflow body (`workflow_label`, `workflow_type`, `is_*_enabled`,
+    thresholds, ...) and may pin a `uuid`; otherwise it is matched by `workflow_label`.
+    """
+    with open(path, encoding="utf-8") as f:
+        if path.endswith((".yaml", ".yml")):
+            try:
+                import yaml
+            except ImportError:
+                print("Error: YAML specs need PyYAML (pip install pyyaml); or use JSON.", file=sys.stderr)
+                sys.exit(1)
+            spec = yaml.safe_load(f)
+        else:
+            spec = json.load(f)
+    workflows = spec.get("workflows", []) if isinstance(spec, dict) else spec
+    labels = [w.get("workflow_label") for w in workflows if not w.get("uuid")]
+    missing = sum(1 for label in labels if not label)
+    duplicates = sorted({label for label in labels if label and labels.count(label) > 1})
+    if missing or duplicates:
+        print(f"Error: every spec entry needs a uuid or a unique workflow_label "
+              f"({missing} unlabeled, duplicates: {duplicates or 'none'}).", file=sys.stderr)
+        sys.exit(1)
+    return workflows
+
+
+def field_diff(current: dict, desired: dict) -> dict:
+    """Fields of `desired` whose value differs from `current`, as {field: (old, new)}."""
+    return {k: (current.get(k), v) for k, v in desired.items() if k != "uuid" and current.get(k) != v}
+
+
+def _match(spec: dict, by_uuid: dict, by_label: dict):
+    return by_uuid.get(spec["uuid"]) if spec.get("uuid") else by_label.get(spec.get("workflow_label"))
+
+
+def _index(current: list):
+    by_label = {}
+    for w in current:
+        by_label.setdefault(w.get("workflow_label"), w)
+    return {w["uuid"]: w for w in current}, by_label
+
+
+def fetch_details(desired: list, current: list, registry: WorkflowRegistry = None,
+                  workers: int = 8, rate_per_min: float = 300) -> dict:
+    """Full workflows for matched specs whose fields the list entries omit, fetched concurrently.
+
+    Entries fresh in the registry are used without a request.
+    """
+    by_uuid, by_label = _index(current)
+    needed = set()
+    for spec in desired:
+        existing = _match(spec, by_uuid, by_label)
+        if existing is not None and any(k not in existing for k in spec if k != "uuid"):
+            needed.add(existing["uuid"])
+    details = {}
+    for uuid in list(needed):
+        cached = registry.get(uuid) if registry is not None else None
+        if cached is not None and is_complete(cached):
+            details[uuid] = cached
+            needed.discard(uuid)
+    limiter = RateLimiter(rate_per_min / 60)
+
+    def fetch(uuid):
+        status, text, _ = call_api("GET", f"{BASE_URL}/{uuid}/", limiter, headers=get_headers())
+        return uuid, json.loads(text) if status == 200 else None
+
+    for uuid, workflow in run_bounded(fetch, sorted(needed), workers):
+        if workflow is None:
+            print(f"Error: could not fetch workflow {uuid}; diffing its list entry only.", file=sys.stderr)
+            continue
+        details[uuid] = workflow
+        if registry is not None:
+            registry.put(workflow, save=False)
+    if registry is not None and needed:
+        registry.save()
+    return details
+
+
+def _state_path(spec_path: str) -> str:
+    return f"{spec_path}.state.json"
+
+
+def load_managed(spec_path: str) -> set:
+    """UUIDs this spec created or matched on its last apply to the current account."""
+    try:
+        with open(_state_path(spec_path), encoding="utf-8") as f:
+            accounts = json.load(f).get("accounts", {})
+    except (OSError, ValueError):
+        return set()
+    return set(accounts.get(account_id(os.environ.get("DIDIT_API_KEY", "")), []))
+
+
+def save_managed(spec_path: str, uuids: set):
+    path = _state_path(spec_path)
+    try:
+        with open(path, encoding="utf-8") as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        state = {}
+    state.setdefault("accounts", {})[account_id(os.environ.get("DIDIT_API_KEY", ""))] = sorted(uuids)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+
+
+def plan_apply(desired: list, current: list, prune: bool = False, details: dict = None,
+               managed: set = frozenset()) -> list:
+    """Operations that make `current` match `desired`: (op, uuid, label, body, diff).
+
+    `details` (uuid -> full workflow, see fetch_details) fills fields the list omits.
+    With `prune`, only workflows in `managed` (applied from this spec before, see
+    load_managed) that the spec no longer matches are deleted; workflows the spec never
+    managed, such as a second workflow with a spec entry's label, are left alone.
+    """
+    by_uuid, by_label = _index(current)
+    plan, matched = [], set()
+    for spec in desired:
+        label = spec.get("workflow_label")
+        existing = _match(spec, by_uuid, by_label)
+        if existing is None:
+            if spec.get("uuid"):
+                plan.append(("missing", spec["uuid"], label, {}, {}))
+            else:
+                body = {k: v for k, v in spec.items() if k != "uuid"}
+                plan.append(("create", None, label, body, field_diff({}, body)))
+            continue
+        matched.add(existing["uuid"])
+        diff = field_diff(dict(existing, **(details or {}).get(existing["uuid"], {})), spec)
+        plan.append(("update" if diff else "unchanged", existing["uuid"], existing.get("workflow_label"),
+                     {k: new for k, (_, new) in diff.items()}, diff))
+    if prune:
+        for w in current:
+            if w["uuid"] in managed and w["uuid"] not in matched and not w.get("is_default"):
+                plan.append(("delete", w["uuid"], w.get("workflow_label"), {}, {}))
+    return plan
+
+
+def apply_plan(plan: list, registry: WorkflowRegistry = None, workers: int = 8, rate_per_min: float = 300):
+    """Run the create/update/delete operations of `plan` concurrently; yields one result per operation."""
+    limiter = RateLimiter(rate_per_min / 60)
+    methods = {"create": "POST", "update": "PATCH", "delete": "DELETE"}
+
+    def run(op):
+        name, uuid, label, body, _ = op
+        url = f"{BASE_URL}/" if name == "create" else f"{BASE_URL}/{uuid}/"
+        kwargs = {"json": body} if body else {}
+        # A create that times out or gets a 5xx may have been applied; resending would duplicate it
+        status, text, elapsed = call_api(methods[name], url, limiter, retry_unsafe=name != "create",
+                                         headers=get_headers(content_type=bool(body)), **kwargs)
+        result = {"op": name, "uuid": uuid, "label": label, "elapsed_ms": elapsed}
+        if status not in (200, 201, 204):
+            return dict(result, status="error", error=f"{status}: {text[:200]}")
+        return dict(result, status="ok", body=body, workflow=json.loads(text) if text.strip() else {})
+
+    for result in run_bounded(run, [op for op in plan if op[0] in methods], workers):
+        workflow, body = result.pop("workflow", None), result.pop("body", None)
+        if result["status"] == "ok":
+            if result["op"] == "create":
+                result["uuid"] = workflow.get("uuid")
+            if registry is not None:
+                if result["op"] == "delete":
+                    registry.remove(result["uuid"])
+                elif result["op"] == "create":
+                    registry.put(workflow, config=body)
+                elif is_complete(workflow):
+                    registry.put(workflow)
+                else:
+                    registry.remove(result["uuid"])
+        yield result
+
+
+def print_plan(plan: list):
+    symbols = {"create": "+", "update": "~", "delete": "-", "missing": "!"}
+    for op, uuid, label, _, diff in plan:
+        if op == "unchanged":
+            continue
+        print(f"{symbols[op]} {op:7} {label or ''} ({uuid or 'new'})")
+        for field, (old, new) in sorted(diff.items()):
+            print(f"      {field}: {json.dumps(old)} -> {json.dumps(new)}")
+    counts = {}
+    for op in plan:
+        counts[op[0]] = counts.get(op[0], 0) + 1
+    print(f"\n--- Plan: {counts.get('create', 0)} to create, {counts.get('update', 0)} to update, "
+          f"{counts.get('delete', 0)} to delete, {counts.get('unchanged', 0)} unchanged"
+          + (f", {counts['missing']} pinned uuid(s) not found" if counts.get("missing") else "") + " ---")
+
+
 def main():
     parser = argparse.ArgumentParser(description="Manage Didit verification workflows")
+    parser.add_argument("--no-cache", action="store_true", help="Bypass the local workflow registry")
+    parser.add_argument("--cache-ttl", type=float, default=DEFAULT_TTL,
+                        help="Seconds a cached workflow stays fresh (default: 3600)")
     sub = parser.add_subparsers(dest="command", required=True)
 
-    sub.add_parser("list", help="List all workflows")
+    list_p = sub.add_parser("list", help="List all workflows")
+    list_p.add_argument("--refresh", action="store_true", help="Refetch even if the cache is fresh")
 
     create_p = sub.add_parser("create", help="Create a new workflow")
     create_p.add_argument("--label", help="Workflow display name")
@@ -106,6 +357,13 @@ def main():
 
     get_p = sub.add_parser("get", help="Get workflow details")
     get_p.add_argument("uuid", help="Workflow UUID")
+    get_p.add_argument("--refresh", action="store_true", help="Refetch even if the cache is fresh")
+
+    find_p = sub.add_parser("find", help="Find a workflow with this configuration (registry first, then the API)")
+    find_p.add_argument("--type", dest="wf_type", default="kyc", help="Workflow type (default: kyc)")
+    find_p.add_argument("--liveness", action="store_true", help="Liveness detection enabled")
+    find_p.add_argument("--face-match", action="store_true", help="Face match enabled")
+    find_p.add_argument("--aml", action="store_true", help="AML screening enabled")
 
     update_p = sub.add_parser("update", help="Update a workflow")
     update_p.add_argument("uuid", help="Workflow UUID")
@@ -117,10 +375,19 @@ def main():
     del_p = sub.add_parser("delete", help="Delete a workflow")
     del_p.add_argument("uuid", help="Workflow UUID")
 
+    apply_p = sub.add_parser("apply", help="Make workflows match a JSON/YAML spec with minimal changes")
+    apply_p.add_argument("spec", help="JSON or YAML list of workflow bodies (matched by uuid or workflow_label)")
+    apply_p.add_argument("--dry-run", action="store_true", help="Print the plan without changing anything")
+    apply_p.add_argument("--prune", action="store_true",
+                         help="Delete workflows an earlier apply of this spec managed that it no longer lists")
+    apply_p.add_argument("--workers", type=int, default=8, help="Concurrent requests (default: 8)")
+    apply_p.add_argument("--rate-per-min", type=float, default=300, help="Max requests per minute (default: 300)")
+
     args = parser.parse_args()
+    registry = None if args.no_cache else WorkflowRegistry(ttl=args.cache_ttl)
 
     if args.command == "list":
-        workflows = list_workflows()
+        workflows = list_workflows(registry, args.refresh)
         print(json.dumps(workflows, indent=2))
         print(f"\n--- {len(workflows)} workflow(s) ---")
         for wf in workflows:
@@ -128,14 +395,23 @@ def main():
             print(f"  {wf['uuid']} — {wf.get('workflow_label', 'Untitled')} [{wf.get('workflow_type')}]{default}")
 
     elif args.command == "create":
-        result = create_workflow(args.label, args.wf_type, args.liveness, args.face_match, args.aml)
+        result = create_workflow(args.label, args.wf_type, args.liveness, args.face_match, args.aml, registry)
         print(json.dumps(result, indent=2))
         print(f"\n--- Created workflow: {result.get('uuid')} ---")
 
     elif args.command == "get":
-        result = get_workflow(args.uuid)
+        result = get_workflow(args.uuid, registry, args.refresh)
         print(json.dumps(result, indent=2))
 
+    elif args.command == "find":
+        config = workflow_payload(None, args.wf_type, args.liveness, args.face_match, args.aml)
+        result = find_workflow(config, registry or WorkflowRegistry(ttl=args.cache_ttl))
+        if result is None:
+            print("No workflow on the account has this configuration. Use `create`.", file=sys.stderr)
+            sys.exit(1)
+        print(json.dumps(result, indent=2))
+        print(f"\n--- Matching workflow: {result.get('uuid')} ---")
+
     elif args.command == "update":
         changes = {}
         if args.enable_aml:
@@ -149,14 +425,40 @@ def main():
         if not changes:
             print("No changes specified. Use --enable-aml, --label, etc.", file=sys.stderr)
             sys.exit(1)
-        result = update_workflow(args.uuid, changes)
+        result = update_workflow(args.uuid, changes, registry)
         print(json.dumps(result, indent=2))
         print(f"\n--- Updated workflow: {args.uuid} ---")
 
     elif args.command == "delete":
-        delete_workflow(args.uuid)
+        delete_workflow(args.uuid, registry)
         print(f"--- Deleted workflow: {args.uuid} ---")
 
+    elif args.command == "apply":
+        started = time.perf_counter()
+        desired = load_spec(args.spec)
+        current = list_workflows(registry, refresh=True)
+        details = fetch_details(desired, current, registry, args.workers, args.rate_per_min)
+        plan = plan_apply(desired, current, args.prune, details, load_managed(args.spec))
+        print_plan(plan)
+        if args.dry_run:
+            return
+        failed = 0
+        managed = {uuid for op, uuid, *_ in plan if op in ("update", "unchanged")}
+        for result in apply_plan(plan, registry, args.workers, args.rate_per_min):
+            line = f"  {result['op']:7} {result['label'] or ''} ({result['uuid'] or 'new'}) {result['elapsed_ms']:.0f}ms"
+            if result["status"] == "error":
+                failed += 1
+                line += f"  ERROR {result['error']}"
+            if result["op"] == "create" and result["status"] == "ok":
+                managed.add(result["uuid"])
+            elif result["op"] == "delete" and result["status"] == "error":
+                managed.add(result["uuid"])  # still managed; the next --prune retries it
+            print(line)
+        save_managed(args.spec, managed)
+        print(f"\n--- Applied in {time.perf_counter() - started:.2f}s, {failed} failed ---")
+        if failed:
+            sys.exit(1)
+
 
 if __name__ == "__main__":
     main()
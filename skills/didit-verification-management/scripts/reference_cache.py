@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""Read-through disk cache for slow-changing Didit reference data.
+
+Organizations (GET /organizations/me/) and the webhook configuration (GET /v3/webhook/)
+change rarely but are fetched at the start of most automation. This module keeps them
+in a JSON file shared by every CLI invocation, with a TTL per entry. Scripts that
+change the data (e.g. manage_webhook.py update/rotate-secret) write the API's
+response back, so the cache never serves a stale value after our own changes.
+Entries are kept per account; without an account (DIDIT_API_KEY unset) nothing is
+read or written, since every keyless run would otherwise share one bucket. Writes
+hold a cross-process lock (file_lock.py). The file may hold the webhook secret, so
+it is written with mode 0600.
+
+The workflow list has its own cache with configuration hashing: workflow_registry.py.
+
+Environment:
+    DIDIT_REFERENCE_CACHE - Cache file (default: ~/.cache/didit/reference.json).
+
+Usage:
+    from scripts.reference_cache import ReferenceCache
+    cache = ReferenceCache()
+    config = cache.get("webhook", fetch=get_webhook_config)
+"""
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+try:
+    from file_lock import locked
+except ImportError:
+    from .file_lock import locked
+
+CACHE_VERSION = 1
+DEFAULT_TTLS = {"organizations": 24 * 3600, "webhook": 3600}
+DEFAULT_TTL = 3600
+
+
+def default_cache_path() -> str:
+    return os.environ.get("DIDIT_REFERENCE_CACHE") or os.path.join(
+        os.path.expanduser("~"), ".cache", "didit", "reference.json")
+
+
+def account_id(secret: str) -> str:
+    """Stable, non-reversible cache key for an API key or account email."""
+    return hashlib.sha256(secret.strip().encode()).hexdigest()[:12]
+
+
+class ReferenceCache:
+    """TTL cache of reference data for one account, persisted to disk. Disabled without an account."""
+
+    def __init__(self, path: str = None, account: str = None, ttls: dict = None):
+        self.path = path or default_cache_path()
+        api_key = os.environ.get("DIDIT_API_KEY", "").strip()
+        self.account = account or (account_id(api_key) if api_key else None)
+        self.ttls = dict(DEFAULT_TTLS, **(ttls or {}))
+        self.hits = self.misses = 0
+
+    def _load(self) -> dict:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == CACHE_VERSION:
+                return data
+        except (OSError, ValueError):
+            pass
+        return {"version": CACHE_VERSION, "accounts": {}}
+
+    def _save(self, data: dict):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=directory, prefix=".reference-", suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=1)
+        os.replace(tmp, self.path)
+
+    def ttl(self, name: str) -> float:
+        return self.ttls.get(name, DEFAULT_TTL)
+
+    def peek(self, name: str, now: float = None):
+        """The cached value if it is within its TTL, else None. Never fetches."""
+        if self.account is None:
+            return None
+        now = time.time() if now is None else now
+        entry = self._load()["accounts"].get(self.account, {}).get(name)
+        if entry and now - entry["cached_at"] < self.ttl(name):
+            return entry["value"]
+        return None
+
+    def get(self, name: str, fetch, refresh: bool = False, now: float = None):
+        """The cached value, or `fetch()`'s result (then cached) when missing, expired, or `refresh`."""
+        if not refresh:
+            value = self.peek(name, now)
+            if value is not None:
+                self.hits += 1
+                return value
+        self.misses += 1
+        value = fetch()
+        self.put(name, value, now)
+        return value
+
+    def put(self, name: str, value, now: float = None):
+        """Store a fresh value, e.g. the response of our own PATCH."""
+        if self.account is None:
+            return
+        with locked(self.path):
+            data = self._load()
+            data["accounts"].setdefault(self.account, {})[name] = {
+                "value": value, "cached_at": time.time() if now is None else now}
+            self._save(data)
+
+    def invalidate(self, name: str = None):
+        """Drop one entry, or every entry of this account when `name` is None."""
+        if self.account is None:
+            return
+        with locked(self.path):
+            data = self._load()
+            entries = data["accounts"].get(self.account, {})
+            if name is None:
+                entries.clear()
+            else:
+                entries.pop(name, None)
+            self._save(data)
@@ -0,0 +1,393 @@
+#!/usr/bin/env python3
+"""Didit Session Mirror - Local SQLite copy of sessions and decisions for offline queries.
+
+`sync` walks GET /v3/sessions/ and upserts every session, then fetches decisions only
+for sessions that are new or whose status changed since their decision was stored.
+It keeps a high-water mark (the newest session_number seen); later syncs stop paging
+at the first page entirely at or below it, so a repeat sync costs a page or two plus
+the changes. `--full` walks the whole list to pick up status changes on older sessions.
+`ingest` folds webhook events (the NDJSON written by webhook_receiver.py) into the
+same mirror, which also keeps older sessions' statuses current between full syncs.
+`query` and `stats` answer from indexed columns (vendor_data, status, created_at,
+document_country) without calling the API.
+
+Usage:
+    python scripts/session_mirror.py sync [--db sessions.db] [--status STATUS] [--full] [--no-decisions] [--workers N]
+                                          [--rate-per-min N]
+    python scripts/session_mirror.py ingest <events.ndjson> [--db sessions.db]
+    python scripts/session_mirror.py query [--status S] [--vendor-data ID] [--country ISO3] [--since DATE] [--until DATE]
+                                           [--last-days N] [--group-by FIELD] [--count] [--limit N] [--full]
+    python scripts/session_mirror.py stats [--db sessions.db]
+
+Environment:
+    DIDIT_API_KEY   - Required for sync. Your Didit API key.
+    DIDIT_MIRROR_DB - Mirror path used by webhook_handler (default: sessions.db).
+
+Examples:
+    python scripts/session_mirror.py sync --db sessions.db
+    python scripts/session_mirror.py query --status "In Review" --vendor-data user-123
+    python scripts/session_mirror.py query --status Approved --last-days 7 --group-by country
+    python scripts/webhook_receiver.py serve --port 8080 --handler session_mirror:webhook_handler
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone
+
+import requests
+
+try:
+    import create_session
+    from api_client import RateLimiter, http_session, retry_after
+    from create_session import fetch_sessions_page, get_headers, iter_sessions
+except ImportError:
+    from . import create_session
+    from .api_client import RateLimiter, http_session, retry_after
+    from .create_session import fetch_sessions_page, get_headers, iter_sessions
+
+DEFAULT_DB = "sessions.db"
+NO_DECISION_STATUSES = ("Not Started",)
+COLUMNS = ["session_id", "session_number", "status", "vendor_data", "workflow_id", "created_at",
+           "document_country", "document_type", "full_name", "decision_status", "synced_at"]
+GROUP_BY = {"status": "status", "country": "document_country", "vendor_data": "vendor_data",
+            "workflow": "workflow_id", "date": "substr(created_at, 1, 10)"}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id TEXT PRIMARY KEY,
+    session_number INTEGER,
+    status TEXT,
+    vendor_data TEXT,
+    workflow_id TEXT,
+    created_at TEXT,
+    document_country TEXT,
+    document_type TEXT,
+    full_name TEXT,
+    decision_status TEXT,
+    synced_at REAL,
+    session_json TEXT,
+    decision_json TEXT
+);
+CREATE INDEX IF NOT EXISTS sessions_vendor_data ON sessions (vendor_data, created_at);
+CREATE INDEX IF NOT EXISTS sessions_status ON sessions (status, created_at);
+CREATE INDEX IF NOT EXISTS sessions_created ON sessions (created_at);
+CREATE INDEX IF NOT EXISTS sessions_country ON sessions (document_country, created_at);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+
+def _iso(value):
+    """created_at as an ISO-8601 UTC string whether the API sent a string or epoch seconds."""
+    if isinstance(value, (int, float)):
+        return datetime.fromtimestamp(value, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+    return value
+
+
+def decision_fields(decision: dict) -> dict:
+    """Indexed columns derived from a decision: document country/type and name."""
+    ids = decision.get("id_verifications") or [{}]
+    first = ids[0] or {}
+    name = first.get("full_name") or " ".join(filter(None, (first.get("first_name"), first.get("last_name"))))
+    return {"document_country": first.get("issuing_state") or first.get("nationality"),
+            "document_type": first.get("document_type"),
+            "full_name": name or None}
+
+
+class SessionMirror:
+    """SQLite mirror (WAL mode) of sessions keyed by session_id."""
+
+    def __init__(self, path: str = DEFAULT_DB):
+        self.path = path
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def upsert_sessions(self, sessions: list):
+        """Upsert list-endpoint rows; decision-derived columns are kept."""
+        now = time.time()
+        rows = [(s["session_id"], s.get("session_number"), s.get("status"), s.get("vendor_data"),
+                 s.get("workflow_id"), _iso(s.get("created_at")), s.get("country") or s.get("issuing_state"),
+                 now, json.dumps(s, ensure_ascii=False)) for s in sessions if s.get("session_id")]
+        with self._lock, self.conn:
+            self.conn.executemany(
+                "INSERT INTO sessions (session_id, session_number, status, vendor_data, workflow_id, created_at, "
+                "document_country, synced_at, session_json) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(session_id) DO UPDATE SET session_number = excluded.session_number, "
+                "status = excluded.status, vendor_data = excluded.vendor_data, workflow_id = excluded.workflow_id, "
+                "created_at = COALESCE(excluded.created_at, sessions.created_at), "
+                "document_country = COALESCE(sessions.document_country, excluded.document_country), "
+                "synced_at = excluded.synced_at, session_json = excluded.session_json", rows)
+
+    def store_decision(self, session_id: str, decision: dict, status: str = None, vendor_data: str = None):
+        """Store a decision (from the API or a webhook) and its indexed fields.
+
+        `status` is the session status the decision belongs to (defaults to the decision's own);
+        it is recorded as `decision_status` so later syncs only refetch on a status change.
+        """
+        fields = decision_fields(decision)
+        status = status or decision.get("status")
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT INTO sessions (session_id, status, vendor_data, decision_status, document_country, "
+                "document_type, full_name, decision_json, synced_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(session_id) DO UPDATE SET status = COALESCE(excluded.status, sessions.status), "
+                "vendor_data = COALESCE(excluded.vendor_data, sessions.vendor_data), "
+                "decision_status = excluded.decision_status, "
+                "document_country = COALESCE(excluded.document_country, sessions.document_country), "
+                "document_type = COALESCE(excluded.document_type, sessions.document_type), "
+                "full_name = COALESCE(excluded.full_name, sessions.full_name), "
+                "decision_json = excluded.decision_json, synced_at = excluded.synced_at",
+                (session_id, status, vendor_data or decision.get("vendor_data"), status, fields["document_country"],
+                 fields["document_type"], fields["full_name"], json.dumps(decision, ensure_ascii=False),
+                 time.time()))
+
+    def apply_event(self, event: dict):
+        """Fold one webhook event into the mirror."""
+        session_id = event.get("session_id")
+        if not session_id:
+            return
+        if event.get("decision"):
+            self.store_decision(session_id, event["decision"], event.get("status"), event.get("vendor_data"))
+            return
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT INTO sessions (session_id, status, vendor_data, synced_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(session_id) DO UPDATE SET status = COALESCE(excluded.status, sessions.status), "
+                "vendor_data = COALESCE(excluded.vendor_data, sessions.vendor_data), synced_at = excluded.synced_at",
+                (session_id, event.get("status"), event.get("vendor_data"), time.time()))
+
+    def stale_decisions(self) -> list:
+        """(session_id, status) pairs whose stored decision is missing or predates the current status."""
+        placeholders = ",".join("?" * len(NO_DECISION_STATUSES))
+        return self.conn.execute(
+            f"SELECT session_id, status FROM sessions WHERE status NOT IN ({placeholders}) "
+            "AND (decision_status IS NULL OR decision_status != status)", NO_DECISION_STATUSES).fetchall()
+
+    def set_meta(self, key: str, value):
+        with self._lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, json.dumps(value)))
+
+    def get_meta(self, key: str):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def query(self, status: str = None, vendor_data: str = None, country: str = None, since: str = None,
+              until: str = None, group_by: str = None, count: bool = False, limit: int = None,
+              full: bool = False) -> list:
+        """Filter the mirror; `since` is inclusive and `until` exclusive (ISO dates or datetimes)."""
+        where, params = [], []
+        for column, value in (("status", status), ("vendor_data", vendor_data), ("document_country", country)):
+            if value:
+                where.append(f"{column} = ?")
+                params.append(value)
+        if since:
+            where.append("created_at >= ?")
+            params.append(since)
+        if until:
+            where.append("created_at < ?")
+            params.append(until)
+        clause = f" WHERE {' AND '.join(where)}" if where else ""
+        if group_by:
+            expr = GROUP_BY[group_by]
+            sql = (f"SELECT {expr} AS {group_by}, COUNT(*) AS count FROM sessions{clause} "
+                   f"GROUP BY {expr} ORDER BY count DESC")
+        elif count:
+            sql = f"SELECT COUNT(*) AS count FROM sessions{clause}"
+        else:
+            columns = COLUMNS + (["session_json", "decision_json"] if full else [])
+            sql = f"SELECT {', '.join(columns)} FROM sessions{clause} ORDER BY created_at DESC"
+            if limit:
+                sql += f" LIMIT {int(limit)}"
+        cursor = self.conn.execute(sql, params)
+        names = [d[0] for d in cursor.description]
+        rows = [dict(zip(names, row)) for row in cursor]
+        if full:
+            for row in rows:
+                for key in ("session_json", "decision_json"):
+                    row[key] = json.loads(row[key]) if row[key] else None
+        return rows
+
+    def close(self):
+        self.conn.close()
+
+
+def fetch_decision(session_id: str, limiter: RateLimiter = None, max_retries: int = 3) -> dict:
+    """GET one decision, retrying 429s. Returns the decision, or {"error": ...}. Never exits."""
+    for attempt in range(max_retries + 1):
+        if limiter is not None:
+            limiter.acquire()
+        try:
+            r = http_session().get(f"{create_session.BASE_URL}/session/{session_id}/decision/",
+                            headers=get_headers(), timeout=30)
+        except requests.RequestException as e:
+            if attempt < max_retries:
+                time.sleep(2 ** attempt)
+                continue
+            return {"error": str(e)}
+        if r.status_code == 429 and attempt < max_retries:
+            time.sleep(retry_after(r, 2 ** attempt))
+            continue
+        if r.status_code != 200:
+            return {"error": f"{r.status_code}: {r.text}"}
+        return r.json()
+
+
+def iter_new_sessions(high_water: int, status: str = None, page_size: int = 200, rate_per_min: float = 300):
+    """Yield sessions from the newest-first list, stopping after the first page entirely at or below `high_water`."""
+    filters = {"status": status} if status else {}
+    limiter = RateLimiter(rate_per_min / 60)
+    offset = 0
+    while True:
+        results = fetch_sessions_page(offset, page_size, filters, limiter).get("results", [])
+        yield from results
+        if len(results) < page_size or all((s.get("session_number") or 0) <= high_water for s in results):
+            return
+        offset += page_size
+
+
+def sync(mirror: SessionMirror, status: str = None, decisions: bool = True, workers: int = 4,
+         rate_per_min: float = 300, page_size: int = 200, batch_size: int = 500, full: bool = False) -> dict:
+    """Upsert listed sessions, then refresh stale decisions. Returns counters.
+
+    Without `full`, only pages newer than the stored high-water mark for this `status`
+    filter are listed; the first sync, or one with `full`, walks every page.
+    """
+    started = time.perf_counter()
+    mark_key = f"high_water:{status or '*'}"
+    high_water = None if full else mirror.get_meta(mark_key)
+    if high_water is None:
+        sessions = iter_sessions(status=status, page_size=page_size, rate_per_min=rate_per_min)
+    else:
+        sessions = iter_new_sessions(high_water, status, page_size, rate_per_min)
+    newest = high_water or 0
+    listed, batch = 0, []
+    for session in sessions:
+        newest = max(newest, session.get("session_number") or 0)
+        batch.append(session)
+        if len(batch) >= batch_size:
+            mirror.upsert_sessions(batch)
+            listed += len(batch)
+            batch = []
+    mirror.upsert_sessions(batch)
+    listed += len(batch)
+    if newest:
+        mirror.set_meta(mark_key, newest)
+
+    stale = mirror.stale_decisions() if decisions else []
+    fetched, errors = 0, 0
+    if stale:
+        limiter = RateLimiter(rate_per_min / 60)
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            futures = {pool.submit(fetch_decision, sid, limiter): (sid, listed_status)
+                       for sid, listed_status in stale}
+            for future in as_completed(futures):
+                sid, listed_status = futures[future]
+                decision = future.result()
+                if "error" in decision:
+                    errors += 1
+                    print(f"Decision {sid}: {decision['error']}", file=sys.stderr)
+                    continue
+                mirror.store_decision(sid, decision, listed_status)
+                fetched += 1
+
+    result = {"mode": "full" if high_water is None else "incremental", "high_water": newest or None,
+              "listed": listed, "decisions_fetched": fetched, "decision_errors": errors,
+              "seconds": round(time.perf_counter() - started, 2)}
+    mirror.set_meta("last_sync", dict(result, at=datetime.now(timezone.utc).isoformat(), status=status))
+    return result
+
+
+def ingest_events(mirror: SessionMirror, path: str) -> int:
+    """Apply every event in a webhook NDJSON file; returns how many were applied."""
+    applied = 0
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                mirror.apply_event(json.loads(line))
+                applied += 1
+    return applied
+
+
+_handler_mirror = None
+
+
+def webhook_handler(event: dict, headers: dict):
+    """webhook_receiver.py handler (`--handler session_mirror:webhook_handler`); writes to $DIDIT_MIRROR_DB."""
+    global _handler_mirror
+    if _handler_mirror is None:
+        _handler_mirror = SessionMirror(os.environ.get("DIDIT_MIRROR_DB", DEFAULT_DB))
+    _handler_mirror.apply_event(event)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local SQLite mirror of Didit sessions")
+    parser.add_argument("--db", default=DEFAULT_DB, help=f"Mirror database path (default: {DEFAULT_DB})")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sync_p = sub.add_parser("sync", help="Pull sessions (and changed decisions) into the mirror")
+    sync_p.add_argument("--status", help="Only sync sessions with this status")
+    sync_p.add_argument("--full", action="store_true",
+                        help="Walk every page instead of stopping at the last sync's newest session")
+    sync_p.add_argument("--no-decisions", action="store_true", help="Skip fetching decisions")
+    sync_p.add_argument("--workers", type=int, default=4, help="Concurrent decision fetches (default: 4)")
+    sync_p.add_argument("--rate-per-min", type=float, default=300, help="Max API requests/min (default: 300)")
+
+    ingest_p = sub.add_parser("ingest", help="Apply webhook events from an NDJSON file")
+    ingest_p.add_argument("events", help="NDJSON file written by webhook_receiver.py --output")
+
+    query_p = sub.add_parser("query", help="Query the mirror (no API calls)")
+    query_p.add_argument("--status", help="Filter by status")
+    query_p.add_argument("--vendor-data", help="Filter by vendor_data")
+    query_p.add_argument("--country", help="Filter by document country (ISO 3166-1 alpha-3)")
+    query_p.add_argument("--since", help="Created on/after (YYYY-MM-DD or ISO datetime)")
+    query_p.add_argument("--until", help="Created before (YYYY-MM-DD or ISO datetime)")
+    query_p.add_argument("--last-days", type=int, help="Shortcut for --since N days ago")
+    query_p.add_argument("--group-by", choices=sorted(GROUP_BY), help="Count sessions per group")
+    query_p.add_argument("--count", action="store_true", help="Only print the number of matches")
+    query_p.add_argument("--limit", type=int, help="Max rows")
+    query_p.add_argument("--full", action="store_true", help="Include stored session and decision JSON")
+
+    sub.add_parser("stats", help="Counts by status and last sync info")
+
+    args = parser.parse_args()
+    mirror = SessionMirror(args.db)
+
+    if args.command == "sync":
+        result = sync(mirror, args.status, not args.no_decisions, args.workers, args.rate_per_min, full=args.full)
+        print(json.dumps(result, indent=2))
+        print(f"\n--- Synced {result['listed']} sessions, {result['decisions_fetched']} decisions "
+              f"in {result['seconds']}s ---")
+
+    elif args.command == "ingest":
+        applied = ingest_events(mirror, args.events)
+        print(f"--- Applied {applied} events ---")
+
+    elif args.command == "query":
+        since = args.since
+        if args.last_days is not None:
+            since = (datetime.now(timezone.utc) - timedelta(days=args.last_days)).strftime("%Y-%m-%d")
+        started = time.perf_counter()
+        rows = mirror.query(args.status, args.vendor_data, args.country, since, args.until,
+                            args.group_by, args.count, args.limit, args.full)
+        elapsed = (time.perf_counter() - started) * 1000
+        for row in rows:
+            print(json.dumps(row, ensure_ascii=False))
+        print(f"--- {len(rows)} rows in {elapsed:.1f}ms ---", file=sys.stderr)
+
+    elif args.command == "stats":
+        print(json.dumps({"sessions": mirror.query(count=True)[0]["count"],
+                          "by_status": mirror.query(group_by="status"),
+                          "last_sync": mirror.get_meta("last_sync")}, indent=2))
+
+    mirror.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,26 +1,52 @@
 #!/usr/bin/env python3
 """Didit Account Setup - Register, verify, and login programmatically.
 
+Access tokens from verify/login are cached per account in a 0600 file and reused
+until shortly before they expire, so automation that needs Bearer calls
+(organizations/me, application credentials) doesn't log in every time. The cache is
+locked across processes: parallel jobs that find the token stale wait for one
+login and then share its token. `orgs` also keeps the organization list in the
+reference cache (reference_cache.py) for a day.
+
 Usage:
     python scripts/setup_account.py register <email> <password>
     python scripts/setup_account.py verify <email> <code>
     python scripts/setup_account.py login <email> <password>
+    python scripts/setup_account.py token <email> [--refresh]
+    python scripts/setup_account.py orgs <email> [--refresh]
+    python scripts/setup_account.py logout <email>
 
 Environment:
     No environment variables needed for register/verify/login.
+    DIDIT_PASSWORD    - Password for token/orgs when the cached token must be renewed.
+    DIDIT_TOKEN_CACHE - Token cache file (default: ~/.cache/didit/tokens.json).
+    DIDIT_REFERENCE_CACHE - Organization cache file (default: ~/.cache/didit/reference.json).
 
 Examples:
     python scripts/setup_account.py register dev@gmail.com 'MyStr0ng!Pass'
     python scripts/setup_account.py verify dev@gmail.com A3K9F2
     python scripts/setup_account.py login dev@gmail.com 'MyStr0ng!Pass'
+    TOKEN=$(python scripts/setup_account.py token dev@gmail.com)
 """
 import argparse
+import hashlib
 import json
+import os
 import sys
+import tempfile
+import time
 
 import requests
 
+try:
+    from file_lock import locked
+    from reference_cache import ReferenceCache, account_id
+except ImportError:
+    from .file_lock import locked
+    from .reference_cache import ReferenceCache, account_id
+
 AUTH_BASE_URL = "https://apx.didit.me/auth/v2"
+REFRESH_MARGIN = 300
 
 
 def register(email: str, password: str) -> dict:
@@ -62,6 +88,94 @@ def login(email: str, password: str) -> dict:
     sys.exit(1)
 
 
+def default_token_cache() -> str:
+    return os.environ.get("DIDIT_TOKEN_CACHE") or os.path.join(
+        os.path.expanduser("~"), ".cache", "didit", "tokens.json")
+
+
+def _account(email: str) -> str:
+    return hashlib.sha256(email.strip().lower().encode()).hexdigest()[:16]
+
+
+def _load_tokens(path: str) -> dict:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_tokens(path: str, tokens: dict):
+    """Write atomically; mkstemp creates the file 0600, so tokens are never world-readable."""
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), prefix=".tokens-", suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(tokens, f, indent=1)
+    os.replace(tmp, path)
+
+
+def _entry(result: dict) -> dict:
+    return {"access_token": result["access_token"], "refresh_token": result.get("refresh_token"),
+            "expires_at": time.time() + float(result.get("expires_in") or 0)}
+
+
+def cache_token(email: str, result: dict, path: str = None):
+    """Store the tokens from a login/verify response for `email`."""
+    if not result.get("access_token"):
+        return
+    path = path or default_token_cache()
+    with locked(path):
+        tokens = _load_tokens(path)
+        tokens[_account(email)] = _entry(result)
+        _save_tokens(path, tokens)
+
+
+def get_access_token(email: str, password: str = None, refresh: bool = False, path: str = None,
+                     margin: float = REFRESH_MARGIN) -> str:
+    """A valid access token for `email`: the cached one unless it expires within `margin` seconds.
+
+    Otherwise logs in once (with `password`) while holding the cache lock, so concurrent
+    callers reuse the new token instead of each logging in.
+    """
+    path = path or default_token_cache()
+    with locked(path):
+        tokens = _load_tokens(path)
+        entry = tokens.get(_account(email))
+        if entry and not refresh and entry["expires_at"] - margin > time.time():
+            return entry["access_token"]
+        if not password:
+            print("Error: cached token missing or expiring; set DIDIT_PASSWORD to log in again.", file=sys.stderr)
+            sys.exit(1)
+        result = login(email, password)
+        tokens[_account(email)] = _entry(result)
+        _save_tokens(path, tokens)
+        return result["access_token"]
+
+
+def forget_token(email: str, path: str = None) -> bool:
+    path = path or default_token_cache()
+    with locked(path):
+        tokens = _load_tokens(path)
+        removed = tokens.pop(_account(email), None) is not None
+        _save_tokens(path, tokens)
+    return removed
+
+
+def list_organizations(access_token: str) -> list:
+    response = requests.get(f"{AUTH_BASE_URL}/organizations/me/",
+                            headers={"Authorization": f"Bearer {access_token}"}, timeout=30)
+    if response.status_code == 200:
+        return response.json()
+    print(f"Error {response.status_code}: {response.text}", file=sys.stderr)
+    sys.exit(1)
+
+
+def cached_organizations(email: str, password: str = None, refresh: bool = False,
+                         cache: ReferenceCache = None) -> list:
+    """Organizations for `email` from the reference cache; logs in (via the token cache) only on a miss."""
+    cache = cache or ReferenceCache(account=account_id(email.lower()))
+    return cache.get("organizations", lambda: list_organizations(get_access_token(email, password)), refresh)
+
+
 def main():
     parser = argparse.ArgumentParser(description="Didit account setup")
     sub = parser.add_subparsers(dest="command", required=True)
@@ -78,6 +192,17 @@ def main():
     log_p.add_argument("email", help="Account email")
     log_p.add_argument("password", help="Account password")
 
+    token_p = sub.add_parser("token", help="Print a valid access token (cached until near expiry)")
+    token_p.add_argument("email", help="Account email")
+    token_p.add_argument("--refresh", action="store_true", help="Log in again even if the cached token is valid")
+
+    orgs_p = sub.add_parser("orgs", help="List organizations with the cached access token")
+    orgs_p.add_argument("email", help="Account email")
+    orgs_p.add_argument("--refresh", action="store_true", help="Refetch even if the cached list is fresh")
+
+    logout_p = sub.add_parser("logout", help="Remove the cached token for an account")
+    logout_p.add_argument("email", help="Account email")
+
     args = parser.parse_args()
 
     if args.command == "register":
@@ -87,6 +212,7 @@ def main():
 
     elif args.command == "verify":
         result = verify_email(args.email, args.code)
+        cache_token(args.email, result)
         print(json.dumps(result, indent=2))
         api_key = result.get("application", {}).get("api_key", "")
         org_uuid = result.get("organization", {}).get("uuid", "")
@@ -100,8 +226,21 @@ def main():
 
     elif args.command == "login":
         result = login(args.email, args.password)
+        cache_token(args.email, result)
         print(json.dumps(result, indent=2))
-        print(f"\n--- Login successful. Access token expires in {result.get('expires_in', '?')}s ---")
+        print(f"\n--- Login successful. Access token expires in {result.get('expires_in', '?')}s (cached) ---")
+
+    elif args.command == "token":
+        print(get_access_token(args.email, os.environ.get("DIDIT_PASSWORD"), args.refresh))
+
+    elif args.command == "orgs":
+        orgs = cached_organizations(args.email, os.environ.get("DIDIT_PASSWORD"), args.refresh)
+        print(json.dumps(orgs, indent=2))
+        print(f"\n--- {len(orgs)} organization(s) ---")
+
+    elif args.command == "logout":
+        removed = forget_token(args.email)
+        print(f"--- {'Removed cached token' if removed else 'No cached token'} for {args.email} ---")
 
 
 if __name__ == "__main__":
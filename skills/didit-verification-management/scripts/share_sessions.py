@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""Didit B2B KYC Sharing - Move finished sessions from one account to another.
+
+Runs three stages at once, connected by bounded queues so a slow stage holds back
+the ones before it instead of piling up memory:
+
+    sender sessions ──> share workers ──> import workers ──> journal
+    (list or file)      POST /v3/session/{id}/share/      POST /v3/session/import-shared/
+                        (sender key)                      (receiver key)
+
+Every imported session is appended to `--journal` as it completes. A rerun with the
+same journal skips those sessions, so an interrupted migration resumes where it stopped.
+
+Usage:
+    python scripts/share_sessions.py --workflow-id UUID [--status Approved] [--journal FILE]
+    python scripts/share_sessions.py --workflow-id UUID --ids finished.ndjson [--no-trust-review]
+
+Environment:
+    DIDIT_API_KEY        - Required. API key of the sharing (sender) account.
+    DIDIT_TARGET_API_KEY - Required. API key of the importing (receiver) account.
+
+Examples:
+    python scripts/share_sessions.py --workflow-id d8d2fa2d-... --status Approved --failures failed.txt
+    python scripts/share_sessions.py --workflow-id d8d2fa2d-... --ids failed.txt
+"""
+import argparse
+import json
+import os
+import queue
+import sys
+import threading
+
+try:
+    from api_client import RateLimiter, call_api
+    from bulk_sessions import Progress
+    from create_session import get_headers, iter_sessions
+except ImportError:
+    from .api_client import RateLimiter, call_api
+    from .bulk_sessions import Progress
+    from .create_session import get_headers, iter_sessions
+
+BASE_URL = "https://verification.didit.me/v3"
+_DONE = object()
+
+
+def target_headers() -> dict:
+    api_key = os.environ.get("DIDIT_TARGET_API_KEY")
+    if not api_key:
+        print("Error: DIDIT_TARGET_API_KEY environment variable is not set.", file=sys.stderr)
+        sys.exit(1)
+    return {"x-api-key": api_key, "Content-Type": "application/json"}
+
+
+def read_sources(path: str):
+    """Yield {"session_id", "vendor_data"} from a UUID-per-line or NDJSON file."""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if line.startswith("{"):
+                row = json.loads(line)
+                if row.get("session_id"):
+                    yield {"session_id": row["session_id"], "vendor_data": row.get("vendor_data")}
+            else:
+                yield {"session_id": line.split(",")[0].strip(), "vendor_data": None}
+
+
+def iter_sources(path: str = None, status: str = "Approved", vendor_data: str = None, country: str = None,
+                 workflow_id: str = None, rate_per_min: float = 300):
+    """Sessions to share: from `path`, else the sender's sessions matching the filters."""
+    if path:
+        yield from read_sources(path)
+        return
+    for session in iter_sessions(status, vendor_data, country, workflow_id, page_size=200,
+                                 rate_per_min=rate_per_min):
+        yield {"session_id": session["session_id"], "vendor_data": session.get("vendor_data")}
+
+
+def load_journal(path: str) -> set:
+    """Session IDs already imported according to the journal."""
+    done = set()
+    if path and os.path.isfile(path):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    done.add(json.loads(line)["session_id"])
+                except (ValueError, KeyError):
+                    continue
+    return done
+
+
+def share_session(source: dict, limiter: RateLimiter = None) -> dict:
+    """POST share on the sender account; returns the source with `share_token` or an error."""
+    status, text, elapsed = call_api("POST", f"{BASE_URL}/session/{source['session_id']}/share/", limiter,
+                                     headers=get_headers(content_type=True))
+    result = dict(source, share_ms=elapsed)
+    if status not in (200, 201):
+        return dict(result, status="error", stage="share", error=f"{status}: {text[:200]}")
+    return dict(result, share_token=json.loads(text).get("share_token"))
+
+
+def import_shared(shared: dict, workflow_id: str, headers: dict, trust_review: bool = True,
+                  keep_vendor_data: bool = True, limiter: RateLimiter = None) -> dict:
+    """POST import-shared on the receiver account with the token from share_session()."""
+    body = {"share_token": shared["share_token"], "trust_review": trust_review, "workflow_id": workflow_id}
+    if keep_vendor_data and shared.get("vendor_data"):
+        body["vendor_data"] = shared["vendor_data"]
+    # A session imports once per partner, so an import that timed out or got a 5xx is not resent:
+    # it may have succeeded, and the resend would fail and hide that.
+    status, text, elapsed = call_api("POST", f"{BASE_URL}/session/import-shared/", limiter, retry_unsafe=False,
+                                     headers=headers, json=body)
+    result = {"session_id": shared["session_id"], "vendor_data": shared.get("vendor_data"),
+              "share_ms": shared.get("share_ms"), "import_ms": elapsed}
+    if status is None or status >= 500:
+        return dict(result, status="error", stage="import",
+                    error=f"{status}: outcome unknown, check the receiver before re-driving: {text[:200]}")
+    if status not in (200, 201):
+        return dict(result, status="error", stage="import", error=f"{status}: {text[:200]}")
+    return dict(result, status="imported", imported_session_id=json.loads(text).get("session_id"))
+
+
+def run_pipeline(sources, workflow_id: str, trust_review: bool = True, keep_vendor_data: bool = True,
+                 share_workers: int = 8, import_workers: int = 8, queue_size: int = 100,
+                 share_rate_per_min: float = 300, import_rate_per_min: float = 300, skip: set = frozenset()):
+    """Share and import every source concurrently; yields one result per session as it completes.
+
+    Sources whose session_id is in `skip` yield {"status": "skipped"} without any call.
+    """
+    receiver = target_headers()
+    get_headers()  # fail fast if the sender key is missing too
+    share_limiter = RateLimiter(share_rate_per_min / 60)
+    import_limiter = RateLimiter(import_rate_per_min / 60)
+    to_share, to_import, results = queue.Queue(queue_size), queue.Queue(queue_size), queue.Queue(queue_size)
+
+    def feed():
+        try:
+            for source in sources:
+                if source["session_id"] in skip:
+                    results.put(dict(source, status="skipped"))
+                else:
+                    to_share.put(source)
+        except (Exception, SystemExit) as e:
+            results.put({"session_id": None, "status": "error", "stage": "list", "error": str(e)})
+        finally:
+            for _ in range(share_workers):
+                to_share.put(_DONE)
+
+    # Each item is caught on its own: a worker that died would lose its item, and once every
+    # importer is gone the sharers block on to_import and the pipeline never finishes.
+    def share():
+        while (source := to_share.get()) is not _DONE:
+            try:
+                shared = share_session(source, share_limiter)
+            except Exception as e:
+                shared = dict(source, status="error", stage="share", error=str(e))
+            (results if shared.get("status") == "error" else to_import).put(shared)
+
+    def import_():
+        while (shared := to_import.get()) is not _DONE:
+            try:
+                result = import_shared(shared, workflow_id, receiver, trust_review, keep_vendor_data, import_limiter)
+            except Exception as e:
+                result = {"session_id": shared["session_id"], "vendor_data": shared.get("vendor_data"),
+                          "status": "error", "stage": "import", "error": f"outcome unknown: {e}"}
+            results.put(result)
+
+    def close():
+        for t in sharers:
+            t.join()
+        for _ in range(import_workers):
+            to_import.put(_DONE)
+        for t in importers:
+            t.join()
+        results.put(_DONE)
+
+    sharers = [threading.Thread(target=share, daemon=True) for _ in range(share_workers)]
+    importers = [threading.Thread(target=import_, daemon=True) for _ in range(import_workers)]
+    for t in [threading.Thread(target=feed, daemon=True), *sharers, *importers,
+              threading.Thread(target=close, daemon=True)]:
+        t.start()
+    while (result := results.get()) is not _DONE:
+        yield result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Share finished sessions to another Didit account and import them")
+    parser.add_argument("--workflow-id", required=True, help="Receiver's workflow UUID for imported sessions")
+    parser.add_argument("--ids", help="File of sender session UUIDs (one per line) or NDJSON with session_id")
+    parser.add_argument("--status", default="Approved", help="Sender sessions with this status (default: Approved)")
+    parser.add_argument("--vendor-data", help="Only sender sessions for this vendor_data")
+    parser.add_argument("--country", help="Only sender sessions from this country (ISO 3166-1 alpha-3)")
+    parser.add_argument("--source-workflow-id", help="Only sender sessions of this workflow")
+    parser.add_argument("--no-trust-review", action="store_true",
+                        help="Import as 'In Review' instead of keeping the original status")
+    parser.add_argument("--no-vendor-data", action="store_true", help="Don't copy vendor_data to the receiver")
+    parser.add_argument("--journal", default="share_journal.ndjson",
+                        help="Imported sessions are appended here and skipped on rerun (default: share_journal.ndjson)")
+    parser.add_argument("--failures", help="Write session IDs that failed to share or import here")
+    parser.add_argument("--share-workers", type=int, default=8, help="Concurrent share requests (default: 8)")
+    parser.add_argument("--import-workers", type=int, default=8, help="Concurrent import requests (default: 8)")
+    parser.add_argument("--queue-size", type=int, default=100, help="Items buffered between stages (default: 100)")
+    parser.add_argument("--share-rate-per-min", type=float, default=300, help="Sender request limit (default: 300)")
+    parser.add_argument("--import-rate-per-min", type=float, default=300, help="Receiver request limit (default: 300)")
+    args = parser.parse_args()
+
+    done = load_journal(args.journal)
+    if done:
+        print(f"Resuming: {len(done)} session(s) already imported per {args.journal}", file=sys.stderr)
+    sources = iter_sources(args.ids, args.status, args.vendor_data, args.country, args.source_workflow_id,
+                           args.share_rate_per_min)
+    progress = Progress("share-import", args.failures)
+    failed_stages = {}
+    with open(args.journal, "a", encoding="utf-8") as journal:
+        for result in run_pipeline(sources, args.workflow_id, not args.no_trust_review, not args.no_vendor_data,
+                                   args.share_workers, args.import_workers, args.queue_size,
+                                   args.share_rate_per_min, args.import_rate_per_min, done):
+            if result["status"] == "imported":
+                journal.write(json.dumps({k: result.get(k) for k in
+                                          ("session_id", "imported_session_id", "vendor_data")}) + "\n")
+                journal.flush()
+            elif result["status"] == "error":
+                failed_stages[result["stage"]] = failed_stages.get(result["stage"], 0) + 1
+            progress.record(result)
+    summary = progress.close()
+    counts, seconds = summary["counts"], summary["seconds"]
+    imported = counts.get("imported", 0)
+    by_stage = ", ".join(f"{stage}: {n}" for stage, n in sorted(failed_stages.items()))
+    print(f"\n--- Imported {imported}, skipped {counts.get('skipped', 0)}, failed {counts.get('error', 0)}"
+          f"{f' ({by_stage})' if by_stage else ''} in {seconds}s "
+          f"({imported / seconds if seconds else 0:.1f}/s) ---", file=sys.stderr)
+    if counts.get("error"):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+"""Didit Webhook Receiver - Verify, dedupe and dispatch webhook events locally.
+
+A lightweight threaded HTTP server (standard library only) that accepts Didit
+webhooks, verifies X-Signature-V2 / X-Timestamp (falling back to X-Signature-Simple),
+drops retried deliveries, and hands each event to a handler on a worker queue so
+responses return immediately. An event whose handler raises is forgotten, so Didit's
+next retry of it is handled again. Bodies over 5 MB (--max-body-mb) are refused with
+413 before they are read. With --log-dir, accepted events are also written to a
+durable event log (event_log.py) whose index dedupes across restarts and which can
+be replayed later.
+
+Usage:
+    python scripts/webhook_receiver.py serve [--host H] [--port P] [--handler module:function] [--output events.ndjson]
+                                             [--log-dir DIR] [--max-body-mb N]
+    python scripts/webhook_receiver.py bench [--requests N] [--clients N]
+
+Environment:
+    DIDIT_WEBHOOK_SECRET - Required for serve. The webhook secret_shared_key.
+
+Examples:
+    python scripts/webhook_receiver.py serve --port 8080 --output events.ndjson
+    python scripts/webhook_receiver.py serve --port 8080 --handler myapp.kyc:on_didit_event
+    python scripts/webhook_receiver.py serve --port 8080 --log-dir webhook_log/ --handler myapp.kyc:on_didit_event
+    python scripts/webhook_receiver.py bench --requests 20000 --clients 16
+"""
+import argparse
+import hashlib
+import hmac
+import http.client
+import importlib
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+try:
+    from event_log import EventLog, event_key
+    from webhook_signature import TIMESTAMP_TOLERANCE, canonicalize, parse_canonical, verify_canonical, verify_v2
+except ImportError:
+    from .event_log import EventLog, event_key
+    from .webhook_signature import TIMESTAMP_TOLERANCE, canonicalize, parse_canonical, verify_canonical, verify_v2
+
+MAX_BODY_BYTES = 5 * 1024 * 1024
+
+
+def get_secret() -> str:
+    secret = os.environ.get("DIDIT_WEBHOOK_SECRET")
+    if not secret:
+        print("Error: DIDIT_WEBHOOK_SECRET environment variable is not set.", file=sys.stderr)
+        sys.exit(1)
+    return secret
+
+
+def sign_v2(body: dict, timestamp: str, secret: str) -> str:
+    message = f"{timestamp}:{canonicalize(body)}"
+    return hmac.new(secret.encode(), message.encode(), hashlib.sha256).hexdigest()
+
+
+def verify_webhook_v2(body, signature: str, timestamp: str, secret: str,
+                      tolerance: int = TIMESTAMP_TOLERANCE) -> bool:
+    """`body` may be the raw request bytes (fastest) or the parsed dict."""
+    return verify_v2(body, signature, timestamp, secret, tolerance)
+
+
+def verify_webhook_simple(body: dict, signature: str, timestamp: str, secret: str,
+                          tolerance: int = TIMESTAMP_TOLERANCE) -> bool:
+    try:
+        if abs(time.time() - int(timestamp)) > tolerance:
+            return False
+    except (TypeError, ValueError):
+        return False
+    message = f"{timestamp}:{body.get('session_id')}:{body.get('status')}:{body.get('webhook_type')}"
+    expected = hmac.new(secret.encode(), message.encode(), hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature or "")
+
+
+class DedupeIndex:
+    """Bounded, thread-safe set of recently seen event keys."""
+
+    def __init__(self, max_entries: int = 100000, ttl: float = 24 * 3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._seen = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, key) -> bool:
+        """Record `key`; returns False if it was already seen within the TTL."""
+        now = time.monotonic()
+        with self._lock:
+            seen_at = self._seen.get(key)
+            if seen_at is not None and now - seen_at < self.ttl:
+                return False
+            self._seen[key] = now
+            self._seen.move_to_end(key)
+            while len(self._seen) > self.max_entries:
+                self._seen.popitem(last=False)
+            return True
+
+    def discard(self, key):
+        """Forget `key`, so its next delivery is accepted again."""
+        with self._lock:
+            self._seen.pop(key, None)
+
+
+def load_handler(spec: str):
+    """Resolve a `module:function` handler spec."""
+    module_name, _, func_name = spec.partition(":")
+    if not func_name:
+        print(f"Error: handler must look like module:function, got {spec!r}", file=sys.stderr)
+        sys.exit(1)
+    return getattr(importlib.import_module(module_name), func_name)
+
+
+def ndjson_handler(path: str = None):
+    """Handler that appends each event as one JSON line to `path` (or stdout)."""
+    out = open(path, "a", encoding="utf-8") if path else sys.stdout
+    lock = threading.Lock()
+
+    def handle(event, headers):
+        line = json.dumps(event, ensure_ascii=False) + "\n"
+        with lock:
+            out.write(line)
+            out.flush()
+    return handle
+
+
+class WebhookReceiver:
+    """Verifies and dedupes deliveries, then runs `handler(event, headers)` on worker threads.
+
+    With an `event_log`, accepted events are appended to it before being queued, and its
+    persistent index replaces the in-memory TTL dedupe. When the handler raises, the event's
+    key is forgotten (or, with a log, marked failed) so a retried delivery runs it again.
+    """
+
+    def __init__(self, secret: str, handler, workers: int = 4, queue_size: int = 10000,
+                 tolerance: int = TIMESTAMP_TOLERANCE, allow_simple: bool = True, event_log: EventLog = None,
+                 max_body: int = MAX_BODY_BYTES):
+        self.secret = secret
+        self.handler = handler
+        self.tolerance = tolerance
+        self.allow_simple = allow_simple
+        self.event_log = event_log
+        self.max_body = max_body
+        self.dedupe = DedupeIndex()
+        self._failed = set()  # logged events whose handler raised; their retries are re-queued
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.stats = {"accepted": 0, "duplicates": 0, "rejected": 0, "too_large": 0, "handler_errors": 0}
+        self._stats_lock = threading.Lock()
+        self._workers = [threading.Thread(target=self._work, daemon=True) for _ in range(workers)]
+        for w in self._workers:
+            w.start()
+
+    def _count(self, key):
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def _work(self):
+        while True:
+            event, headers = self.queue.get()
+            try:
+                self.handler(event, headers)
+            except Exception as e:
+                self._forget(event_key(event))
+                self._count("handler_errors")
+                print(f"Handler error for {event.get('session_id')}: {e}", file=sys.stderr)
+            finally:
+                self.queue.task_done()
+
+    def _forget(self, key):
+        """Let the next delivery of a failed event through dedupe. The event log is append-only,
+        so there the key is kept and the retry is matched against `_failed` instead."""
+        if self.event_log is None:
+            self.dedupe.discard(key)
+            return
+        with self._stats_lock:
+            self._failed.add(key)
+
+    def _is_new(self, event) -> bool:
+        if self.event_log is None:
+            return self.dedupe.add(event_key(event))
+        if self.event_log.append(event):
+            return True
+        with self._stats_lock:
+            if event_key(event) in self._failed:
+                self._failed.discard(event_key(event))
+                return True
+        return False
+
+    def receive(self, raw: bytes, headers) -> tuple:
+        """Process one delivery; returns (http_status, response_dict)."""
+        try:
+            event, canonical = parse_canonical(raw)
+        except ValueError:
+            self._count("rejected")
+            return 400, {"error": "invalid JSON"}
+        timestamp = headers.get("X-Timestamp")
+        if headers.get("X-Signature-V2"):
+            valid = verify_canonical(canonical, headers["X-Signature-V2"], timestamp, self.secret, self.tolerance)
+        elif self.allow_simple and headers.get("X-Signature-Simple"):
+            valid = verify_webhook_simple(event, headers["X-Signature-Simple"], timestamp, self.secret,
+                                          self.tolerance)
+        else:
+            valid = False
+        if not valid:
+            self._count("rejected")
+            return 401, {"error": "invalid signature"}
+        if not self._is_new(event):
+            self._count("duplicates")
+            return 200, {"ok": True, "duplicate": True}
+        self.queue.put((event, dict(headers)))
+        self._count("accepted")
+        return 200, {"ok": True}
+
+    def make_server(self, host: str = "0.0.0.0", port: int = 8080) -> ThreadingHTTPServer:
+        receiver = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body go out as separate writes; without TCP_NODELAY every
+            # keep-alive response stalls on delayed ACK.
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def _reply(self, code, body, close=False):
+                data = json.dumps(body).encode()
+                self.send_response(code)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                if close:
+                    self.send_header("Connection", "close")
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                self._reply(200, dict(receiver.stats, queued=receiver.queue.qsize()))
+
+            def do_POST(self):
+                try:
+                    length = int(self.headers.get("Content-Length") or 0)
+                except ValueError:
+                    length = -1
+                if not 0 <= length <= receiver.max_body:
+                    # The body is left unread, so this connection can't be reused.
+                    receiver._count("too_large" if length > 0 else "rejected")
+                    code, error = (413, "body too large") if length > 0 else (400, "invalid Content-Length")
+                    self._reply(code, {"error": error}, close=True)
+                    return
+                self._reply(*receiver.receive(self.rfile.read(length), self.headers))
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        return server
+
+
+def benchmark(requests_total: int = 10000, clients: int = 8, payload_kb: int = 4) -> dict:
+    """Serve on an ephemeral local port and measure signed deliveries per second."""
+    secret = "bench-secret"
+    receiver = WebhookReceiver(secret, lambda event, headers: None)
+    server = receiver.make_server("127.0.0.1", 0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_address[1]
+    filler = [{"field": f"value-{i}", "score": float(i), "ok": True} for i in range(payload_kb * 12)]
+
+    def client(n, offset):
+        conn = http.client.HTTPConnection("127.0.0.1", port)
+        for i in range(offset, offset + n):
+            ts = str(int(time.time()))
+            body = {"session_id": f"bench-{i}", "status": "Approved", "webhook_type": "status.updated",
+                    "timestamp": int(ts), "decision": {"features": filler}}
+            raw = json.dumps(body).encode()
+            conn.request("POST", "/", body=raw, headers={
+                "Content-Type": "application/json", "X-Timestamp": ts,
+                "X-Signature-V2": sign_v2(body, ts, secret)})
+            conn.getresponse().read()
+        conn.close()
+
+    per_client = requests_total // clients
+    threads = [threading.Thread(target=client, args=(per_client, c * per_client)) for c in range(clients)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    receiver.queue.join()
+    elapsed = time.perf_counter() - started
+    server.shutdown()
+    total = per_client * clients
+    return {"requests": total, "clients": clients, "seconds": round(elapsed, 3),
+            "requests_per_sec": round(total / elapsed, 1), **receiver.stats}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Receive and verify Didit webhooks")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    serve_p = sub.add_parser("serve", help="Run the webhook receiver")
+    serve_p.add_argument("--host", default="0.0.0.0", help="Bind address (default: 0.0.0.0)")
+    serve_p.add_argument("--port", type=int, default=8080, help="Port (default: 8080)")
+    serve_p.add_argument("--handler", help="Event handler as module:function (called with event, headers)")
+    serve_p.add_argument("--output", help="Append events as NDJSON here when no --handler (default: stdout)")
+    serve_p.add_argument("--workers", type=int, default=4, help="Handler worker threads (default: 4)")
+    serve_p.add_argument("--tolerance", type=int, default=TIMESTAMP_TOLERANCE,
+                         help="Max X-Timestamp age in seconds (default: 300)")
+    serve_p.add_argument("--v2-only", action="store_true", help="Reject deliveries without X-Signature-V2")
+    serve_p.add_argument("--log-dir", help="Also append events to a durable, replayable event log here")
+    serve_p.add_argument("--max-body-mb", type=float, default=MAX_BODY_BYTES / 2**20,
+                         help="Refuse larger deliveries with 413 (default: 5)")
+
+    bench_p = sub.add_parser("bench", help="Measure receiver throughput on localhost")
+    bench_p.add_argument("--requests", type=int, default=10000, help="Total deliveries (default: 10000)")
+    bench_p.add_argument("--clients", type=int, default=8, help="Concurrent keep-alive clients (default: 8)")
+    bench_p.add_argument("--payload-kb", type=int, default=4, help="Approximate body size in KB (default: 4)")
+
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        handler = load_handler(args.handler) if args.handler else ndjson_handler(args.output)
+        try:
+            event_log = EventLog(args.log_dir) if args.log_dir else None
+        except RuntimeError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            sys.exit(1)
+        receiver = WebhookReceiver(get_secret(), handler, args.workers, tolerance=args.tolerance,
+                                   allow_simple=not args.v2_only, event_log=event_log,
+                                   max_body=int(args.max_body_mb * 2**20))
+        server = receiver.make_server(args.host, args.port)
+        print(f"Listening for Didit webhooks on http://{args.host}:{args.port}/", file=sys.stderr)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            receiver.queue.join()
+            if event_log is not None:
+                event_log.close()
+            print(f"\n--- {json.dumps(receiver.stats)} ---", file=sys.stderr)
+
+    elif args.command == "bench":
+        result = benchmark(args.requests, args.clients, args.payload_kb)
+        print(json.dumps(result, indent=2))
+        print(f"\n--- {result['requests_per_sec']} requests/sec ---")
+
+
+if __name__ == "__main__":
+    main()
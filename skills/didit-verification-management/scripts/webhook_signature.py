@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""Didit Webhook Signatures - Fast X-Signature-V2 verification.
+
+Produces byte-for-byte the same canonical JSON as the V2 recipe in SKILL.md
+(whole floats as ints, sorted keys, compact separators, no ASCII escaping) without
+its recursive `process_value` copy of the whole payload:
+
+- From the raw request body, whole floats are normalized while parsing
+  (`json.loads(parse_float=...)`), so canonicalization is a single C-level dumps.
+- From an already-parsed dict, the walk is copy-on-write: containers are only
+  copied along the path to a whole float; typical payloads allocate nothing.
+
+Usage:
+    python scripts/webhook_signature.py verify <body.json> --signature HEX --timestamp UNIX
+    python scripts/webhook_signature.py bench [--iterations N] [--hits N]
+
+Environment:
+    DIDIT_WEBHOOK_SECRET - Required for verify. The webhook secret_shared_key.
+
+Examples:
+    python scripts/webhook_signature.py verify body.json --signature 3f2a... --timestamp 1760000000
+    python scripts/webhook_signature.py bench --iterations 2000 --hits 50
+"""
+import argparse
+import hashlib
+import hmac
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+TIMESTAMP_TOLERANCE = 300
+
+_dumps = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"), sort_keys=True).encode
+
+
+def _parse_float(s: str):
+    f = float(s)
+    return int(f) if f.is_integer() else f
+
+
+_decoder = json.JSONDecoder(parse_float=_parse_float)
+
+
+def reference_canonicalize(body: dict) -> str:
+    """The SKILL.md V2 recipe, kept verbatim as the source of truth for tests and benchmarks."""
+    def process_value(v):
+        if isinstance(v, float) and v == int(v):
+            return int(v)
+        if isinstance(v, dict):
+            return {k: process_value(val) for k, val in v.items()}
+        if isinstance(v, list):
+            return [process_value(i) for i in v]
+        return v
+    return json.dumps(process_value(body), sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+
+
+def _normalize(v):
+    """Return `v` with whole floats as ints, copying a container only if something inside changed."""
+    if isinstance(v, float):
+        return int(v) if v.is_integer() else v
+    if isinstance(v, dict):
+        out = None
+        for k, item in v.items():
+            new = _normalize(item)
+            if new is not item:
+                if out is None:
+                    out = dict(v)
+                out[k] = new
+        return v if out is None else out
+    if isinstance(v, list):
+        out = None
+        for i, item in enumerate(v):
+            new = _normalize(item)
+            if new is not item:
+                if out is None:
+                    out = list(v)
+                out[i] = new
+        return v if out is None else out
+    return v
+
+
+def canonicalize(body: dict) -> str:
+    """Canonical V2 JSON of a parsed body; identical output to reference_canonicalize()."""
+    return _dumps(_normalize(body))
+
+
+def parse_canonical(raw) -> tuple:
+    """Parse a raw webhook body; returns (event, canonical JSON str).
+
+    Whole floats in `event` come back as ints (the form the signature covers).
+    """
+    event = _decoder.decode(raw.decode("utf-8") if isinstance(raw, (bytes, bytearray)) else raw)
+    return event, _dumps(event)
+
+
+def sign_v2(canonical: str, timestamp: str, secret: str) -> str:
+    message = f"{timestamp}:{canonical}".encode()
+    return hmac.new(secret.encode(), message, hashlib.sha256).hexdigest()
+
+
+def within_replay_window(timestamp, tolerance: int = TIMESTAMP_TOLERANCE, now: float = None) -> bool:
+    try:
+        ts = int(timestamp)
+    except (TypeError, ValueError):
+        return False
+    return abs((time.time() if now is None else now) - ts) <= tolerance
+
+
+def verify_canonical(canonical: str, signature: str, timestamp: str, secret: str,
+                     tolerance: int = TIMESTAMP_TOLERANCE, now: float = None) -> bool:
+    """Verify X-Signature-V2 against JSON already produced by canonicalize()/parse_canonical()."""
+    if not within_replay_window(timestamp, tolerance, now):
+        return False
+    return hmac.compare_digest(sign_v2(canonical, timestamp, secret), signature or "")
+
+
+def verify_v2(body, signature: str, timestamp: str, secret: str,
+              tolerance: int = TIMESTAMP_TOLERANCE, now: float = None) -> bool:
+    """Verify X-Signature-V2 for a raw body (bytes/str, fastest) or a parsed dict."""
+    if not within_replay_window(timestamp, tolerance, now):
+        return False
+    canonical = canonicalize(body) if isinstance(body, dict) else parse_canonical(body)[1]
+    return hmac.compare_digest(sign_v2(canonical, timestamp, secret), signature or "")
+
+
+def sample_decision(hits: int = 25) -> dict:
+    """A decision webhook shaped like production payloads, for benchmarks."""
+    warnings = [{"risk": "LOW_MATCH_SCORE", "log_type": "warning", "short_description": "Score below threshold",
+                 "long_description": "The similarity score is below the configured threshold."}]
+    return {
+        "session_id": "11111111-2222-3333-4444-555555555555",
+        "status": "Approved",
+        "webhook_type": "status.updated",
+        "vendor_data": "user-123",
+        "timestamp": 1760000000,
+        "created_at": 1759999000.0,
+        "decision": {
+            "session_id": "11111111-2222-3333-4444-555555555555",
+            "session_number": 43762,
+            "status": "Approved",
+            "workflow_id": "d8d2fa2d-c69c-471c-b7bc-bc71512b43ef",
+            "features": ["ID_VERIFICATION", "LIVENESS", "FACE_MATCH", "AML", "IP_ANALYSIS"],
+            "id_verifications": [{
+                "status": "Approved", "document_type": "Identity Card", "document_number": "YZA123456",
+                "first_name": "Elena", "last_name": "Martínez Sánchez", "full_name": "Elena Martínez Sánchez",
+                "date_of_birth": "1985-03-15", "age": 40.0, "nationality": "ESP", "issuing_state": "ESP",
+                "address": "Calle Mayor 10, Madrid", "parsed_address": {"city": "Madrid", "postal_code": "28013",
+                                                                       "latitude": 40.4168, "longitude": -3.7038},
+                "warnings": warnings,
+            }],
+            "liveness_checks": [{"status": "Approved", "method": "PASSIVE", "score": 98.0, "age_estimation": 41.3,
+                                 "warnings": []}],
+            "face_matches": [{"status": "Approved", "score": 87.52, "warnings": warnings}],
+            "aml_screenings": [{
+                "status": "In Review", "total_hits": hits, "score": 62.0,
+                "hits": [{"id": f"hit-{i}", "name": f"Elena Martinez {i}", "match_score": 55.0 + i % 40,
+                          "risk_score": 0.35 + (i % 10) / 20, "categories": ["PEP", "Adverse Media"],
+                          "datasets": ["pep_tier_2", "adverse_media"], "first_seen": "2019-05-01",
+                          "review_status": "Unreviewed", "rca_name": None, "is_whitelisted": False}
+                         for i in range(hits)],
+            }],
+            "ip_analyses": [{"status": "Approved", "ip_country": "ESP", "ip_city": "Madrid",
+                             "latitude": 40.0, "longitude": -3.7, "is_vpn_or_tor": False, "warnings": []}],
+            "reviews": [],
+        },
+    }
+
+
+def benchmark(iterations: int = 2000, hits: int = 25) -> dict:
+    """Time and measure peak allocations of reference vs fast verification on one payload."""
+    secret, timestamp = "bench-secret", str(int(time.time()))
+    body = sample_decision(hits)
+    raw = json.dumps(body, ensure_ascii=False).encode()
+    signature = sign_v2(reference_canonicalize(body), timestamp, secret)
+
+    def reference_from_raw():
+        parsed = json.loads(raw)
+        return hmac.compare_digest(sign_v2(reference_canonicalize(parsed), timestamp, secret), signature)
+
+    cases = {
+        "reference (loads + process_value + dumps)": reference_from_raw,
+        "fast from raw body": lambda: verify_v2(raw, signature, timestamp, secret),
+        "fast from parsed dict": lambda: verify_v2(body, signature, timestamp, secret),
+    }
+    report = {"payload_bytes": len(raw), "iterations": iterations, "cases": {}}
+    for name, fn in cases.items():
+        assert fn(), f"{name} failed to verify"
+        started = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        elapsed = time.perf_counter() - started
+        tracemalloc.start()
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        report["cases"][name] = {"verifications_per_sec": round(iterations / elapsed, 1),
+                                 "us_per_verification": round(elapsed / iterations * 1e6, 1),
+                                 "peak_alloc_kb": round(peak / 1024, 1)}
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Verify Didit webhook V2 signatures")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    verify_p = sub.add_parser("verify", help="Verify a saved webhook body")
+    verify_p.add_argument("body", help="File with the raw request body")
+    verify_p.add_argument("--signature", required=True, help="X-Signature-V2 header value")
+    verify_p.add_argument("--timestamp", required=True, help="X-Timestamp header value")
+    verify_p.add_argument("--tolerance", type=int, default=TIMESTAMP_TOLERANCE,
+                          help="Replay window in seconds (default: 300)")
+
+    bench_p = sub.add_parser("bench", help="Microbenchmark against the reference recipe")
+    bench_p.add_argument("--iterations", type=int, default=2000, help="Verifications per case (default: 2000)")
+    bench_p.add_argument("--hits", type=int, default=25, help="AML hits in the sample payload (default: 25)")
+
+    args = parser.parse_args()
+
+    if args.command == "verify":
+        secret = os.environ.get("DIDIT_WEBHOOK_SECRET")
+        if not secret:
+            print("Error: DIDIT_WEBHOOK_SECRET environment variable is not set.", file=sys.stderr)
+            sys.exit(1)
+        with open(args.body, "rb") as f:
+            raw = f.read()
+        valid = verify_v2(raw, args.signature, args.timestamp, secret, args.tolerance)
+        print(f"--- Signature {'valid' if valid else 'INVALID'} ---")
+        sys.exit(0 if valid else 1)
+
+    elif args.command == "bench":
+        report = benchmark(args.iterations, args.hits)
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+        base = next(iter(report["cases"].values()))["us_per_verification"]
+        print(f"\n--- {report['payload_bytes']} byte payload ---")
+        for name, case in report["cases"].items():
+            print(f"  {name}: {case['us_per_verification']}us "
+                  f"({base / case['us_per_verification']:.2f}x), peak {case['peak_alloc_kb']} KB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+"""
+Latency and throughput benchmark for the skill functions, run against the local
+stand-in API (tests/standin_api.py) so numbers are comparable between commits.
+
+Each endpoint is called through the skill function a user would call
+(screen_aml, match_faces, verify_id, create_session, get_decision, ...) with
+every execution strategy:
+
+    sequential  one call after another, each opening a new connection
+                (how the functions behave out of the box: module-level requests.post)
+    pooled      one call after another over a keep-alive requests.Session
+    threaded    --workers threads, one keep-alive Session per thread
+    asyncio     asyncio.gather over run_in_executor with --workers threads; the
+                skill functions are blocking, so this measures event-loop dispatch
+                on top of the threaded strategy
+
+The stand-in runs in a separate process (so it doesn't share the client's GIL)
+unless --base-url points at one that is already running. Results hold throughput
+and p50/p95/p99 latency per endpoint and strategy; `compare` diffs two result files.
+
+Usage:
+    python tests/bench_skills.py run [--output bench.json] [--requests 50] [--workers 16]
+                                     [--endpoints aml,face-match] [--strategies pooled,threaded]
+                                     [--latency-scale 0.05] [--base-url http://127.0.0.1:8765]
+    python tests/bench_skills.py compare BASELINE.json CURRENT.json [--threshold 10]
+
+Examples:
+    git stash && python tests/bench_skills.py run --output base.json && git stash pop
+    python tests/bench_skills.py run --output head.json
+    python tests/bench_skills.py compare base.json head.json
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SKILL_DIRS = ["didit-verification-management", "didit-aml-screening", "didit-face-match", "didit-liveness-detection",
+              "didit-biometric-age-estimation", "didit-face-search", "didit-id-document-verification",
+              "didit-database-validation", "didit-proof-of-address", "didit-email-verification",
+              "didit-phone-verification"]
+for _skill in SKILL_DIRS:
+    sys.path.insert(0, os.path.join(ROOT, "skills", _skill, "scripts"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import check_liveness  # noqa: E402
+import create_session  # noqa: E402
+import estimate_age  # noqa: E402
+import match_faces  # noqa: E402
+import screen_aml  # noqa: E402
+import search_faces  # noqa: E402
+import validate_database  # noqa: E402
+import verify_address  # noqa: E402
+import verify_email  # noqa: E402
+import verify_id  # noqa: E402
+import verify_phone  # noqa: E402
+
+MODULES = [check_liveness, create_session, estimate_age, match_faces, screen_aml, search_faces,
+           validate_database, verify_address, verify_email, verify_id, verify_phone]
+LIVE_HOST = "https://verification.didit.me"
+_ORIGINAL_URLS = {(module, attr): getattr(module, attr) for module in MODULES
+                  for attr in ("ENDPOINT", "API_URL", "BASE_URL") if isinstance(getattr(module, attr, None), str)}
+STRATEGIES = ["sequential", "pooled", "threaded", "asyncio"]
+WORKFLOW_ID = "d8d2fa2d-c69c-471c-b7bc-bc71512b43ef"
+
+
+def point_skills_at(base_url: str = None):
+    """Rewrite every skill module's API URL to `base_url` (None restores the live API)."""
+    for (module, attr), url in _ORIGINAL_URLS.items():
+        setattr(module, attr, url.replace(LIVE_HOST, base_url.rstrip("/")) if base_url else url)
+
+
+class Fixtures:
+    """Upload files for the image/document endpoints, in a temporary directory."""
+
+    def __init__(self, image_kb: int = 64):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.image = os.path.join(self._tmp.name, "face.jpg")
+        self.document = os.path.join(self._tmp.name, "bill.pdf")
+        for path in (self.image, self.document):
+            with open(path, "wb") as f:
+                f.write(b"\xff\xd8\xff\xe0" + bytes(image_kb * 1024))
+
+    def close(self):
+        self._tmp.cleanup()
+
+
+def skill_calls(fixtures: Fixtures) -> dict:
+    """Endpoint name -> fn(i) calling the skill function for that endpoint with request number `i`."""
+    image, document = fixtures.image, fixtures.document
+    session_id = str(uuid.uuid5(uuid.NAMESPACE_URL, "bench-session"))
+    return {
+        "session.create": lambda i: create_session.create_session(WORKFLOW_ID, vendor_data=f"bench-{i}"),
+        "session.decision": lambda i: create_session.get_decision(session_id),
+        "aml": lambda i: screen_aml.screen_aml(f"Bench Person {i}", date_of_birth="1980-01-01", nationality="ES"),
+        "face-match": lambda i: match_faces.match_faces(image, image),
+        "liveness": lambda i: check_liveness.check_liveness(image),
+        "age-estimation": lambda i: estimate_age.estimate_age(image),
+        "face-search": lambda i: search_faces.search_faces(image),
+        "id-verification": lambda i: verify_id.verify_id(image, image, save=False),
+        "database-validation": lambda i: validate_database.validate_database(f"X{i:07d}", issuing_state="ESP"),
+        "poa": lambda i: verify_address.verify_address(document),
+        "email.send": lambda i: verify_email.send_code(f"bench-{i}@example.com"),
+        "email.check": lambda i: verify_email.check_code(f"bench-{i}@example.com", "123456"),
+        "phone.send": lambda i: verify_phone.send_code(f"+3460000{i:04d}"),
+        "phone.check": lambda i: verify_phone.check_code(f"+3460000{i:04d}", "123456"),
+    }
+
+
+class _PooledRequests:
+    """Stands in for a skill module's `requests`, sending through one keep-alive Session per thread."""
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def request(self, method, url, **kwargs):
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        self._local.status = None
+        response = session.request(method, url, **kwargs)
+        self._local.status = response.status_code
+        return response
+
+    def last_status(self):
+        """HTTP status of this thread's most recent request (None if it never got a response)."""
+        return getattr(self._local, "status", None)
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def patch(self, url, **kwargs):
+        return self.request("PATCH", url, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self.request("DELETE", url, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(requests, name)
+
+
+@contextlib.contextmanager
+def pooled_connections(enabled: bool = True):
+    """Within the block, the skill functions reuse connections (per thread). Yields the shim, or None."""
+    if not enabled:
+        yield None
+        return
+    shim = _PooledRequests()
+    for module in MODULES:
+        module.requests = shim
+    try:
+        yield shim
+    finally:
+        for module in MODULES:
+            module.requests = requests
+
+
+def timed(fn, i) -> tuple:
+    """(latency_ms, ok) of one call. The skill functions sys.exit(1) on API errors."""
+    started = time.perf_counter()
+    try:
+        fn(i)
+        ok = True
+    except (Exception, SystemExit):
+        ok = False
+    return (time.perf_counter() - started) * 1000, ok
+
+
+async def _gather(fn, n: int, workers: int) -> list:
+    loop = asyncio.get_running_loop()
+    with ThreadPoolExecutor(workers) as pool:
+        return await asyncio.gather(*(loop.run_in_executor(pool, timed, fn, i) for i in range(n)))
+
+
+def run_strategy(strategy: str, fn, n: int, workers: int = 16, warmup: int = 2) -> tuple:
+    """Call `fn` n times with `strategy`; returns ([(latency_ms, ok), ...], wall seconds)."""
+    with pooled_connections(strategy != "sequential"):
+        for i in range(warmup):
+            timed(fn, i)
+        started = time.perf_counter()
+        if strategy in ("sequential", "pooled"):
+            samples = [timed(fn, i) for i in range(n)]
+        elif strategy == "threaded":
+            with ThreadPoolExecutor(workers) as pool:
+                samples = list(pool.map(timed, [fn] * n, range(n)))
+        elif strategy == "asyncio":
+            samples = asyncio.run(_gather(fn, n, workers))
+        else:
+            raise ValueError(f"Unknown strategy: {strategy}")
+        return samples, time.perf_counter() - started
+
+
+def summarize(samples: list, seconds: float) -> dict:
+    latencies = sorted(ms for ms, _ in samples)
+    n = len(latencies)
+
+    def pct(q):
+        return round(latencies[min(n - 1, int(n * q))], 2) if n else None
+
+    return {"requests": n, "errors": sum(1 for _, ok in samples if not ok), "seconds": round(seconds, 3),
+            "throughput_rps": round(n / seconds, 1) if seconds else 0,
+            "p50_ms": pct(0.50), "p95_ms": pct(0.95), "p99_ms": pct(0.99),
+            "mean_ms": round(sum(latencies) / n, 2) if n else None, "max_ms": round(latencies[-1], 2) if n else None}
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@contextlib.contextmanager
+def standin_process(latency_scale: float, *extra_args: str):
+    """Run tests/standin_api.py in a child process; yields its base URL."""
+    port = _free_port()
+    proc = subprocess.Popen([sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "standin_api.py"),
+                             "--port", str(port), "--latency-scale", str(latency_scale), *extra_args],
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        deadline = time.time() + 10
+        while True:
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+                break
+            except OSError:
+                if time.time() > deadline or proc.poll() is not None:
+                    raise RuntimeError("stand-in API did not start")
+                time.sleep(0.05)
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def benchmark(base_url: str, endpoints: list = None, strategies: list = None, n: int = 50, workers: int = 16,
+              image_kb: int = 64, progress=None) -> list:
+    """Run every endpoint x strategy against `base_url`; returns one summary dict per pair."""
+    os.environ.setdefault("DIDIT_API_KEY", "standin-key")
+    point_skills_at(base_url)
+    fixtures = Fixtures(image_kb)
+    try:
+        calls = skill_calls(fixtures)
+        results = []
+        for endpoint in endpoints or list(calls):
+            for strategy in strategies or STRATEGIES:
+                samples, seconds = run_strategy(strategy, calls[endpoint], n, workers)
+                result = dict({"endpoint": endpoint, "strategy": strategy}, **summarize(samples, seconds))
+                results.append(result)
+                if progress:
+                    progress(result)
+        return results
+    finally:
+        fixtures.close()
+        point_skills_at(None)
+
+
+def print_row(result: dict):
+    print(f"{result['endpoint']:<20} {result['strategy']:<10} {result['requests']:>5} {result['errors']:>4} "
+          f"{result['throughput_rps']:>8} {result['p50_ms']:>8} {result['p95_ms']:>8} {result['p99_ms']:>8}")
+
+
+def compare(baseline: dict, current: dict, threshold: float = 10.0) -> list:
+    """Rows of (endpoint, strategy, rps change %, p95 change %, regressed) for pairs in both files."""
+    before = {(r["endpoint"], r["strategy"]): r for r in baseline["results"]}
+    rows = []
+    for r in current["results"]:
+        b = before.get((r["endpoint"], r["strategy"]))
+        if not b or not b["throughput_rps"] or not b["p95_ms"]:
+            continue
+        rps = (r["throughput_rps"] - b["throughput_rps"]) / b["throughput_rps"] * 100
+        p95 = (r["p95_ms"] - b["p95_ms"]) / b["p95_ms"] * 100
+        rows.append((r["endpoint"], r["strategy"], round(rps, 1), round(p95, 1),
+                     rps < -threshold or p95 > threshold or r["errors"] > b["errors"]))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the skill functions against the local stand-in API")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run_p = sub.add_parser("run", help="Run the benchmark")
+    run_p.add_argument("--output", help="Write results as JSON here")
+    run_p.add_argument("--requests", type=int, default=50, help="Measured calls per endpoint and strategy (default: 50)")
+    run_p.add_argument("--workers", type=int, default=16, help="Threads for threaded/asyncio (default: 16)")
+    run_p.add_argument("--endpoints", help="Comma-separated endpoints (default: all)")
+    run_p.add_argument("--strategies", help=f"Comma-separated, from {','.join(STRATEGIES)} (default: all)")
+    run_p.add_argument("--latency-scale", type=float, default=0.05,
+                       help="Stand-in delay multiplier, 0 = client overhead only (default: 0.05)")
+    run_p.add_argument("--image-kb", type=int, default=64, help="Size of uploaded image/document files (default: 64)")
+    run_p.add_argument("--base-url", help="Use a stand-in that is already running instead of starting one")
+
+    cmp_p = sub.add_parser("compare", help="Compare two result files")
+    cmp_p.add_argument("baseline", help="Results of the reference commit")
+    cmp_p.add_argument("current", help="Results to check")
+    cmp_p.add_argument("--threshold", type=float, default=10.0,
+                       help="Percent throughput drop or p95 rise counted as a regression (default: 10)")
+
+    args = parser.parse_args()
+
+    if args.command == "run":
+        endpoints = args.endpoints.split(",") if args.endpoints else None
+        strategies = args.strategies.split(",") if args.strategies else None
+        print(f"{'endpoint':<20} {'strategy':<10} {'req':>5} {'err':>4} {'rps':>8} {'p50_ms':>8} {'p95_ms':>8} "
+              f"{'p99_ms':>8}")
+        with (contextlib.nullcontext(args.base_url) if args.base_url else standin_process(args.latency_scale)) as url:
+            results = benchmark(url, endpoints, strategies, args.requests, args.workers, args.image_kb, print_row)
+        report = {"meta": {"created_at": datetime.now(timezone.utc).isoformat(), "git_commit": _git_commit(),
+                           "python": platform.python_version(), "platform": platform.platform(),
+                           "requests": args.requests, "workers": args.workers, "image_kb": args.image_kb,
+                           "latency_scale": None if args.base_url else args.latency_scale},
+                  "results": results}
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2)
+        errors = sum(r["errors"] for r in results)
+        print(f"\n--- {len(results)} endpoint/strategy pair(s), {errors} error(s)"
+              f"{f'; results in {args.output}' if args.output else ''} ---")
+        sys.exit(1 if errors else 0)
+
+    elif args.command == "compare":
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        with open(args.current, encoding="utf-8") as f:
+            current = json.load(f)
+        rows = compare(baseline, current, args.threshold)
+        print(f"{baseline['meta'].get('git_commit')} -> {current['meta'].get('git_commit')}")
+        print(f"{'endpoint':<20} {'strategy':<10} {'rps %':>8} {'p95 %':>8}")
+        for endpoint, strategy, rps, p95, regressed in rows:
+            print(f"{endpoint:<20} {strategy:<10} {rps:>+8} {p95:>+8}{'  REGRESSION' if regressed else ''}")
+        regressions = sum(1 for row in rows if row[-1])
+        print(f"\n--- {regressions} regression(s) over {args.threshold}% in {len(rows)} pair(s) ---")
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
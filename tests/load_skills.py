@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""
+Load generator that replays an onboarding traffic mix through the skill functions,
+for capacity planning against Didit's documented limits.
+
+Arrivals are open-loop: a seeded schedule of request start times (Poisson by
+default) is fixed up front from --rps, --ramp and --duration, and each request is
+dispatched at its scheduled time whether or not earlier ones have finished. Latency
+is measured from the scheduled start, so time spent queued behind a slow server
+counts (no coordinated omission). Decision reads use session IDs created earlier
+in the run.
+
+Every --interval seconds a line reports target vs achieved RPS, error rate, p50/p95/p99
+latency and requests in flight; the end of the run adds per-endpoint totals and
+error counts by HTTP status. By default a local stand-in API (tests/standin_api.py)
+is started; --base-url points the skills somewhere else. Against the real API
+(--base-url https://verification.didit.me) DIDIT_API_KEY must be set, and every
+request is billed.
+
+Usage:
+    python tests/load_skills.py [--rps 20] [--ramp 30] [--duration 60] [--interval 5]
+                                [--mix session.create=60,session.decision=25,face-match=10,aml=5]
+                                [--arrival poisson|uniform] [--seed 0] [--concurrency 256] [--output load.json]
+                                [--base-url URL | --latency-scale 1.0 --enforce-limits --error-rate 0.01]
+
+Examples:
+    python tests/load_skills.py --rps 10 --ramp 10 --duration 30
+    python tests/load_skills.py --rps 15 --duration 120 --enforce-limits --output load.json
+"""
+
+import argparse
+import bisect
+import contextlib
+import json
+import math
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import bench_skills  # noqa: E402
+from bench_skills import Fixtures, create_session, point_skills_at, pooled_connections, skill_calls  # noqa: E402
+
+DEFAULT_MIX = "session.create=60,session.decision=25,face-match=10,aml=5"
+
+
+def parse_mix(spec: str) -> dict:
+    """Parse "name=weight,..." into {name: weight}."""
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def arrival_times(rps: float, duration: float, ramp: float = 0, start_rps: float = 0,
+                  poisson: bool = True, seed: int = 0):
+    """Yield request start offsets (seconds) for a rate ramping linearly from `start_rps`
+    to `rps` over `ramp` seconds, then held for `duration` seconds.
+
+    Unit-rate arrivals (exponential gaps, or evenly spaced when not `poisson`) are
+    mapped through the inverse of the cumulative rate, so the ramp shapes the
+    arrival density without changing the process.
+    """
+    rng = random.Random(seed)
+    ramp_area = (start_rps + rps) / 2 * ramp
+    total = ramp_area + rps * duration
+    slope = (rps - start_rps) / (2 * ramp) if ramp else 0
+    s = 0.0
+    while True:
+        s += rng.expovariate(1) if poisson else 1
+        if s > total:
+            return
+        if s >= ramp_area:
+            yield ramp + (s - ramp_area) / rps
+        elif slope:
+            yield (-start_rps + math.sqrt(start_rps * start_rps + 4 * slope * s)) / (2 * slope)
+        else:
+            yield s / start_rps
+
+
+def target_rps(t: float, rps: float, ramp: float = 0, start_rps: float = 0) -> float:
+    return start_rps + (rps - start_rps) * t / ramp if ramp and t < ramp else rps
+
+
+def build_schedule(mix: dict, rps: float, duration: float, ramp: float = 0, start_rps: float = 0,
+                   poisson: bool = True, seed: int = 0) -> list:
+    """[(offset, endpoint), ...] in start order; endpoints drawn by `mix` weight."""
+    rng = random.Random(seed + 1)
+    names, weights = list(mix), list(mix.values())
+    return [(offset, rng.choices(names, weights)[0])
+            for offset in arrival_times(rps, duration, ramp, start_rps, poisson, seed)]
+
+
+def _pct(latencies: list, q: float):
+    return round(latencies[min(len(latencies) - 1, int(len(latencies) * q))], 1) if latencies else None
+
+
+def window_stats(samples: list, seconds: float) -> dict:
+    """Totals and latency percentiles for a list of sample dicts covering `seconds`."""
+    latencies = sorted(s["latency_ms"] for s in samples)
+    errors = sum(1 for s in samples if not s["ok"])
+    return {"completed": len(samples), "errors": errors,
+            "achieved_rps": round(len(samples) / seconds, 2) if seconds else 0,
+            "error_pct": round(errors / len(samples) * 100, 2) if samples else 0.0,
+            "p50_ms": _pct(latencies, 0.50), "p95_ms": _pct(latencies, 0.95), "p99_ms": _pct(latencies, 0.99)}
+
+
+class LoadRun:
+    """Dispatch a schedule open-loop on a thread pool and collect one sample per request."""
+
+    def __init__(self, calls: dict, schedule: list, concurrency: int = 256, status_of=None):
+        self.calls = calls
+        self.schedule = schedule
+        self.offsets = [offset for offset, _ in schedule]
+        self.concurrency = concurrency
+        self.status_of = status_of or (lambda: None)
+        self.samples = []
+        self.in_flight = 0
+        self.max_dispatch_lag_ms = 0.0
+        self._lock = threading.Lock()
+        self.started = None
+
+    def _request(self, offset: float, endpoint: str, i: int):
+        began = time.perf_counter()
+        try:
+            self.calls[endpoint](i)
+            ok, status = True, None
+        except (Exception, SystemExit):
+            ok, status = False, self.status_of()
+        done = time.perf_counter()
+        sample = {"endpoint": endpoint, "offset": offset, "done": done - self.started, "ok": ok,
+                  "status": status if not ok else 200, "latency_ms": (done - self.started - offset) * 1000,
+                  "service_ms": (done - began) * 1000}
+        with self._lock:
+            self.samples.append(sample)
+            self.in_flight -= 1
+
+    def run(self, on_interval=None, interval: float = 5.0):
+        """Run the schedule; `on_interval(window)` is called every `interval` seconds and at the end."""
+        stop = threading.Event()
+        self.started = time.perf_counter()
+
+        def report():
+            cursor, window_start = 0, 0.0
+            while True:
+                finished = stop.wait(interval)
+                now = time.perf_counter() - self.started
+                with self._lock:
+                    batch, cursor, in_flight = self.samples[cursor:], len(self.samples), self.in_flight
+                if on_interval and (batch or not finished):
+                    on_interval(self.window(batch, window_start, now, in_flight))
+                window_start = now
+                if finished:
+                    return
+
+        reporter = threading.Thread(target=report, daemon=True)
+        reporter.start()
+        with ThreadPoolExecutor(self.concurrency) as pool:
+            for i, (offset, endpoint) in enumerate(self.schedule):
+                delay = self.started + offset - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    self.max_dispatch_lag_ms = max(self.max_dispatch_lag_ms, -delay * 1000)
+                with self._lock:
+                    self.in_flight += 1
+                pool.submit(self._request, offset, endpoint, i)
+        stop.set()
+        reporter.join()
+        return time.perf_counter() - self.started
+
+    def window(self, batch: list, start: float, end: float, in_flight: int) -> dict:
+        """Stats for samples completed in [start, end), with the schedule's offered rate over the same span."""
+        seconds = end - start
+        offered = bisect.bisect_left(self.offsets, end) - bisect.bisect_left(self.offsets, start)
+        return dict({"t": round(end, 1), "offered_rps": round(offered / seconds, 2) if seconds else 0,
+                     "in_flight": in_flight}, **window_stats(batch, seconds))
+
+
+def session_calls(calls: dict, keep: int = 10000) -> dict:
+    """`calls` with decision reads spread over session IDs created during the run."""
+    created = deque(maxlen=keep)
+    fallback = calls["session.decision"]
+
+    def create(i):
+        session = create_session.create_session(bench_skills.WORKFLOW_ID, vendor_data=f"load-{i}")
+        created.append(session["session_id"])
+        return session
+
+    def decision(i):
+        if not created:
+            return fallback(i)
+        return create_session.get_decision(created[i % len(created)])
+
+    return dict(calls, **{"session.create": create, "session.decision": decision})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Open-loop load generator over the skill functions")
+    parser.add_argument("--rps", type=float, default=20, help="Target requests/sec after the ramp (default: 20)")
+    parser.add_argument("--start-rps", type=float, default=0, help="Rate at the start of the ramp (default: 0)")
+    parser.add_argument("--ramp", type=float, default=30, help="Seconds to ramp up to --rps (default: 30)")
+    parser.add_argument("--duration", type=float, default=60, help="Seconds to hold --rps after the ramp (default: 60)")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"endpoint=weight list (default: {DEFAULT_MIX})")
+    parser.add_argument("--arrival", choices=["poisson", "uniform"], default="poisson",
+                        help="Gaps between arrivals (default: poisson)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the schedule and endpoint draw (default: 0)")
+    parser.add_argument("--concurrency", type=int, default=256, help="Max requests in flight (default: 256)")
+    parser.add_argument("--interval", type=float, default=5, help="Seconds between report lines (default: 5)")
+    parser.add_argument("--image-kb", type=int, default=64, help="Size of uploaded image files (default: 64)")
+    parser.add_argument("--output", help="Write config, timeline and totals as JSON here")
+    parser.add_argument("--show-errors", action="store_true", help="Keep the skills' per-request error output")
+    parser.add_argument("--base-url", help="API to load instead of starting the local stand-in")
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="Stand-in delay multiplier (default: 1.0)")
+    parser.add_argument("--enforce-limits", action="store_true", help="Stand-in answers 429 above documented limits")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Stand-in 500 rate (default: 0)")
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    fixtures = Fixtures(args.image_kb)
+    calls = session_calls(skill_calls(fixtures))
+    unknown = set(mix) - set(calls)
+    if unknown:
+        print(f"Error: unknown endpoint(s) in --mix: {', '.join(sorted(unknown))}. Known: {', '.join(calls)}",
+              file=sys.stderr)
+        sys.exit(1)
+    schedule = build_schedule(mix, args.rps, args.duration, args.ramp, args.start_rps,
+                              args.arrival == "poisson", args.seed)
+    print(f"{len(schedule)} request(s) over {args.ramp + args.duration:.0f}s, mix {args.mix}", file=sys.stderr)
+
+    standin_args = (["--enforce-limits"] if args.enforce_limits else []) + ["--error-rate", str(args.error_rate)]
+    timeline = []
+
+    def on_interval(window):
+        window["target_rps"] = round(target_rps(window["t"], args.rps, args.ramp, args.start_rps), 2)
+        timeline.append(window)
+        print(f"{window['t']:>7} {window['target_rps']:>8} {window['offered_rps']:>8} {window['achieved_rps']:>8} "
+              f"{window['error_pct']:>6} {window['p50_ms'] or '-':>8} {window['p95_ms'] or '-':>8} "
+              f"{window['p99_ms'] or '-':>8} {window['in_flight']:>6}", flush=True)
+
+    if "DIDIT_API_KEY" not in os.environ and not args.base_url:
+        os.environ["DIDIT_API_KEY"] = "standin-key"
+    server = (contextlib.nullcontext(args.base_url) if args.base_url
+              else bench_skills.standin_process(args.latency_scale, *standin_args))
+    quiet = contextlib.nullcontext() if args.show_errors else contextlib.redirect_stderr(open(os.devnull, "w"))
+    print(f"{'t_s':>7} {'target':>8} {'offered':>8} {'achieved':>8} {'err_%':>6} {'p50_ms':>8} {'p95_ms':>8} "
+          f"{'p99_ms':>8} {'flight':>6}")
+    try:
+        with server as url, pooled_connections() as shim:
+            point_skills_at(url)
+            load = LoadRun(calls, schedule, args.concurrency, shim.last_status)
+            with quiet:
+                seconds = load.run(on_interval, args.interval)
+    finally:
+        point_skills_at(None)
+        fixtures.close()
+
+    samples = load.samples
+    held = [s for s in samples if s["offset"] >= args.ramp]
+    by_endpoint = {}
+    for endpoint in mix:
+        subset = [s for s in samples if s["endpoint"] == endpoint]
+        by_endpoint[endpoint] = dict(window_stats(subset, seconds), requests=len(subset))
+    statuses = Counter(str(s["status"]) for s in samples if not s["ok"])
+    totals = dict(window_stats(samples, seconds), requests=len(samples), seconds=round(seconds, 2),
+                  max_dispatch_lag_ms=round(load.max_dispatch_lag_ms, 1), errors_by_status=dict(statuses))
+    steady = window_stats(held, args.duration) if held else {}
+
+    print(f"\n{'endpoint':<20} {'req':>6} {'err_%':>6} {'p50_ms':>8} {'p95_ms':>8} {'p99_ms':>8}")
+    for endpoint, stats in by_endpoint.items():
+        print(f"{endpoint:<20} {stats['requests']:>6} {stats['error_pct']:>6} {stats['p50_ms'] or '-':>8} "
+              f"{stats['p95_ms'] or '-':>8} {stats['p99_ms'] or '-':>8}")
+    if statuses:
+        print("errors by status: " + ", ".join(f"{status}: {n}" for status, n in statuses.most_common()))
+    if load.max_dispatch_lag_ms > 100:
+        print(f"Warning: dispatch fell {load.max_dispatch_lag_ms:.0f} ms behind schedule; the client is saturated "
+              f"and achieved RPS understates what the API can take.", file=sys.stderr)
+
+    if args.output:
+        report = {"meta": {"created_at": datetime.now(timezone.utc).isoformat(), "git_commit": bench_skills._git_commit(),
+                           "base_url": args.base_url or "stand-in", "rps": args.rps, "start_rps": args.start_rps,
+                           "ramp": args.ramp, "duration": args.duration, "mix": mix, "arrival": args.arrival,
+                           "seed": args.seed, "concurrency": args.concurrency,
+                           "latency_scale": None if args.base_url else args.latency_scale,
+                           "enforce_limits": args.enforce_limits, "error_rate": args.error_rate},
+                  "timeline": timeline, "endpoints": by_endpoint, "steady_state": steady, "totals": totals}
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    print(f"\n--- Steady state: target {args.rps} rps, achieved {steady.get('achieved_rps', 0)} rps, "
+          f"{steady.get('error_pct', 0)}% errors, p95 {steady.get('p95_ms')} ms; "
+          f"{totals['requests']} request(s) in {totals['seconds']}s ---")
+
+
+if __name__ == "__main__":
+    main()
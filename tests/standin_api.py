@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Deterministic local stand-in for the Didit verification API, for benchmarks and
+load tests. Every route answers with a fixed JSON shape after a fixed per-route
+delay (scaled by --latency-scale), so runs on different commits see the same
+server and any difference in the numbers comes from the client side.
+
+Covers the endpoints the standalone skills and the session functions call:
+sessions, decisions, face match, liveness, age estimation, face search, ID,
+database validation, proof of address, AML, and email/phone codes. Unknown
+routes return 404. Request bodies, including multipart uploads, are read in
+full so connection keep-alive works. No API key is checked.
+
+For capacity tests, --enforce-limits answers 429 (with Retry-After) once a route
+exceeds Didit's documented per-minute limit within a sliding 60 s window, and
+--error-rate fails that fraction of requests with a seeded, reproducible 500.
+
+Usage:
+    python tests/standin_api.py [--port 8765] [--latency-scale 1.0] [--enforce-limits] [--error-rate 0.01]
+
+    from standin_api import StandInAPI
+    with StandInAPI(latency_scale=0) as api:
+        base_url = api.base_url    # http://127.0.0.1:<port>
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+NAMESPACE = uuid.UUID("6f1c2a4e-0d1b-4c55-9a53-2f1d3c0b7e10")
+
+# (method, path pattern, route name, delay in ms at latency scale 1.0)
+ROUTES = [
+    ("POST", r"/v3/session/", "session.create", 60),
+    ("GET", r"/v3/session/(?P<id>[^/]+)/decision/", "session.decision", 30),
+    ("POST", r"/v3/aml/", "aml", 150),
+    ("POST", r"/v3/face-match/", "face-match", 300),
+    ("POST", r"/v3/passive-liveness/", "liveness", 250),
+    ("POST", r"/v3/age-estimation/", "age-estimation", 250),
+    ("POST", r"/v3/face-search/", "face-search", 400),
+    ("POST", r"/v3/id-verification/", "id-verification", 900),
+    ("POST", r"/v3/database-validation/", "database-validation", 200),
+    ("POST", r"/v3/poa/", "poa", 600),
+    ("POST", r"/v3/email/send/", "email.send", 120),
+    ("POST", r"/v3/email/check/", "email.check", 40),
+    ("POST", r"/v3/phone/send/", "phone.send", 150),
+    ("POST", r"/v3/phone/check/", "phone.check", 40),
+]
+# Requests per minute (sessions: 600/min create, 100/min decisions; 300/min otherwise)
+RATE_LIMITS = {"session.create": 600, "session.decision": 100}
+DEFAULT_RATE_LIMIT = 300
+_COMPILED = [(method, re.compile(pattern + "$"), name, delay) for method, pattern, name, delay in ROUTES]
+
+
+def _request_id(name: str, body: bytes) -> str:
+    return str(uuid.uuid5(NAMESPACE, name + hashlib.sha256(body).hexdigest()))
+
+
+def respond(name: str, params: dict, body: bytes, sequence: int) -> tuple:
+    """The (status, payload) the stand-in returns for route `name`."""
+    request_id = _request_id(name, body)
+    if name == "session.create":
+        payload = json.loads(body or b"{}")
+        session_id = str(uuid.uuid5(NAMESPACE, f"session-{sequence}"))
+        return 201, {"session_id": session_id, "session_number": sequence, "session_token": session_id[:12],
+                     "vendor_data": payload.get("vendor_data"), "status": "Not Started",
+                     "workflow_id": payload.get("workflow_id"), "url": f"https://verify.didit.me/session/{session_id}"}
+    if name == "session.decision":
+        return 200, {"session_id": params["id"], "status": "Approved", "features": ["ID_VERIFICATION", "LIVENESS"],
+                     "id_verification": {"status": "Approved"}, "liveness": {"status": "Approved", "score": 97.5}}
+    if name == "aml":
+        return 200, {"request_id": request_id, "aml": {"status": "Approved", "total_hits": 0, "hits": [], "score": 0}}
+    if name == "face-match":
+        return 200, {"request_id": request_id, "face_match": {"status": "Approved", "score": 91.3, "warnings": []}}
+    if name == "liveness":
+        return 200, {"request_id": request_id, "liveness": {"status": "Approved", "score": 97.5, "warnings": []}}
+    if name == "age-estimation":
+        return 200, {"request_id": request_id, "liveness": {"status": "Approved", "age_estimation": 34.2}}
+    if name == "face-search":
+        return 200, {"request_id": request_id, "face_search": {"status": "Approved", "total_matches": 0, "matches": []}}
+    if name == "id-verification":
+        return 200, {"request_id": request_id, "id_verification": {"status": "Approved", "document_type": "Passport",
+                                                                    "issuing_state": "ESP", "warnings": []}}
+    if name == "database-validation":
+        return 200, {"request_id": request_id, "database_validation": {"status": "Approved", "match_type": "full_match"}}
+    if name == "poa":
+        return 200, {"request_id": request_id, "poa": {"status": "Approved", "document_type": "UTILITY_BILL"}}
+    if name in ("email.send", "phone.send"):
+        return 200, {"request_id": request_id, "status": "Success", "reason": None}
+    return 200, {"request_id": request_id, "status": "Approved", "message": "The verification code is correct."}
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024  # unpooled clients open a connection per call
+
+
+class StandInAPI:
+    """The stand-in server on a background thread. `counts` holds requests served per route."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency_scale: float = 1.0,
+                 enforce_limits: bool = False, error_rate: float = 0.0, seed: int = 0):
+        self.latency_scale = latency_scale
+        self.enforce_limits = enforce_limits
+        self.error_rate = error_rate
+        self.counts = Counter()
+        self._lock = threading.Lock()
+        self._recent = {}
+        self._rng = random.Random(seed)
+        self._server = _Server((host, port), self._handler())
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _admit(self, name: str, now: float) -> tuple:
+        """(status, retry_after) for a request to `name`; 200 unless limited or failed. Call under the lock."""
+        if self.enforce_limits:
+            recent = self._recent.setdefault(name, deque())
+            while recent and now - recent[0] >= 60:
+                recent.popleft()
+            if len(recent) >= RATE_LIMITS.get(name, DEFAULT_RATE_LIMIT):
+                return 429, 60 - (now - recent[0])
+            recent.append(now)
+        if self.error_rate and self._rng.random() < self.error_rate:
+            return 500, None
+        return 200, None
+
+    def _handler(self):
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True  # headers and body go out in separate writes
+
+            def log_message(self, *args):
+                pass
+
+            def _handle(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                path = self.path.split("?", 1)[0]
+                for method, pattern, name, delay in _COMPILED:
+                    match = pattern.match(path)
+                    if match and method == self.command:
+                        break
+                else:
+                    return self._send(404, {"detail": "Not found."})
+                with api._lock:
+                    api.counts[name] += 1
+                    sequence = sum(api.counts.values())
+                    status, retry_after = api._admit(name, time.monotonic())
+                if status == 429:
+                    return self._send(429, {"detail": "Request was throttled."}, {"Retry-After": str(max(1, round(retry_after)))})
+                if delay and api.latency_scale:
+                    time.sleep(delay * api.latency_scale / 1000)
+                if status == 500:
+                    return self._send(500, {"detail": "Internal server error."})
+                self._send(*respond(name, match.groupdict(), body, sequence))
+
+            def _send(self, status: int, payload: dict, headers: dict = None):
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = do_POST = do_PATCH = do_DELETE = _handle
+
+        return Handler
+
+    def start(self) -> str:
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self.base_url
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Deterministic local stand-in for the Didit API")
+    parser.add_argument("--host", default="127.0.0.1", help="Bind address (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8765, help="Port, 0 for any free port (default: 8765)")
+    parser.add_argument("--latency-scale", type=float, default=1.0,
+                        help="Multiplier for the per-route delays, 0 = answer immediately (default: 1.0)")
+    parser.add_argument("--enforce-limits", action="store_true", help="Answer 429 above the documented per-minute limits")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests failed with 500 (default: 0)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for --error-rate (default: 0)")
+    args = parser.parse_args()
+
+    api = StandInAPI(args.host, args.port, args.latency_scale, args.enforce_limits, args.error_rate, args.seed)
+    print(api.base_url, flush=True)
+    try:
+        api._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        api._server.server_close()
+        print(json.dumps(dict(api.counts), indent=2), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
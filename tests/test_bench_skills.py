@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Offline checks for the benchmark harness: every skill function in the benchmark
+succeeds against the local stand-in API under every execution strategy, URLs are
+restored afterwards, and `compare` flags throughput and p95 regressions. No API key needed.
+
+Usage:
+    python tests/test_bench_skills.py
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import bench_skills  # noqa: E402
+from standin_api import StandInAPI  # noqa: E402
+
+
+def test_every_endpoint_and_strategy_succeeds():
+    with StandInAPI(latency_scale=0) as api:
+        results = bench_skills.benchmark(api.base_url, n=3, workers=2, image_kb=1)
+        served = sum(api.counts.values())
+    assert len(results) == 14 * len(bench_skills.STRATEGIES)
+    failed = [(r["endpoint"], r["strategy"]) for r in results if r["errors"]]
+    assert not failed, f"calls failed: {failed}"
+    assert served == len(results) * (3 + 2), "every call (3 measured + 2 warmup) should reach the stand-in"
+    assert bench_skills.screen_aml.ENDPOINT.startswith(bench_skills.LIVE_HOST), "URLs must be restored"
+    assert bench_skills.create_session.requests is bench_skills.requests
+
+
+def test_compare_flags_regressions():
+    def report(rps, p95, errors=0):
+        return {"meta": {}, "results": [{"endpoint": "aml", "strategy": "pooled", "throughput_rps": rps,
+                                         "p95_ms": p95, "errors": errors}]}
+
+    assert not bench_skills.compare(report(100, 10), report(95, 10.5))[0][-1]
+    assert bench_skills.compare(report(100, 10), report(80, 10))[0][-1]
+    assert bench_skills.compare(report(100, 10), report(100, 12))[0][-1]
+    assert bench_skills.compare(report(100, 10), report(100, 10, errors=1))[0][-1]
+
+
+def main():
+    print("Benchmark harness checks")
+    test_every_endpoint_and_strategy_succeeds()
+    test_compare_flags_regressions()
+    print("All benchmark harness checks passed")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
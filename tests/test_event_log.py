@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Offline checks for the webhook event log: duplicate keys rejected before and after
+reopening (from sealed segment indexes), segment rotation, a torn last line cut on
+reopen by a writer but left alone by a read-only reader, a second writer refused,
+filtered reads, that replay preserves per-session order across parallel
+workers, and that the receiver re-runs a retried event whose handler raised (with
+and without a log). No API key needed.
+
+Usage:
+    python tests/test_event_log.py
+"""
+
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "skills", "didit-verification-management", "scripts"))
+
+from event_log import EventLog, replay  # noqa: E402
+from webhook_receiver import WebhookReceiver, sign_v2  # noqa: E402
+
+
+def _events(n, sessions=20):
+    return [{"session_id": f"s{i % sessions}", "webhook_type": "status.updated", "timestamp": 1700000000 + i,
+             "status": "Approved", "seq": i} for i in range(n)]
+
+
+def test_dedupe_survives_reopen_and_rotation():
+    with tempfile.TemporaryDirectory() as tmp:
+        log = EventLog(tmp, segment_bytes=4096)
+        events = _events(500)
+        assert all(log.append(e) for e in events)
+        assert not any(log.append(dict(e)) for e in events[:50]), "retries must be rejected"
+        assert len(log.segments()) > 1, "small segment size should force rotation"
+        log.close()
+
+        reopened = EventLog(tmp, segment_bytes=4096)
+        assert len(reopened) == 500
+        assert not reopened.append(events[0]) and not reopened.append(events[-1])
+        assert reopened.append(dict(events[0], timestamp=1)), "a different timestamp is a new delivery"
+        assert [r["event"]["seq"] for r in reopened.records(session_id="s3")][:3] == [3, 23, 43]
+        reopened.close()
+
+
+def test_torn_tail_is_cut_on_reopen():
+    with tempfile.TemporaryDirectory() as tmp:
+        log = EventLog(tmp)
+        events = _events(3)
+        log.append(events[0])
+        log.close()
+        with open(log._path(1, "ndjson"), "a", encoding="utf-8") as f:
+            f.write('{"received_at":1,"event":{"session_id":"s1"')  # crash mid-write
+
+        reopened = EventLog(tmp)
+        assert reopened.append(events[1]) and reopened.append(events[2])
+        reopened.close()
+        reader = EventLog(tmp, read_only=True)
+        assert [r["event"]["seq"] for r in reader.records()] == [0, 1, 2], "append after a torn line was lost"
+        reader.close()
+
+
+def test_readers_leave_a_live_log_alone():
+    with tempfile.TemporaryDirectory() as tmp:
+        log = EventLog(tmp)
+        log.append(_events(1)[0])
+        with open(log._path(1, "ndjson"), "a", encoding="utf-8") as f:
+            f.write('{"received_at":1,"event":')  # the writer is mid-line
+        size = os.path.getsize(log._path(1, "ndjson"))
+
+        reader = EventLog(tmp, read_only=True)
+        assert len(reader) == 1 and os.path.getsize(log._path(1, "ndjson")) == size, "a reader cut the writer's line"
+        reader.close()
+        try:
+            EventLog(tmp)
+        except RuntimeError:
+            pass
+        else:
+            raise AssertionError("a second writer must be refused while the first is open")
+        log.close()
+        EventLog(tmp).close()
+
+
+def test_replay_keeps_per_session_order():
+    with tempfile.TemporaryDirectory() as tmp:
+        log = EventLog(tmp)
+        for e in _events(2000, sessions=37):
+            log.append(e)
+        last, violations, lock = {}, [], threading.Lock()
+
+        def handler(event, headers):
+            assert headers["X-Didit-Replay"] == "true"
+            with lock:
+                if event["seq"] < last.get(event["session_id"], -1):
+                    violations.append(event)
+                last[event["session_id"]] = event["seq"]
+
+        result = replay(log.records(), handler, workers=8)
+        log.close()
+        assert result["replayed"] == 2000 and result["handler_errors"] == 0
+        assert not violations, f"{len(violations)} events replayed out of order"
+
+
+def test_failed_handler_is_retried():
+    for use_log in (False, True):
+        with tempfile.TemporaryDirectory() as tmp:
+            calls = []
+
+            def handler(event, headers):
+                calls.append(event["seq"])
+                if len(calls) == 1:
+                    raise RuntimeError("downstream unavailable")
+
+            receiver = WebhookReceiver("s3cret", handler, workers=1, event_log=EventLog(tmp) if use_log else None)
+            event = _events(1)[0]
+            ts = str(int(time.time()))
+            headers = {"X-Timestamp": ts, "X-Signature-V2": sign_v2(event, ts, "s3cret")}
+            raw = json.dumps(event).encode()
+            with contextlib.redirect_stderr(io.StringIO()):
+                assert receiver.receive(raw, headers) == (200, {"ok": True})
+                receiver.queue.join()
+            assert receiver.receive(raw, headers) == (200, {"ok": True}), "a failed event's retry must run again"
+            receiver.queue.join()
+            assert receiver.receive(raw, headers) == (200, {"ok": True, "duplicate": True})
+            assert calls == [0, 0] and receiver.stats["handler_errors"] == 1
+            if receiver.event_log is not None:
+                receiver.event_log.close()
+
+
+def main():
+    print("Webhook event log checks")
+    test_dedupe_survives_reopen_and_rotation()
+    test_torn_tail_is_cut_on_reopen()
+    test_readers_leave_a_live_log_alone()
+    test_replay_keeps_per_session_order()
+    test_failed_handler_is_retried()
+    print("All event log checks passed")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
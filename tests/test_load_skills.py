@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Offline checks for the load generator: the arrival schedule follows the ramp and
+the traffic mix, latency is measured from the scheduled start (queueing behind a
+saturated client shows up instead of being hidden), and the stand-in's documented
+limits surface as 429s. No API key needed.
+
+Usage:
+    python tests/test_load_skills.py
+"""
+
+import contextlib
+import io
+import os
+import sys
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from load_skills import LoadRun, arrival_times, build_schedule, parse_mix  # noqa: E402
+from standin_api import StandInAPI  # noqa: E402
+
+
+def test_schedule_follows_ramp_and_mix():
+    offsets = list(arrival_times(100, 10, ramp=10, poisson=False))
+    assert len(offsets) == 1500, "50 during the ramp's average rate x 10 s + 100 x 10 s"
+    assert abs(sum(1 for t in offsets if t < 5) - 125) <= 1, "a linear ramp puts 1/4 of its requests in its first half"
+    assert abs(sum(1 for t in offsets if t < 10) - 500) <= 1
+    assert offsets == sorted(offsets) and offsets[-1] <= 20
+
+    mix = parse_mix("session.create=60,session.decision=25,face-match=10,aml=5")
+    schedule = build_schedule(mix, 200, 50, seed=7)
+    assert abs(len(schedule) - 10000) < 400, "Poisson count should be close to rps x duration"
+    counts = Counter(endpoint for _, endpoint in schedule)
+    assert abs(counts["session.create"] / len(schedule) - 0.60) < 0.02
+    assert abs(counts["aml"] / len(schedule) - 0.05) < 0.01
+    assert build_schedule(mix, 200, 50, seed=7) == schedule, "same seed, same schedule"
+
+
+def test_latency_includes_queueing():
+    schedule = [(i * 0.01, "slow") for i in range(20)]
+    load = LoadRun({"slow": lambda i: time.sleep(0.05)}, schedule, concurrency=1)
+    load.run(interval=60)
+    latencies = sorted(s["latency_ms"] for s in load.samples)
+    assert max(s["service_ms"] for s in load.samples) < 80
+    assert latencies[-1] > 700, "the last request waited behind 19 others; that wait must count"
+
+
+def test_limits_surface_as_429():
+    import bench_skills
+
+    with StandInAPI(latency_scale=0, enforce_limits=True) as api, bench_skills.pooled_connections() as shim:
+        os.environ.setdefault("DIDIT_API_KEY", "standin-key")
+        bench_skills.point_skills_at(api.base_url)
+        try:
+            calls = {"decision": lambda i: bench_skills.create_session.get_decision("s-1")}
+            load = LoadRun(calls, [(0, "decision")] * 120, concurrency=8, status_of=shim.last_status)
+            with contextlib.redirect_stderr(io.StringIO()):
+                load.run(interval=60)
+        finally:
+            bench_skills.point_skills_at(None)
+    statuses = Counter(s["status"] for s in load.samples)
+    assert statuses == {200: 100, 429: 20}, statuses
+
+
+def main():
+    print("Load generator checks")
+    test_schedule_follows_ramp_and_mix()
+    test_latency_includes_queueing()
+    test_limits_surface_as_429()
+    print("All load generator checks passed")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
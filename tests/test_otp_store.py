@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Load test for the local OTP state store shipped with the email and phone skills.
+
+Hammers MemoryOTPStore and SQLiteOTPStore from many threads with interleaved
+send/check reservations on a small set of hot identifiers, then checks that the
+documented limits held under contention (no identifier got more sends than
+allowed, no code got more check attempts than allowed). No API key needed.
+
+Usage:
+    python tests/test_otp_store.py [--threads 64] [--ops 500]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+EMAIL_SCRIPTS = os.path.join(ROOT, "skills", "didit-email-verification", "scripts")
+PHONE_SCRIPTS = os.path.join(ROOT, "skills", "didit-phone-verification", "scripts")
+sys.path.insert(0, EMAIL_SCRIPTS)
+
+from otp_store import MemoryOTPStore, OTPTracker, SQLiteOTPStore  # noqa: E402
+
+IDENTIFIERS = [f"user-{i}@example.com" for i in range(50)]
+
+
+def hammer(tracker, threads, ops):
+    """Run `threads` workers doing `ops` random operations each; returns (sends, attempts, elapsed).
+
+    A worker that raises is recorded and fails the run instead of dying quietly.
+    """
+    sends = Counter()
+    attempts = Counter()
+    errors = []
+    lock = threading.Lock()
+    start = threading.Barrier(threads)
+
+    def worker(seed):
+        try:
+            run(seed)
+        except Exception as e:
+            with lock:
+                errors.append(f"worker {seed}: {e!r}")
+
+    def run(seed):
+        rng = random.Random(seed)
+        start.wait()
+        for _ in range(ops):
+            identifier = rng.choice(IDENTIFIERS)
+            if rng.random() < 0.5:
+                if tracker.reserve_send(identifier)["allowed"]:
+                    with lock:
+                        sends[identifier] += 1
+                    tracker.record_send(identifier, delivered=True)
+            else:
+                claim = tracker.reserve_check(identifier)
+                if claim["allowed"] and claim["attempt"] is not None:  # None: untracked, the server decides
+                    with lock:
+                        attempts[identifier] = max(attempts[identifier], claim["attempt"])
+                    tracker.record_check(identifier, rng.choice(["Failed", "Failed", "Approved"]))
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    started = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    assert not errors, f"{len(errors)} workers raised, first: {errors[0]}"
+    return sends, attempts, time.perf_counter() - started
+
+
+def check_limits(name, tracker, threads, ops):
+    sends, attempts, elapsed = hammer(tracker, threads, ops)
+    total = threads * ops
+    print(f"  {name}: {total} ops in {elapsed:.2f}s ({total / elapsed:,.0f} ops/s), "
+          f"{sum(sends.values())} sends allowed")
+    assert max(sends.values()) <= tracker.max_sends, f"{name}: send limit exceeded: {sends.most_common(1)}"
+    assert not attempts or max(attempts.values()) <= tracker.max_attempts, f"{name}: attempt limit exceeded"
+    assert len(sends) == len(IDENTIFIERS), f"{name}: some identifiers never got a send"
+
+
+def test_memory_store(threads=64, ops=500):
+    check_limits("MemoryOTPStore", OTPTracker(MemoryOTPStore(), resend_cooldown=0), threads, ops)
+
+
+def test_sqlite_store(threads=64, ops=100):
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SQLiteOTPStore(os.path.join(tmp, "otp_state.db"))
+        check_limits("SQLiteOTPStore", OTPTracker(store, resend_cooldown=0), threads, ops)
+
+
+def test_cooldown_and_expiry():
+    tracker = OTPTracker(MemoryOTPStore(), code_ttl=300, resend_cooldown=30)
+    now = 1_000_000.0
+    assert tracker.reserve_check("a", now=now) == {"allowed": True, "attempt": None}, "untracked: server decides"
+    assert tracker.reserve_send("a", now=now)["allowed"]
+    assert tracker.reserve_send("a", now=now + 10)["reason"] == "RESEND_COOLDOWN"
+    assert tracker.reserve_check("a", now=now + 10)["allowed"]
+    assert tracker.reserve_check("a", now=now + 301)["reason"] == "NO_PENDING_CODE"
+    assert tracker.reserve_send("c", now=now)["allowed"]
+    for _ in range(3):
+        assert tracker.reserve_check("c", now=now)["allowed"]
+        tracker.release_check("c", now=now)
+    assert tracker.reserve_check("c", now=now)["attempt"] == 1, "failed checks should give their attempt back"
+    tracker.record_check("c", "Approved", now=now)
+    assert tracker.reserve_check("c", now=now)["status"] == "AlreadyVerified", "a repeat check must not read as Approved"
+    tracker.record_send("b", delivered=False, now=now)
+    assert tracker.reserve_send("b", now=now)["allowed"]
+    tracker.record_send("b", delivered=False, now=now)
+    assert tracker.reserve_send("b", now=now + 1)["allowed"], "undelivered send should release its slot"
+
+
+def test_skill_copies_match():
+    with open(os.path.join(EMAIL_SCRIPTS, "otp_store.py"), "rb") as a, \
+            open(os.path.join(PHONE_SCRIPTS, "otp_store.py"), "rb") as b:
+        assert a.read() == b.read(), "email and phone otp_store.py have diverged"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the local OTP state store")
+    parser.add_argument("--threads", type=int, default=64)
+    parser.add_argument("--ops", type=int, default=500, help="Operations per thread")
+    args = parser.parse_args()
+
+    print("OTP state store load test")
+    test_skill_copies_match()
+    test_cooldown_and_expiry()
+    test_memory_store(args.threads, args.ops)
+    test_sqlite_store(args.threads, max(1, args.ops // 5))
+    print("All OTP store checks passed")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
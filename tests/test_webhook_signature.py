@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Property test for the fast X-Signature-V2 canonicalizer in didit-verification-management.
+
+Generates random webhook-shaped JSON (nested dicts/lists, whole and fractional floats,
+huge and negative numbers, -0.0, unicode strings, bools, nulls) and checks that
+canonicalize() and parse_canonical() produce exactly the bytes of the SKILL.md
+reference recipe, and that verify_v2() agrees with a reference signature.
+No API key needed.
+
+Usage:
+    python tests/test_webhook_signature.py [--cases 2000] [--seed 0]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "skills", "didit-verification-management", "scripts"))
+
+from webhook_signature import (  # noqa: E402
+    canonicalize, parse_canonical, reference_canonicalize, sample_decision, sign_v2, verify_v2,
+)
+
+STRINGS = ["", "Approved", "In Review", "Martínez", "Zoë", "日本語", "emoji 🎉", 'quote "x"', "back\\slash",
+           "line\nbreak", " ", "<script>", "a/b"]
+
+
+def random_number(rng):
+    return rng.choice([
+        lambda: rng.randint(-10**6, 10**6),
+        lambda: float(rng.randint(-10**6, 10**6)),
+        lambda: rng.uniform(-1000, 1000),
+        lambda: round(rng.uniform(0, 100), 2),
+        lambda: rng.choice([0.0, -0.0, 1.0, 1e16, -1e16, 1e300, 1.5e-7, 2**53 + 0.0, 0.1 + 0.2]),
+        lambda: rng.randint(-2**70, 2**70),
+    ])()
+
+
+def random_value(rng, depth=0):
+    kind = rng.random()
+    if depth < 5 and kind < 0.2:
+        return {rng.choice(STRINGS) + str(rng.randint(0, 50)): random_value(rng, depth + 1)
+                for _ in range(rng.randint(0, 6))}
+    if depth < 5 and kind < 0.35:
+        return [random_value(rng, depth + 1) for _ in range(rng.randint(0, 6))]
+    if kind < 0.6:
+        return random_number(rng)
+    if kind < 0.8:
+        return rng.choice(STRINGS)
+    return rng.choice([True, False, None])
+
+
+def test_matches_reference(cases=2000, seed=0):
+    rng = random.Random(seed)
+    for i in range(cases):
+        body = {"session_id": f"s-{i}", "payload": random_value(rng)}
+        expected = reference_canonicalize(body)
+        assert canonicalize(body) == expected, f"dict path differs for case {i}: {body!r}"
+        raw = json.dumps(body, ensure_ascii=rng.random() < 0.5).encode()
+        assert parse_canonical(raw)[1] == reference_canonicalize(json.loads(raw)), \
+            f"raw path differs for case {i}: {raw!r}"
+
+
+def test_input_not_mutated():
+    body = {"a": [1.0, {"b": 2.0}], "c": 0.5}
+    snapshot = json.dumps(body)
+    canonicalize(body)
+    assert json.dumps(body) == snapshot
+
+
+def test_verify_and_replay_window():
+    body = sample_decision(10)
+    raw = json.dumps(body).encode()
+    now = 1_760_000_000
+    signature = sign_v2(reference_canonicalize(body), str(now), "secret")
+    assert verify_v2(raw, signature, str(now), "secret", now=now)
+    assert verify_v2(body, signature, str(now), "secret", now=now)
+    assert not verify_v2(raw, signature, str(now), "other", now=now)
+    assert not verify_v2(raw, signature, str(now), "secret", now=now + 301)
+    assert not verify_v2(raw, signature, "not-a-number", "secret", now=now)
+    assert not verify_v2(raw.replace(b"Approved", b"Declined"), signature, str(now), "secret", now=now)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Property-test the fast webhook canonicalizer")
+    parser.add_argument("--cases", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print("Webhook signature canonicalization property test")
+    test_input_not_mutated()
+    test_verify_and_replay_window()
+    test_matches_reference(args.cases, args.seed)
+    print(f"All {args.cases} random payloads matched the reference")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Offline checks for the workflow registry shared by manage_workflows.py and run_kyc.py:
+configuration hashing, TTL expiry, list refresh semantics, per-account isolation,
+that concurrent writers don't overwrite each other, and that the skill copies of
+the registry and file_lock.py are identical. No API key needed.
+
+Usage:
+    python tests/test_workflow_registry.py
+"""
+
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MGMT_SCRIPTS = os.path.join(ROOT, "skills", "didit-verification-management", "scripts")
+KYC_SCRIPTS = os.path.join(ROOT, "skills", "didit-kyc-onboarding", "scripts")
+EMAIL_SCRIPTS = os.path.join(ROOT, "skills", "didit-email-verification", "scripts")
+sys.path.insert(0, MGMT_SCRIPTS)
+
+from workflow_registry import WorkflowRegistry, config_hash  # noqa: E402
+
+KYC = {"workflow_type": "kyc", "is_liveness_enabled": True, "is_face_match_enabled": True,
+       "face_match_score_decline_threshold": 50, "max_retry_attempts": 3}
+
+
+def test_config_hash():
+    assert config_hash(KYC) == config_hash(dict(KYC, workflow_label="Other label", is_aml_enabled=False))
+    assert config_hash(KYC) != config_hash(dict(KYC, is_aml_enabled=True))
+    assert config_hash(KYC) != config_hash(dict(KYC, face_match_score_decline_threshold=70))
+
+
+def test_find_ttl_and_persistence():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "workflows.json")
+        registry = WorkflowRegistry(path, ttl=60, api_key="key-a")
+        registry.put({"uuid": "wf-1", "workflow_label": "KYC"}, config=KYC, now=1000)
+        assert registry.find(KYC, now=1030)["uuid"] == "wf-1"
+        assert registry.find(KYC, now=1061) is None, "entry should expire after the TTL"
+        assert registry.find(dict(KYC, is_nfc_enabled=True), now=1030) is None
+
+        reloaded = WorkflowRegistry(path, ttl=60, api_key="key-a")
+        assert reloaded.find(KYC, now=1030)["uuid"] == "wf-1"
+        assert WorkflowRegistry(path, ttl=60, api_key="key-b").find(KYC, now=1030) is None
+
+
+def test_list_refresh_keeps_hashes_and_drops_deleted():
+    with tempfile.TemporaryDirectory() as tmp:
+        registry = WorkflowRegistry(os.path.join(tmp, "workflows.json"), ttl=60, api_key="k")
+        registry.put({"uuid": "wf-1"}, config=KYC, now=1000)
+        registry.put({"uuid": "wf-2"}, config=dict(KYC, is_aml_enabled=True), now=1000)
+        assert registry.listed(now=1000) is None
+        registry.replace_all([{"uuid": "wf-1", "workflow_label": "Renamed"}], now=1010)
+        assert registry.find(KYC, now=1020)["workflow_label"] == "Renamed"
+        assert registry.find(dict(KYC, is_aml_enabled=True), now=1020) is None
+        assert [w["uuid"] for w in registry.listed(now=1020)] == ["wf-1"]
+        registry.remove("wf-1")
+        assert registry.find(KYC, now=1020) is None
+
+
+def test_concurrent_writers_merge():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "workflows.json")
+        first = WorkflowRegistry(path, ttl=60, api_key="k")
+        second = WorkflowRegistry(path, ttl=60, api_key="k")  # loaded before `first` saves
+        first.put({"uuid": "wf-1"}, config=KYC, now=1000)
+        second.put({"uuid": "wf-2"}, config=dict(KYC, is_aml_enabled=True), now=1000)
+        assert second.find(KYC, now=1000)["uuid"] == "wf-1", "save should pick up the other writer's entry"
+        second.remove("wf-1")
+        first.put({"uuid": "wf-3"}, config=dict(KYC, is_nfc_enabled=True), now=1000)
+        reloaded = WorkflowRegistry(path, ttl=60, api_key="k")
+        assert sorted(reloaded._account["workflows"]) == ["wf-2", "wf-3"]
+        assert reloaded.find(KYC, now=5000, fresh_only=False) is None
+        assert reloaded.find(dict(KYC, is_aml_enabled=True), now=5000, fresh_only=False)["uuid"] == "wf-2"
+
+
+def test_skill_copies_match():
+    copies = [("workflow_registry.py", KYC_SCRIPTS), ("file_lock.py", KYC_SCRIPTS), ("file_lock.py", EMAIL_SCRIPTS)]
+    for name, other in copies:
+        with open(os.path.join(MGMT_SCRIPTS, name), "rb") as a, open(os.path.join(other, name), "rb") as b:
+            assert a.read() == b.read(), f"{name} in {os.path.basename(os.path.dirname(other))} has diverged"
+
+
+def main():
+    print("Workflow registry checks")
+    test_skill_copies_match()
+    test_config_hash()
+    test_find_ttl_and_persistence()
+    test_list_refresh_keeps_hashes_and_drops_deleted()
+    test_concurrent_writers_merge()
+    print("All workflow registry checks passed")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())